@@ -0,0 +1,134 @@
+import threading
+from collections import Counter
+from datetime import date
+
+import pandas as pd
+
+from calculo_status import calcular_status, calcular_status_vetorizado
+
+
+def _tem_impacto(valor):
+    return pd.notna(valor) and valor != ''
+
+
+def _area(valor):
+    return None if valor is None or (not isinstance(valor, str) and pd.isna(valor)) else valor
+
+
+# Agregados do painel (contagem por Área x Status, com/sem impacto e total), mantidos por deltas.
+# Gravar, editar e apagar aplicam apenas a diferença do registro afetado; a reconstrução completa
+# só acontece na carga, na virada do dia (o Status depende de hoje) ou se a versão dos dados mudar
+# por fora (outro processo ou edição externa).
+class AgregadosPlano:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.data_referencia = None
+        self.por_area_status = Counter()
+        self.por_status = Counter()
+        self.com_impacto = 0
+        self.total = 0
+        self.reconstrucoes = 0
+
+    # Função para calcular os agregados do zero a partir do DataFrame completo
+    @staticmethod
+    def calcular(df, hoje):
+        status = calcular_status_vetorizado(df, hoje)
+        areas = df['Area'].astype(object).where(df['Area'].notna(), None)
+        por_area_status = Counter(
+            (area, status_linha) for area, status_linha in zip(areas, status) if area is not None
+        )
+        impacto = df['Impacto']
+        com_impacto = int((impacto.notna() & (impacto.astype(object) != '')).sum())
+        return por_area_status, Counter(status), com_impacto, df.shape[0]
+
+    def reconstruir(self, df, versao, hoje):
+        por_area_status, por_status, com_impacto, total = self.calcular(df, hoje)
+        with self._trava:
+            self.por_area_status = por_area_status
+            self.por_status = por_status
+            self.com_impacto = com_impacto
+            self.total = total
+            self.versao = versao
+            self.data_referencia = hoje
+            self.reconstrucoes += 1
+
+    # Garante que os agregados correspondem à versão dos dados e ao dia de hoje
+    def sincronizar(self, carregar_df, versao, hoje=None):
+        hoje = hoje or date.today()
+        with self._trava:
+            atualizado = self.versao == versao and self.data_referencia == hoje
+        if not atualizado:
+            self.reconstruir(carregar_df(), versao, hoje)
+        return self
+
+    def _aplicar(self, registro, sinal):
+        status = calcular_status(
+            registro.get('Inicio Real'), registro.get('Fim Real'),
+            registro.get('Inicio Plan'), registro.get('Fim Plan'),
+            hoje=self.data_referencia
+        )
+        area = _area(registro.get('Area'))
+        if area is not None:
+            self.por_area_status[(area, status)] += sinal
+            if self.por_area_status[(area, status)] <= 0:
+                del self.por_area_status[(area, status)]
+        self.por_status[status] += sinal
+        if self.por_status[status] <= 0:
+            del self.por_status[status]
+        if _tem_impacto(registro.get('Impacto')):
+            self.com_impacto += sinal
+        self.total += sinal
+
+    # Aplica a diferença de uma gravação: antigo=None para inclusão, novo=None para exclusão.
+    # Se os agregados não estavam na versão anterior à gravação, eles são marcados para reconstrução.
+    def aplicar(self, antigo, novo, versao_antes, versao_depois):
+        with self._trava:
+            if self.versao != versao_antes or self.data_referencia is None:
+                self.versao = None
+                return
+            if antigo is not None:
+                self._aplicar(antigo, -1)
+            if novo is not None:
+                self._aplicar(novo, 1)
+            self.versao = versao_depois
+
+    def invalidar(self):
+        with self._trava:
+            self.versao = None
+
+    # Leituras do painel: O(#áreas x #status), sem percorrer as linhas
+    def tabela_area_status(self):
+        with self._trava:
+            linhas = [(area, status, contagem) for (area, status), contagem in self.por_area_status.items()]
+        return pd.DataFrame(linhas, columns=['Area', 'Status', 'Count']).sort_values(['Area', 'Status'], ignore_index=True)
+
+    def contagem_status(self):
+        with self._trava:
+            return pd.Series(dict(self.por_status), dtype='int64').sort_values(ascending=False)
+
+    def resumo(self):
+        with self._trava:
+            return {
+                'total': self.total,
+                'concluidas': self.por_status.get('CONCLUÍDA', 0),
+                'atrasadas': self.por_status.get('ATRASADA', 0),
+                'com_impacto': self.com_impacto,
+                'sem_impacto': self.total - self.com_impacto,
+            }
+
+    # Verificação de consistência: compara os agregados mantidos por deltas com um recálculo completo
+    def verificar(self, df):
+        por_area_status, por_status, com_impacto, total = self.calcular(df, self.data_referencia or date.today())
+        divergencias = []
+        with self._trava:
+            if +self.por_area_status != +por_area_status:
+                divergencias.append('Contagem por Área x Status')
+            if +self.por_status != +por_status:
+                divergencias.append('Contagem por Status')
+            if self.com_impacto != com_impacto:
+                divergencias.append(f'Com impacto: {self.com_impacto} (mantido) x {com_impacto} (recalculado)')
+            if self.total != total:
+                divergencias.append(f'Total: {self.total} (mantido) x {total} (recalculado)')
+        return divergencias
+
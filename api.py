@@ -0,0 +1,385 @@
+# API HTTP de leitura do plano de ação, para os painéis de BI e o sistema de manutenção (no lugar de
+# baixar a planilha pelo botão do app). Usa o mesmo plano compartilhado, as mesmas partições e o mesmo
+# cálculo de Status das abas do app. Uso, a partir da raiz do projeto:
+#   python api.py --porta 8502 --site Principal
+# Rotas (GET), com os parâmetros comuns site, corpos (separados por vírgula) e formato (json ou csv):
+#   /acoes?area=Transporte&status=ATRASADA&fim_plan_de=2024-01-01&ordenar=fim_plan&pagina=2&tamanho=500
+#   /semanas?deslocamento=-1            (ou ?ano=2024&semana=42; aceita os mesmos filtros de /acoes)
+#   /agregados                          (contagem Área x Status e resumo do painel)
+#   /particoes                          (totais de cada partição do site, dos resumos já gravados)
+# Cada resposta traz um ETag derivado da versão dos dados e do dia (o Status depende de hoje); com
+# If-None-Match igual a resposta é 304, sem corpo. Listas de ações são enviadas em blocos (chunked),
+# sem montar o resultado inteiro na memória, e paginadas com X-Total-Count e Link rel="next".
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from busca import normalizar
+from calculo_status import calcular_status_vetorizado
+from consulta import COLUNAS_FILTRO, COLUNAS_FILTRO_DATA, IndiceConsulta
+from cache_arquivos import assinatura_arquivo
+from dados_compartilhados import PLANOS_EM_MEMORIA, obter_plano_compartilhado
+from particoes import SITE_PADRAO, CatalogoParticoes, sites_disponiveis
+from semanas import IndiceSemanas, semana_relativa
+
+PORTA_PADRAO = 8502
+
+# Linhas serializadas por bloco da resposta
+LINHAS_POR_BLOCO = 1000
+
+# Tamanho máximo de uma página (sem `tamanho` a resposta traz todas as linhas, em blocos)
+TAMANHO_MAXIMO_PAGINA = 50_000
+
+FORMATOS = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+# Erro de uma requisição, respondido com o status HTTP e a mensagem em JSON
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# Função para converter o nome de uma coluna no nome do parâmetro ("Fim Plan" -> "fim_plan")
+def nome_parametro(coluna):
+    return re.sub(r'[^a-z0-9]+', '_', normalizar(coluna)).strip('_')
+
+
+PARAMETROS_FILTRO = {nome_parametro(coluna): coluna for coluna in COLUNAS_FILTRO}
+PARAMETROS_DATA = {nome_parametro(coluna): coluna for coluna in COLUNAS_FILTRO_DATA}
+
+
+# Plano preparado para as consultas de uma versão e de um dia: Status do dia, semana ISO e os índices
+# de filtro e de semanas (as mesmas estruturas das abas TABELAS e GRÁFICOS)
+class PlanoPreparado:
+    def __init__(self, df_plano, hoje):
+        df = df_plano.copy(deep=False)
+        df['Status'] = calcular_status_vetorizado(df, hoje).astype('category')
+        self.semanas = IndiceSemanas(df)
+        df['Semana do Ano'] = self.semanas.semana_do_ano
+        self.df = df
+        self.consulta = IndiceConsulta(df)
+
+
+_preparados = OrderedDict()
+_trava_preparados = threading.Lock()
+
+
+# Função para obter o plano preparado de uma versão e de um dia, montado uma única vez
+def obter_preparado(versao, df_plano, hoje):
+    chave = (versao, hoje)
+    with _trava_preparados:
+        preparado = _preparados.get(chave)
+    if preparado is None:
+        preparado = PlanoPreparado(df_plano, hoje)
+        with _trava_preparados:
+            _preparados[chave] = preparado
+            while len(_preparados) > PLANOS_EM_MEMORIA:
+                _preparados.popitem(last=False)
+    return preparado
+
+
+def _texto(parametros, nome, padrao=None):
+    valores = parametros.get(nome)
+    return valores[-1] if valores else padrao
+
+
+def _lista(parametros, nome):
+    return [valor.strip() for texto in parametros.get(nome, []) for valor in texto.split(',') if valor.strip()]
+
+
+def _inteiro(parametros, nome, padrao=None, minimo=None, maximo=None):
+    texto = _texto(parametros, nome)
+    if texto is None:
+        return padrao
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro '{nome}' deve ser um número inteiro")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro '{nome}' fora do intervalo permitido")
+    return valor
+
+
+def _data(parametros, nome):
+    texto = _texto(parametros, nome)
+    if texto is None:
+        return None
+    try:
+        return pd.Timestamp(date.fromisoformat(texto))
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro '{nome}' deve ser uma data AAAA-MM-DD")
+
+
+# Função para montar os filtros da consulta a partir dos parâmetros (mesmos filtros da aba TABELAS)
+def filtros(parametros):
+    filtros_valor = {coluna: _lista(parametros, nome) for nome, coluna in PARAMETROS_FILTRO.items() if nome in parametros}
+    filtros_data = {}
+    for nome, coluna in PARAMETROS_DATA.items():
+        inicio, fim = _data(parametros, f'{nome}_de'), _data(parametros, f'{nome}_ate')
+        if inicio is not None or fim is not None:
+            filtros_data[coluna] = (inicio, fim)
+    return filtros_valor, filtros_data
+
+
+# Função para escolher a coluna e o sentido da ordenação (ordenar=fim_plan ou ordenar=-fim_plan)
+def ordenacao(parametros, colunas):
+    texto = _texto(parametros, 'ordenar')
+    if not texto:
+        return None, True
+    crescente = not texto.startswith('-')
+    nome = texto.lstrip('-')
+    por_parametro = {nome_parametro(coluna): coluna for coluna in colunas}
+    if nome not in por_parametro:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Coluna de ordenação '{nome}' não existe")
+    return por_parametro[nome], crescente
+
+
+# Função para serializar um bloco de linhas (sem os colchetes, no JSON, e sem o cabeçalho, no CSV)
+def serializar_bloco(df, formato):
+    if formato == 'csv':
+        return df.to_csv(index=False, header=False, date_format='%Y-%m-%d')
+    return df.to_json(orient='records', date_format='iso', force_ascii=False)[1:-1]
+
+
+# Função para gerar o corpo de uma lista de ações em blocos de LINHAS_POR_BLOCO linhas
+def blocos_acoes(df, posicoes, formato, metadados):
+    if formato == 'csv':
+        yield df.iloc[:0].to_csv(index=False)
+    else:
+        yield json.dumps(metadados, ensure_ascii=False)[:-1] + ', "acoes": ['
+    primeiro = True
+    for inicio in range(0, posicoes.size, LINHAS_POR_BLOCO):
+        bloco = serializar_bloco(df.iloc[posicoes[inicio:inicio + LINHAS_POR_BLOCO]], formato)
+        yield bloco if formato == 'csv' or primeiro else ',' + bloco
+        primeiro = False
+    if formato == 'json':
+        yield ']}'
+
+
+# Função para calcular o ETag de uma resposta: versão do armazenamento, dia e consulta
+def etag(versao_armazenamento, hoje, caminho, parametros):
+    resumo = hashlib.sha1(repr((versao_armazenamento, hoje.isoformat(), caminho, sorted(parametros.items()))).encode('utf-8'))
+    return f'W/"{resumo.hexdigest()[:20]}"'
+
+
+def _etag_confere(cabecalho, valor):
+    if not cabecalho:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in cabecalho.split(',')]
+    return '*' in etiquetas or any(etiqueta.removeprefix('W/') == valor.removeprefix('W/') for etiqueta in etiquetas)
+
+
+class ManipuladorApi(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PlanoAcaoAPI/1.0'
+    tipo_armazenamento = None
+    site_padrao = SITE_PADRAO
+
+    def log_message(self, formato, *args):
+        if self.server.registrar:
+            super().log_message(formato, *args)
+
+    def do_GET(self):
+        self._em_blocos = False
+        url = urlsplit(self.path)
+        parametros = parse_qs(url.query)
+        rota = getattr(self, '_rota_' + url.path.strip('/'), None) if url.path != '/' else self._rota_indice
+        try:
+            if rota is None:
+                raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Rota '{url.path}' não existe")
+            formato = _texto(parametros, 'formato', 'json')
+            if formato not in FORMATOS:
+                raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Parâmetro 'formato' deve ser json ou csv")
+            rota(url.path, parametros, formato)
+        except ErroRequisicao as erro:
+            self._responder_erro(erro.status, erro.mensagem)
+        except Exception as erro:
+            # Com a resposta em blocos já iniciada não há como trocar o status: a conexão é encerrada
+            if self._em_blocos:
+                self.close_connection = True
+            else:
+                self._responder_erro(HTTPStatus.INTERNAL_SERVER_ERROR, str(erro))
+            raise
+
+    # Plano da seleção pedida e o ETag da resposta. A versão do armazenamento é lida antes dos dados:
+    # uma gravação no meio faz o ETag ficar mais antigo que os dados (e a próxima consulta volta 200),
+    # nunca o contrário. O site é conferido só no catálogo: uma requisição nunca cria site nem migra
+    # o plano (isso é feito ao criar o servidor).
+    def _plano(self, caminho, parametros, com_resumo=False):
+        site = _texto(parametros, 'site', self.site_padrao)
+        if CatalogoParticoes().site(site) is None:
+            raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Site '{site}' não encontrado")
+        corpos = _lista(parametros, 'corpos') or None
+        plano = obter_plano_compartilhado(site, corpos, self.tipo_armazenamento)
+        hoje = date.today()
+        versao = plano.armazenamento.versao()
+        if com_resumo:
+            versao = (versao, assinatura_arquivo(plano.armazenamento.caminho_resumo))
+        valor_etag = etag(versao, hoje, caminho, parametros)
+        if _etag_confere(self.headers.get('If-None-Match'), valor_etag):
+            self._responder_nao_modificado(valor_etag)
+            return None
+        return plano, hoje, valor_etag
+
+    def _rota_indice(self, caminho, parametros, formato):
+        self._responder(HTTPStatus.OK, FORMATOS['json'], json.dumps({
+            'rotas': ['/acoes', '/semanas', '/agregados', '/particoes'],
+            'filtros': sorted(PARAMETROS_FILTRO),
+            'filtros_data': sorted(f'{nome}_de|{nome}_ate' for nome in PARAMETROS_DATA),
+            'sites': CatalogoParticoes().sites(),
+        }, ensure_ascii=False).encode('utf-8'))
+
+    def _rota_acoes(self, caminho, parametros, formato, linhas=None):
+        selecao = self._plano(caminho, parametros)
+        if selecao is None:
+            return
+        plano, hoje, valor_etag = selecao
+        versao, df_plano = plano.obter()
+        preparado = obter_preparado(versao, df_plano, hoje)
+        if linhas is not None:
+            linhas = linhas(preparado.semanas)
+
+        mascara = preparado.consulta.filtrar(*filtros(parametros))
+        if linhas is not None:
+            na_semana = np.zeros(mascara.size, dtype=bool)
+            na_semana[linhas] = True
+            mascara &= na_semana
+        ordenar_por, crescente = ordenacao(parametros, preparado.df.columns)
+        tamanho = _inteiro(parametros, 'tamanho', minimo=1, maximo=TAMANHO_MAXIMO_PAGINA)
+        pagina = _inteiro(parametros, 'pagina', 1, minimo=1)
+        posicoes, total = preparado.consulta.paginar(
+            mascara, ordenar_por, crescente, pagina, tamanho if tamanho is not None else max(mascara.size, 1)
+        )
+
+        cabecalhos = {'X-Total-Count': str(total)}
+        metadados = {'total': total, 'pagina': pagina, 'tamanho': tamanho}
+        if tamanho is not None and pagina * tamanho < total:
+            proxima = {nome: valores for nome, valores in parametros.items() if nome != 'pagina'}
+            proxima['pagina'] = [str(pagina + 1)]
+            cabecalhos['Link'] = f'<{caminho}?{urlencode(proxima, doseq=True)}>; rel="next"'
+        self._responder_blocos(valor_etag, FORMATOS[formato], blocos_acoes(preparado.df, posicoes, formato, metadados), cabecalhos)
+
+    def _rota_semanas(self, caminho, parametros, formato):
+        ano, semana = _inteiro(parametros, 'ano'), _inteiro(parametros, 'semana', minimo=1, maximo=53)
+        if (ano is None) != (semana is None):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Informe 'ano' e 'semana' juntos")
+        if ano is None:
+            ano, semana = semana_relativa(date.today(), _inteiro(parametros, 'deslocamento', 0))
+        self._rota_acoes(caminho, parametros, formato, linhas=lambda semanas: semanas.linhas(ano, semana))
+
+    def _rota_agregados(self, caminho, parametros, formato):
+        selecao = self._plano(caminho, parametros)
+        if selecao is None:
+            return
+        plano, hoje, valor_etag = selecao
+        agregados = plano.sincronizar(plano.agregados, hoje)
+        tabela = agregados.tabela_area_status()
+        if formato == 'csv':
+            corpo = tabela.to_csv(index=False)
+        else:
+            corpo = json.dumps({'resumo': agregados.resumo(), 'area_status': tabela.to_dict(orient='records')}, ensure_ascii=False)
+        self._responder(HTTPStatus.OK, FORMATOS[formato], corpo.encode('utf-8'), valor_etag)
+
+    # Só lê os resumos gravados pelo app (a API não grava nada): os que não correspondem mais à
+    # versão da partição saem com Atualizado=False
+    def _rota_particoes(self, caminho, parametros, formato):
+        selecao = self._plano(caminho, parametros, com_resumo=True)
+        if selecao is None:
+            return
+        plano, hoje, valor_etag = selecao
+        totais = plano.armazenamento.totais(hoje)
+        if formato == 'csv':
+            corpo = totais.to_csv(index=False)
+        else:
+            corpo = totais.to_json(orient='records', force_ascii=False)
+        self._responder(HTTPStatus.OK, FORMATOS[formato], corpo.encode('utf-8'), valor_etag)
+
+    def _cabecalhos(self, valor_etag, cabecalhos=None):
+        if valor_etag:
+            self.send_header('ETag', valor_etag)
+            self.send_header('Cache-Control', 'no-cache')
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+
+    def _responder(self, status, tipo, corpo, valor_etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self._cabecalhos(valor_etag)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_erro(self, status, mensagem):
+        self._responder(status, FORMATOS['json'], json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8'))
+
+    def _responder_nao_modificado(self, valor_etag):
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self._cabecalhos(valor_etag)
+        self.end_headers()
+
+    # Resposta em blocos (Transfer-Encoding: chunked): cada bloco é enviado assim que é serializado
+    def _responder_blocos(self, valor_etag, tipo, blocos, cabecalhos):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self._cabecalhos(valor_etag, cabecalhos)
+        self.end_headers()
+        self._em_blocos = True
+        for bloco in blocos:
+            dados = bloco.encode('utf-8')
+            if dados:
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(dados), dados))
+        self.wfile.write(b'0\r\n\r\n')
+
+
+# Função para criar o servidor da API (porta 0 escolhe uma porta livre). A migração única do plano
+# monolítico para os sites, se ainda não foi feita, acontece aqui, antes de atender requisições.
+def criar_servidor(host='127.0.0.1', porta=PORTA_PADRAO, site=SITE_PADRAO, tipo=None, registrar=True):
+    sites_disponiveis(tipo)
+    manipulador = type('ManipuladorConfigurado', (ManipuladorApi,), {'tipo_armazenamento': tipo, 'site_padrao': site})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    servidor.registrar = registrar
+    return servidor
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="API HTTP de leitura do plano de ação (JSON e CSV)")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço de escuta (padrão: só a máquina local)")
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--site', default=SITE_PADRAO, help="Site consultado quando a requisição não informa o site")
+    parser.add_argument('--armazenamento', choices=['sqlite', 'excel'],
+                        help="Armazenamento do plano (padrão: variável PLANO_ARMAZENAMENTO ou sqlite)")
+    args = parser.parse_args(argumentos)
+    if args.site not in sites_disponiveis(args.armazenamento):
+        parser.error(f"Site '{args.site}' não encontrado")
+
+    servidor = criar_servidor(args.host, args.porta, args.site, args.armazenamento)
+    print(f"API do plano em http://{args.host}:{servidor.server_address[1]}/")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,599 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import closing
+from datetime import date, datetime
+
+import pandas as pd
+
+from cache_arquivos import assinatura_arquivo, cache_carga
+from diario import AUTOR, IDADE_MAXIMA_DIARIO_S, TAMANHO_MAXIMO_DIARIO, Compactador, DiarioAlteracoes, campos_json
+from fila_gravacao import TravaArquivo, caminho_trava
+
+# O snapshot colunar em Parquet depende do pyarrow; sem ele a planilha é lida diretamente
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+
+CAMINHO_EXCEL = 'dados_projeto.xlsx'
+CAMINHO_SQLITE = 'dados_projeto.db'
+
+# Colunas obrigatórias do plano de ação (required_columns)
+COLUNAS_OBRIGATORIAS = [
+    'Area', 'Local', 'Acao', 'Impacto', 'Responsavel', 'Inicio Plan',
+    'Fim Plan', 'Inicio Real', 'Fim Real', 'Status', 'Observações', 'Nota de Trabalho',
+    'O resultado esperado foi alcançado?', 'Se não, o que será feito?', 'Classificação Impacto',
+    'Corpo', 'Nível', 'Inicio(REPRO)', 'Fim(REPRO)'  # Novas colunas adicionadas
+]
+
+COLUNAS_DATA = ['Inicio Plan', 'Fim Plan', 'Inicio Real', 'Fim Real', 'Inicio(REPRO)', 'Fim(REPRO)']
+
+# Chave primária de cada ação
+COLUNA_ID = 'ID'
+
+
+# Função para obter o caminho do snapshot Parquet mantido ao lado da planilha
+def caminho_snapshot(caminho=CAMINHO_EXCEL):
+    return os.path.splitext(caminho)[0] + '.parquet'
+
+
+# Função para tipar as colunas antes de gravar o snapshot: datas em datetime64 e
+# colunas de texto com tipos misturados (ex.: número e texto) convertidas para texto
+def _tipar_colunas(df):
+    for col in COLUNAS_DATA:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in df.columns:
+        if col not in COLUNAS_DATA and df[col].dtype == object:
+            if df[col].dropna().map(type).nunique() > 1:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+# O snapshot só é usado se for mais recente que a planilha (que pode ter sido editada fora do app)
+def _snapshot_atualizado(caminho, snapshot):
+    try:
+        return os.stat(snapshot).st_mtime_ns >= os.stat(caminho).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+# Função para gravar o snapshot Parquet de forma atômica (arquivo temporário + os.replace)
+def salvar_snapshot(df, caminho=CAMINHO_EXCEL):
+    if not PARQUET_DISPONIVEL:
+        return
+    snapshot = caminho_snapshot(caminho)
+    temporario = snapshot + '.tmp'
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, snapshot)
+    except (ValueError, TypeError, OSError):
+        # O snapshot é apenas uma otimização; se falhar, a planilha continua sendo lida
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+# Carregar dados da planilha (ou do snapshot Parquet, quando ele estiver atualizado)
+def carregar_dados(caminho=CAMINHO_EXCEL):
+    snapshot = caminho_snapshot(caminho)
+    if PARQUET_DISPONIVEL and _snapshot_atualizado(caminho, snapshot):
+        try:
+            return pd.read_parquet(snapshot)
+        except (ValueError, OSError):
+            pass
+
+    try:
+        df = pd.read_excel(caminho)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COLUNAS_OBRIGATORIAS)
+
+    # Planilhas antigas usam 'Área' com acento; renomeia antes de completar as colunas faltantes
+    if 'Area' not in df.columns and 'Área' in df.columns:
+        df.rename(columns={'Área': 'Area'}, inplace=True)
+
+    for col in COLUNAS_OBRIGATORIAS:
+        if col not in df.columns:
+            df[col] = None
+
+    df = _tipar_colunas(df)
+    salvar_snapshot(df, caminho)
+    return df
+
+
+# Função para gravar a planilha em um arquivo temporário ao lado dela (nome único por thread)
+def _planilha_temporaria(df, caminho):
+    raiz, extensao = os.path.splitext(caminho)
+    temporario = f'{raiz}.{os.getpid()}.{threading.get_ident()}.tmp{extensao}'
+    df.to_excel(temporario, index=False)
+    return temporario
+
+
+# A planilha é trocada de uma vez (os.replace): uma queda no meio da gravação não a corrompe
+def _substituir_planilha(df, temporario, caminho):
+    os.replace(temporario, caminho)
+    salvar_snapshot(_tipar_colunas(df.copy()), caminho)
+    cache_carga.invalidar(caminho)
+
+
+def salvar_dados(df, caminho=CAMINHO_EXCEL):
+    _substituir_planilha(df, _planilha_temporaria(df, caminho), caminho)
+
+
+# Função para garantir que toda ação tenha uma chave primária
+def _garantir_ids(df):
+    if COLUNA_ID not in df.columns:
+        df.insert(0, COLUNA_ID, range(1, df.shape[0] + 1))
+    elif df[COLUNA_ID].isna().any():
+        proximo = int(df[COLUNA_ID].max()) + 1 if df[COLUNA_ID].notna().any() else 1
+        faltantes = df[COLUNA_ID].isna()
+        df.loc[faltantes, COLUNA_ID] = range(proximo, proximo + int(faltantes.sum()))
+    df[COLUNA_ID] = df[COLUNA_ID].astype('int64')
+    return df
+
+
+# Lote já conferido e pronto para gravar (gravação em duas fases): `confirmar()` grava e `desfazer()`
+# descarta. O armazenamento particionado prepara o lote de todas as partições antes de confirmar qualquer uma.
+class LotePreparado:
+    def __init__(self, resultados, confirmar, desfazer):
+        self.resultados = resultados
+        self.confirmar = confirmar
+        self.desfazer = desfazer
+
+
+# Interface comum dos armazenamentos do plano de ação. `lote_atomico` indica que gravar_lote grava
+# tudo ou nada: um lote que falhou não deixou nada gravado e pode ser refeito.
+class Armazenamento(ABC):
+    lote_atomico = False
+
+    @abstractmethod
+    def carregar(self):
+        pass
+
+    # Insere uma ação e retorna a chave primária gerada
+    @abstractmethod
+    def inserir(self, registro):
+        pass
+
+    # Insere várias ações de uma vez e retorna as chaves geradas
+    def inserir_lote(self, registros, autor=None):
+        return [self.inserir(registro) for registro in registros]
+
+    @abstractmethod
+    def atualizar(self, id_acao, campos):
+        pass
+
+    @abstractmethod
+    def apagar(self, id_acao):
+        pass
+
+    # Aplica uma sequência de operações (tipo, id, dados), com tipo 'inserir', 'atualizar' ou
+    # 'apagar', e retorna um resultado por operação (a chave gerada, no caso de inserção).
+    # `autores` traz quem fez cada operação, para os armazenamentos que mantêm histórico.
+    def gravar_lote(self, operacoes, autores=None):
+        resultados = []
+        for tipo, id_acao, dados in operacoes:
+            if tipo == 'inserir':
+                resultados.append(self.inserir(dados))
+            elif tipo == 'atualizar':
+                resultados.append(self.atualizar(id_acao, dados))
+            elif tipo == 'apagar':
+                resultados.append(self.apagar(id_acao))
+            else:
+                raise ValueError(f"Operação desconhecida: '{tipo}'")
+        return resultados
+
+    # Versão dos dados persistidos: muda a cada gravação (mtime e tamanho do arquivo)
+    def versao(self):
+        return assinatura_arquivo(self.caminho)
+
+    # Indica se um registro gravado faz parte dos dados que este armazenamento carrega
+    # (um armazenamento particionado carrega só as partições selecionadas)
+    def pertence(self, registro):
+        return True
+
+    # Exporta o plano completo para uma planilha Excel
+    def exportar_excel(self, caminho=CAMINHO_EXCEL):
+        salvar_dados(self.carregar(), caminho)
+
+
+# Função para reaplicar as entradas do diário de alterações sobre o plano lido da planilha.
+# Uma inserção traz o registro completo e substitui a linha de mesmo ID, o que torna a reaplicação
+# idempotente: reaplicar o diário sobre uma planilha que já o incorporou dá o mesmo resultado.
+def reaplicar_diario(df, entradas):
+    novos = {}
+    alteracoes = {}
+    removidos = set()
+    for entrada in entradas:
+        id_acao = int(entrada['id'])
+        dados = {
+            coluna: (pd.Timestamp(valor) if coluna in COLUNAS_DATA and valor is not None else valor)
+            for coluna, valor in (entrada.get('dados') or {}).items() if coluna != COLUNA_ID
+        }
+        if entrada['operacao'] == 'inserir':
+            removidos.add(id_acao)
+            alteracoes.pop(id_acao, None)
+            novos[id_acao] = {**dados, COLUNA_ID: id_acao}
+        elif entrada['operacao'] == 'atualizar':
+            if id_acao in novos:
+                novos[id_acao].update(dados)
+            elif id_acao not in removidos:
+                alteracoes.setdefault(id_acao, {}).update(dados)
+        else:
+            removidos.add(id_acao)
+            novos.pop(id_acao, None)
+            alteracoes.pop(id_acao, None)
+
+    df = df[~df[COLUNA_ID].isin(list(removidos))].copy()
+    rotulos = dict(zip(df[COLUNA_ID], df.index))
+    for id_acao, campos in alteracoes.items():
+        rotulo = rotulos.get(id_acao)
+        if rotulo is None:
+            continue
+        for coluna, valor in campos.items():
+            if coluna not in df.columns:
+                df[coluna] = None
+            if coluna in COLUNAS_DATA:
+                valor = pd.NaT if valor is None else valor
+            elif df[coluna].dtype != object:
+                df[coluna] = df[coluna].astype(object)
+            df.at[rotulo, coluna] = valor
+    if novos:
+        df_novos = pd.DataFrame(list(novos.values()))
+        df = df_novos if df.empty else pd.concat([df, df_novos], ignore_index=True)
+        for coluna in COLUNAS_OBRIGATORIAS:
+            if coluna not in df.columns:
+                df[coluna] = None
+    return _tipar_colunas(df.reset_index(drop=True))
+
+
+# Armazenamento em planilha com diário de alterações (write-ahead). Cada gravação acrescenta linhas
+# ao diário (dados_projeto.diario.jsonl) em vez de reescrever a planilha; o plano atual é a planilha
+# com o diário reaplicado. Um compactador em segundo plano incorpora o diário à planilha quando ele
+# passa do tamanho ou da idade máxima, e as linhas incorporadas vão para o histórico.
+# Como no SQLite, quem grava deve ter a trava do arquivo (caminho_trava).
+class ArmazenamentoExcel(Armazenamento):
+    lote_atomico = True
+
+    def __init__(self, caminho=CAMINHO_EXCEL, tamanho_maximo_diario=TAMANHO_MAXIMO_DIARIO,
+                 idade_maxima_diario_s=IDADE_MAXIMA_DIARIO_S):
+        self.caminho = caminho
+        self.diario = DiarioAlteracoes(caminho)
+        self.tamanho_maximo_diario = tamanho_maximo_diario
+        self.idade_maxima_diario_s = idade_maxima_diario_s
+        self.compactador = Compactador(self.precisa_compactar, self.compactar)
+        self.compactacoes = 0
+        # Maior ID já atribuído, válido para a versão dos dados em que foi calculado
+        self._ultimo_id = None
+
+    # Versão dos dados: muda a cada linha acrescentada ao diário e a cada reescrita da planilha
+    def versao(self):
+        return (assinatura_arquivo(self.caminho), assinatura_arquivo(self.diario.caminho))
+
+    def carregar(self):
+        while True:
+            versao = self.versao()
+            df = cache_carga.obter(self.caminho, lambda: _garantir_ids(carregar_dados(self.caminho)))
+            entradas = self.diario.ler()
+            # Uma compactação no meio da leitura troca a planilha e o diário: lê de novo
+            if self.versao() == versao:
+                break
+        return _garantir_ids(reaplicar_diario(df, entradas)) if entradas else df
+
+    def inserir(self, registro):
+        return self.gravar_lote([('inserir', None, registro)])[0]
+
+    # Importação em lote: as ações entram no diário e, se ele passar do limite, a planilha é
+    # reescrita na hora (a importação já tem a trava do arquivo)
+    def inserir_lote(self, registros, autor=None):
+        ids = self.gravar_lote([('inserir', None, registro) for registro in registros], [autor] * len(registros))
+        if self.precisa_compactar():
+            self._incorporar_diario()
+        return ids
+
+    def atualizar(self, id_acao, campos):
+        self.gravar_lote([('atualizar', id_acao, campos)])
+
+    def apagar(self, id_acao):
+        self.gravar_lote([('apagar', id_acao, None)])
+
+    # O lote inteiro vira linhas acrescentadas ao diário em uma única escrita, com o autor de cada
+    # operação; a planilha não é reescrita
+    def gravar_lote(self, operacoes, autores=None):
+        lote = self.preparar_lote(operacoes, autores)
+        lote.confirmar()
+        return lote.resultados
+
+    # Calcula as chaves e as linhas do diário sem gravar nada; confirmar acrescenta as linhas ao diário
+    def preparar_lote(self, operacoes, autores=None):
+        versao = self.versao()
+        if self._ultimo_id is not None and self._ultimo_id[0] == versao:
+            maior_id = self._ultimo_id[1]
+        else:
+            df = self.carregar()
+            maior_id = int(df[COLUNA_ID].max()) if df.shape[0] > 0 else 0
+        entradas = []
+        resultados = []
+        for tipo, id_acao, dados in operacoes:
+            resultado = None
+            if tipo == 'inserir':
+                # Com o ID informado (ex.: ação movida de outra partição) a chave é mantida
+                if dados.get(COLUNA_ID) is not None and not pd.isna(dados[COLUNA_ID]):
+                    resultado = int(dados[COLUNA_ID])
+                    maior_id = max(maior_id, resultado)
+                else:
+                    maior_id += 1
+                    resultado = maior_id
+                entradas.append((tipo, resultado, {coluna: valor for coluna, valor in dados.items() if coluna != COLUNA_ID}))
+            elif tipo == 'atualizar':
+                entradas.append((tipo, id_acao, dados))
+            elif tipo == 'apagar':
+                entradas.append((tipo, id_acao, None))
+            else:
+                raise ValueError(f"Operação desconhecida: '{tipo}'")
+            resultados.append(resultado)
+
+        def confirmar():
+            self.diario.acrescentar(entradas, autores)
+            self._ultimo_id = (self.versao(), maior_id)
+            self.compactador.avisar()
+
+        return LotePreparado(resultados, confirmar, lambda: None)
+
+    def precisa_compactar(self):
+        tamanho = self.diario.tamanho()
+        return tamanho > 0 and (
+            tamanho >= self.tamanho_maximo_diario or self.diario.idade_s() >= self.idade_maxima_diario_s
+        )
+
+    def _trocar_planilha(self, df, temporario, tamanho):
+        _substituir_planilha(df, temporario, self.caminho)
+        self.diario.arquivar(tamanho)
+        self.compactacoes += 1
+
+    # Compactação com a trava já obtida por quem chama
+    def _incorporar_diario(self):
+        tamanho = self.diario.tamanho()
+        if tamanho:
+            df = self.carregar()
+            self._trocar_planilha(df, _planilha_temporaria(df, self.caminho), tamanho)
+
+    # Incorpora o diário à planilha e move as linhas incorporadas para o histórico. A planilha nova
+    # é escrita fora da trava, e as gravações feitas nesse meio tempo ficam no diário.
+    # Retorna False se não havia o que incorporar ou se a planilha mudou por fora durante a escrita.
+    def compactar(self):
+        with TravaArquivo(caminho_trava(self.caminho)):
+            tamanho = self.diario.tamanho()
+            if not tamanho:
+                return False
+            assinatura = assinatura_arquivo(self.caminho)
+            df = self.carregar()
+        temporario = _planilha_temporaria(df, self.caminho)
+        with TravaArquivo(caminho_trava(self.caminho)):
+            if assinatura_arquivo(self.caminho) != assinatura:
+                os.remove(temporario)
+                return False
+            self._trocar_planilha(df, temporario, tamanho)
+        return True
+
+    # Exportar para a própria planilha é uma compactação; para outro arquivo, uma cópia do plano atual
+    def exportar_excel(self, caminho=CAMINHO_EXCEL):
+        if os.path.abspath(caminho) == os.path.abspath(self.caminho):
+            self.compactar()
+        else:
+            salvar_dados(self.carregar(), caminho)
+
+
+# Função para converter um valor do pandas/streamlit em um valor aceito pelo SQLite
+def _valor_sql(coluna, valor):
+    if valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor)):
+        return None
+    if coluna == COLUNA_ID:
+        return int(valor)
+    if coluna in COLUNAS_DATA or isinstance(valor, (date, datetime, pd.Timestamp)):
+        return pd.Timestamp(valor).isoformat()
+    if isinstance(valor, (str, int, float)):
+        return valor
+    if hasattr(valor, 'item'):  # Escalares do numpy
+        return valor.item()
+    return str(valor)
+
+
+def _coluna_sql(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+# Armazenamento SQLite: cada ação é uma linha com chave primária e as gravações
+# (inserção, atualização e exclusão) alteram apenas a linha afetada, em transação.
+# Cada operação gravada também entra na tabela alteracoes (quando, autor, operação, ID e campos),
+# na mesma transação: é a trilha de auditoria, como o histórico do diário das planilhas.
+class ArmazenamentoSQLite(Armazenamento):
+    lote_atomico = True
+
+    def __init__(self, caminho=CAMINHO_SQLITE, caminho_excel=CAMINHO_EXCEL):
+        self.caminho = caminho
+        self.caminho_excel = caminho_excel
+        self._criar_tabelas()
+        self._migrar_excel()
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    def _criar_tabelas(self):
+        colunas = ', '.join(_coluna_sql(coluna) for coluna in COLUNAS_OBRIGATORIAS)
+        # O `with conexao` só confirma ou desfaz a transação; quem fecha a conexão é o closing
+        with closing(self._conectar()) as conexao:
+            with conexao:
+                conexao.execute(
+                    f'CREATE TABLE IF NOT EXISTS acoes ({COLUNA_ID} INTEGER PRIMARY KEY AUTOINCREMENT, {colunas})'
+                )
+                conexao.execute('CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT)')
+                conexao.execute(
+                    'CREATE TABLE IF NOT EXISTS alteracoes (quando TEXT, autor TEXT, operacao TEXT, id INTEGER, dados TEXT)'
+                )
+
+    def _migracao_excel(self, conexao):
+        return conexao.execute("SELECT valor FROM metadados WHERE chave = 'migracao_excel'").fetchone()
+
+    # Migração única: importa a planilha existente na primeira vez que o banco é criado.
+    # A conferência e a importação ficam na mesma transação exclusiva (BEGIN IMMEDIATE): dois
+    # processos iniciando juntos não importam a planilha duas vezes.
+    def _migrar_excel(self):
+        conexao = self._conectar()
+        try:
+            if self._migracao_excel(conexao) is not None:
+                return
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                if self._migracao_excel(conexao) is not None:
+                    conexao.rollback()
+                    return
+                if os.path.exists(self.caminho_excel):
+                    df = carregar_dados(self.caminho_excel)
+                    self._inserir_linhas(conexao, df.to_dict(orient='records'))
+                conexao.execute(
+                    "INSERT INTO metadados (chave, valor) VALUES ('migracao_excel', ?)",
+                    (datetime.now().isoformat(),)
+                )
+                conexao.commit()
+            except Exception:
+                conexao.rollback()
+                raise
+        finally:
+            conexao.close()
+        cache_carga.invalidar(self.caminho)
+
+    def _inserir_linhas(self, conexao, registros):
+        colunas = [COLUNA_ID] + COLUNAS_OBRIGATORIAS
+        sql = (
+            f"INSERT INTO acoes ({', '.join(_coluna_sql(c) for c in colunas)}) "
+            f"VALUES ({', '.join('?' for _ in colunas)})"
+        )
+        ids = []
+        for registro in registros:
+            cursor = conexao.execute(sql, tuple(_valor_sql(coluna, registro.get(coluna)) for coluna in colunas))
+            ids.append(cursor.lastrowid)
+        return ids
+
+    # Registra as operações (operação, ID, dados) na tabela de alterações, com o autor de cada uma
+    # (None ou vazio: a conta do servidor)
+    def _registrar_alteracoes(self, conexao, operacoes, autores=None):
+        quando = datetime.now().isoformat(timespec='milliseconds')
+        autores = autores or [None] * len(operacoes)
+        conexao.executemany(
+            'INSERT INTO alteracoes (quando, autor, operacao, id, dados) VALUES (?, ?, ?, ?, ?)',
+            [
+                (quando, autor or AUTOR, tipo, int(id_acao),
+                 None if dados is None else json.dumps(campos_json(dados), ensure_ascii=False))
+                for (tipo, id_acao, dados), autor in zip(operacoes, autores)
+            ]
+        )
+
+    # Alterações registradas, da mais antiga para a mais recente
+    def alteracoes(self):
+        with closing(self._conectar()) as conexao:
+            return pd.read_sql_query('SELECT * FROM alteracoes ORDER BY rowid', conexao)
+
+    def _ler_acoes(self):
+        conexao = self._conectar()
+        try:
+            df = pd.read_sql_query(f'SELECT * FROM acoes ORDER BY {COLUNA_ID}', conexao)
+        finally:
+            conexao.close()
+        for coluna in COLUNAS_DATA:
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+        df[COLUNA_ID] = df[COLUNA_ID].astype('int64')
+        return df
+
+    def carregar(self):
+        return cache_carga.obter(self.caminho, self._ler_acoes)
+
+    def inserir(self, registro):
+        return self.gravar_lote([('inserir', None, registro)])[0]
+
+    # Um lote inteiro é gravado em uma única transação
+    def inserir_lote(self, registros, autor=None):
+        registros = [{coluna: valor for coluna, valor in registro.items() if coluna != COLUNA_ID} for registro in registros]
+        with closing(self._conectar()) as conexao:
+            with conexao:
+                ids = self._inserir_linhas(conexao, registros)
+                self._registrar_alteracoes(
+                    conexao, [('inserir', id_acao, registro) for id_acao, registro in zip(ids, registros)], [autor] * len(ids)
+                )
+        cache_carga.invalidar(self.caminho)
+        return ids
+
+    def atualizar(self, id_acao, campos):
+        self.gravar_lote([('atualizar', id_acao, campos)])
+
+    def apagar(self, id_acao):
+        self.gravar_lote([('apagar', id_acao, None)])
+
+    def _executar(self, conexao, tipo, id_acao, dados):
+        if tipo == 'inserir':
+            # Sem o ID a chave vem do AUTOINCREMENT; com ele (ex.: ação movida de outra partição) é mantida
+            return self._inserir_linhas(conexao, [dados])[0]
+        if tipo == 'atualizar':
+            campos = {coluna: valor for coluna, valor in dados.items() if coluna in COLUNAS_OBRIGATORIAS}
+            if campos:
+                atribuicoes = ', '.join(f'{_coluna_sql(coluna)} = ?' for coluna in campos)
+                valores = [_valor_sql(coluna, valor) for coluna, valor in campos.items()]
+                conexao.execute(f'UPDATE acoes SET {atribuicoes} WHERE {COLUNA_ID} = ?', valores + [int(id_acao)])
+            return None
+        if tipo == 'apagar':
+            conexao.execute(f'DELETE FROM acoes WHERE {COLUNA_ID} = ?', (int(id_acao),))
+            return None
+        raise ValueError(f"Operação desconhecida: '{tipo}'")
+
+    # O lote inteiro é gravado em uma única transação, junto com as alterações registradas
+    def gravar_lote(self, operacoes, autores=None):
+        lote = self.preparar_lote(operacoes, autores)
+        lote.confirmar()
+        return lote.resultados
+
+    # Executa o lote em uma transação exclusiva (BEGIN IMMEDIATE) que fica aberta até confirmar
+    # (commit) ou desfazer (rollback); nos dois casos a conexão é fechada
+    def preparar_lote(self, operacoes, autores=None):
+        conexao = self._conectar()
+        try:
+            conexao.execute('BEGIN IMMEDIATE')
+            resultados = [self._executar(conexao, tipo, id_acao, dados) for tipo, id_acao, dados in operacoes]
+            self._registrar_alteracoes(conexao, [
+                (tipo, resultado if tipo == 'inserir' else id_acao, dados)
+                for (tipo, id_acao, dados), resultado in zip(operacoes, resultados)
+            ], autores)
+        except Exception:
+            conexao.rollback()
+            conexao.close()
+            raise
+
+        def confirmar():
+            try:
+                conexao.commit()
+            except Exception:
+                conexao.rollback()
+                raise
+            finally:
+                conexao.close()
+                cache_carga.invalidar(self.caminho)
+
+        def desfazer():
+            try:
+                conexao.rollback()
+            finally:
+                conexao.close()
+
+        return LotePreparado(resultados, confirmar, desfazer)
+
+
+# Função para criar o armazenamento configurado (variável de ambiente PLANO_ARMAZENAMENTO)
+def criar_armazenamento(tipo=None):
+    tipo = (tipo or os.environ.get('PLANO_ARMAZENAMENTO', 'sqlite')).lower()
+    if tipo == 'excel':
+        return ArmazenamentoExcel()
+    if tipo == 'sqlite':
+        return ArmazenamentoSQLite()
+    raise ValueError(f"Tipo de armazenamento desconhecido: '{tipo}'")
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+
+
+TOLERANCIA_PADRAO = 0.25
+
+
+def _indexar(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    return dados.get('metadados', {}), {
+        (resultado['benchmark'], resultado['linhas']): resultado for resultado in dados['resultados']
+    }
+
+
+# Função para comparar duas execuções e listar as regressões acima da tolerância (fração da mediana)
+def comparar(caminho_base, caminho_novo, tolerancia=TOLERANCIA_PADRAO):
+    meta_base, base = _indexar(caminho_base)
+    meta_novo, novo = _indexar(caminho_novo)
+
+    linhas, regressoes = [], []
+    for chave in sorted(base.keys() & novo.keys()):
+        antes = base[chave]['mediana_s']
+        depois = novo[chave]['mediana_s']
+        variacao = (depois - antes) / antes if antes else 0.0
+        linhas.append((chave[0], chave[1], antes, depois, variacao))
+        if variacao > tolerancia:
+            regressoes.append(chave)
+    return meta_base, meta_novo, linhas, regressoes
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument('base')
+    parser.add_argument('novo')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="Aumento máximo aceito da mediana (0.25 = 25%%)")
+    args = parser.parse_args(argumentos)
+
+    meta_base, meta_novo, linhas, regressoes = comparar(args.base, args.novo, args.tolerancia)
+    print(f"base: {meta_base.get('commit')}  novo: {meta_novo.get('commit')}")
+    for nome, n, antes, depois, variacao in linhas:
+        marca = '  REGRESSÃO' if (nome, n) in regressoes else ''
+        print(f"{nome:<30} {n:>9}  {antes * 1000:10.1f} ms -> {depois * 1000:10.1f} ms  {variacao:+7.1%}{marca}")
+
+    # Código de saída diferente de zero para bloquear o deploy em caso de regressão
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+# Benchmarks do plano de ação com dados sintéticos. Uso, a partir da raiz do projeto:
+#   python -m benchmarks.executar --tamanhos 1000 10000 100000 1000000 --saida novo.json
+#   python -m benchmarks.comparar base.json novo.json --tolerancia 0.25
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from api import PlanoPreparado, blocos_acoes
+from armazenamento import COLUNA_ID, ArmazenamentoExcel, ArmazenamentoSQLite, caminho_snapshot, carregar_dados, salvar_dados
+from benchmarks.gerador import gerar_plano
+from busca import IndiceBusca
+from cache_arquivos import cache_carga
+from calculo_status import calcular_status_vetorizado
+from curva_s import calcular_curva_s
+from dados_compartilhados import _atualizar_linhas
+from esquema import tipar_plano
+from exportacao import gerar_excel
+from graficos import figura_curva_s
+from intervalos import IndiceIntervalos
+from linhas_base import LinhasBase
+from particoes import ArmazenamentoParticionado, CatalogoParticoes, ResumoParticoes
+from semanas import IndiceSemanas, semana_relativa
+
+
+TAMANHOS_PADRAO = [1000, 10000, 100000]
+
+# Acima deste tamanho os benchmarks que gravam/leem .xlsx são pulados (levam minutos)
+LIMITE_EXCEL_PADRAO = 100000
+
+
+# Função para medir uma função: `repeticoes` execuções cronometradas, cada uma após `preparar` (não cronometrado)
+def cronometrar(funcao, repeticoes, preparar=None):
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _resultado(nome, linhas, tempos):
+    return {
+        'benchmark': nome,
+        'linhas': linhas,
+        'repeticoes': len(tempos),
+        'min_s': min(tempos),
+        'media_s': statistics.fmean(tempos),
+        'mediana_s': statistics.median(tempos),
+    }
+
+
+def _remover(caminho):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+# Benchmarks de um tamanho de plano; retorna a lista de resultados
+def executar_tamanho(n, repeticoes, limite_excel, pasta):
+    df = gerar_plano(n, semente=n)
+    hoje = pd.Timestamp(date.today())
+    resultados = []
+
+    def medir(nome, funcao, preparar=None, vezes=repeticoes):
+        resultados.append(_resultado(nome, n, cronometrar(funcao, vezes, preparar)))
+
+    medir('calcular_status_vetorizado', lambda: calcular_status_vetorizado(df, hoje))
+
+    medir('curva_s_diaria', lambda: calcular_curva_s(df))
+    medir('curva_s_semanal_percentual', lambda: calcular_curva_s(df, granularidade='Semanal', percentual=True))
+
+    # Figura da Curva S diária serializada como vai para o navegador
+    medir('figura_curva_s_json', lambda: figura_curva_s(
+        df, df['Inicio Plan'].min(), df['Fim Plan'].max(), granularidade='Diária', hoje=hoje
+    ).to_json())
+
+    def tabelas_semanais():
+        indice = IndiceSemanas(df)
+        for deslocamento in (-1, 0, 1):
+            df.iloc[indice.linhas(*semana_relativa(hoje.date(), deslocamento))]
+    medir('tabelas_semanais', tabelas_semanais)
+
+    # Índice de intervalos: construção e consulta das ações ativas em uma janela de 30 dias
+    indice_intervalos = IndiceIntervalos()
+    df_ids = df.assign(**{COLUNA_ID: np.arange(n)})
+    medir('intervalos_construir', lambda: indice_intervalos.reconstruir(df_ids, None))
+    medir('intervalos_janela_30_dias', lambda: indice_intervalos.ativos(hoje - pd.Timedelta(days=15), hoje + pd.Timedelta(days=15)))
+
+    # Edição em grade: 200 ações concluídas de uma vez aplicadas à versão em memória do plano
+    concluidas = {int(id_acao): {'Fim Real': hoje, 'Status': 'CONCLUÍDA'} for id_acao in df_ids[COLUNA_ID].iloc[:200]}
+    df_tipado = tipar_plano(df_ids)
+    medir('plano_atualizar_200', lambda: _atualizar_linhas(df_tipado, concluidas))
+
+    # Índice de busca no texto livre: construção e uma consulta com prefixo em duas palavras
+    indice_busca = IndiceBusca()
+    medir('busca_construir', lambda: indice_busca.reconstruir(df_ids, None))
+    medir('busca_consulta', lambda: indice_busca.buscar('acao observ'))
+
+    # API de leitura: preparação do plano (Status do dia, semanas e índices) e a lista completa em JSON
+    medir('api_preparar', lambda: PlanoPreparado(df_ids, hoje.date()))
+    preparado = PlanoPreparado(df_ids, hoje.date())
+    todas = np.arange(n)
+    medir('api_acoes_json', lambda: sum(len(bloco) for bloco in blocos_acoes(preparado.df, todas, 'json', {})))
+
+    # Linhas de base: 52 versões semanais (2% das datas de término mudam a cada semana)
+    # e a reconstrução da última em um processo que ainda não reconstruiu nenhuma
+    historico = LinhasBase(os.path.join(pasta, f'linhas_base_{n}'))
+    gerador_semanas = np.random.default_rng(n)
+    df_semana = df_ids
+    for semana in range(1, 53):
+        historico.salvar(f'Semana {semana}', df_semana)
+        mudar = gerador_semanas.random(n) < 0.02
+        df_semana = df_semana.assign(**{'Fim Plan': df_semana['Fim Plan'].mask(mudar, df_semana['Fim Plan'] + pd.Timedelta(days=7))})
+    medir('linha_base_reconstruir_52', lambda: LinhasBase(historico.pasta).reconstruir(52))
+
+    # Armazenamento SQLite: carga inicial em lote e leitura completa
+    caminho_db = os.path.join(pasta, f'plano_{n}.db')
+    registros = df.to_dict(orient='records')
+
+    def novo_banco():
+        _remover(caminho_db)
+        return ArmazenamentoSQLite(caminho_db, caminho_excel=os.path.join(pasta, 'inexistente.xlsx'))
+
+    banco = {}
+    medir('sqlite_inserir_lote', lambda: banco['atual'].inserir_lote(registros),
+          preparar=lambda: banco.update(atual=novo_banco()), vezes=1)
+    medir('sqlite_carregar', lambda: banco['atual']._ler_acoes())
+
+    # Armazenamento particionado (SQLite por Corpo): carga de um Corpo e do site inteiro, e os totais
+    # do site a partir dos resumos gravados, sem carregar as partições
+    pasta_sites = os.path.join(pasta, f'sites_{n}')
+    CatalogoParticoes(pasta_sites).criar_site('Benchmark')
+    site = ArmazenamentoParticionado('Benchmark', tipo='sqlite', pasta=pasta_sites)
+    site.inserir_lote(registros)
+    ResumoParticoes(site).sincronizar(site.carregar, site.versao())
+    um_corpo = ArmazenamentoParticionado('Benchmark', [site.corpos[0]], tipo='sqlite', pasta=pasta_sites)
+    medir('particionado_carregar_1_corpo', um_corpo.carregar, preparar=cache_carga.invalidar)
+    medir('particionado_carregar_site', site.carregar, preparar=cache_carga.invalidar)
+    medir('particionado_totais', site.totais)
+
+    if n <= limite_excel:
+        caminho_xlsx = os.path.join(pasta, f'plano_{n}.xlsx')
+        medir('salvar_dados_xlsx', lambda: salvar_dados(df, caminho_xlsx), vezes=1)
+
+        def sem_snapshot():
+            _remover(caminho_snapshot(caminho_xlsx))
+            cache_carga.invalidar()
+        medir('carregar_dados_xlsx', lambda: carregar_dados(caminho_xlsx), preparar=sem_snapshot, vezes=1)
+        medir('carregar_dados_parquet', lambda: carregar_dados(caminho_xlsx))
+
+        medir('download_excel', lambda: gerar_excel(df), vezes=1)
+
+        # Planilha com diário de alterações: uma edição é uma linha acrescentada ao diário
+        # e a carga reaplica o diário sobre a planilha
+        planilha = ArmazenamentoExcel(caminho_xlsx)
+        medir('excel_diario_atualizar', lambda: planilha.atualizar(1, {'Acao': 'Ação editada'}))
+        medir('excel_diario_carregar', planilha.carregar)
+        _remover(planilha.diario.caminho)
+
+    _remover(caminho_db)
+    return resultados
+
+
+# Metadados que identificam a execução (commit, versões e máquina) para comparar resultados
+def metadados():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do Sistema de Gestão - Plano de Ação")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help="Quantidades de ações a gerar (ex.: 1000 10000 100000 1000000)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--limite-excel', type=int, default=LIMITE_EXCEL_PADRAO,
+                        help="Maior tamanho em que os benchmarks de .xlsx são executados")
+    parser.add_argument('--saida', default='resultados_benchmark.json')
+    args = parser.parse_args(argumentos)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for n in args.tamanhos:
+            for resultado in executar_tamanho(n, args.repeticoes, args.limite_excel, pasta):
+                print(f"{resultado['benchmark']:<30} {n:>9} linhas  mediana {resultado['mediana_s'] * 1000:10.1f} ms")
+                resultados.append(resultado)
+
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump({'metadados': metadados(), 'resultados': resultados}, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.saida}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
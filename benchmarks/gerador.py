@@ -0,0 +1,69 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNAS_OBRIGATORIAS
+from calculo_status import calcular_status_vetorizado
+from referencias import CORPOS_PADRAO, NIVEIS, carregar_mapeamento_area_responsavel
+
+
+LOCAIS = ['Rampa', 'Galeria', 'Subestação', 'Oficina', 'Paiol', 'Poço', 'Acesso', 'Travessa']
+IMPACTOS = ['Alto', 'Médio', 'Baixo']
+RESULTADOS = ['SIM', 'NÃO']
+
+
+# Função para gerar um plano de ação sintético com n ações.
+# As distribuições imitam o plano real: início planejado espalhado em dois anos em torno de hoje,
+# durações curtas com cauda longa, execução real só para ações já iniciadas, ~15% de
+# reprogramações e campos vazios (incluindo ~3% de ações sem início planejado).
+def gerar_plano(n, semente=0, hoje=None, mapeamento=None, corpos=None):
+    rng = np.random.default_rng(semente)
+    hoje = pd.Timestamp(hoje or date.today())
+    mapeamento = mapeamento or carregar_mapeamento_area_responsavel()
+    corpos = corpos or CORPOS_PADRAO
+
+    areas = np.array(list(mapeamento.keys()), dtype=object)
+    area = areas[rng.integers(0, areas.size, n)]
+
+    dias = pd.to_timedelta
+    inicio_plan = hoje + dias(rng.integers(-365, 365, n), unit='D')
+    duracao = np.minimum(rng.lognormal(mean=1.5, sigma=0.9, size=n).astype('int64'), 180)
+    fim_plan = inicio_plan + dias(duracao, unit='D')
+
+    # Execução real: apenas para ações com início planejado no passado, com atraso ou adiantamento
+    iniciada = (inicio_plan < hoje) & (rng.random(n) < 0.8)
+    inicio_real = inicio_plan + dias(rng.normal(2, 5, n).round().astype('int64'), unit='D')
+    fim_real = inicio_real + dias((duracao * rng.uniform(0.7, 1.6, n)).astype('int64'), unit='D')
+    concluida = iniciada & (fim_real < hoje) & (rng.random(n) < 0.85)
+
+    # Reprogramações: deslocam o fim planejado para frente
+    reprogramada = rng.random(n) < 0.15
+    inicio_repro = inicio_plan + dias(rng.integers(7, 90, n), unit='D')
+    fim_repro = inicio_repro + dias(duracao, unit='D')
+
+    sem_inicio = rng.random(n) < 0.03
+    sem_fim = rng.random(n) < 0.05
+
+    df = pd.DataFrame({
+        'Area': area,
+        'Local': np.array(LOCAIS, dtype=object)[rng.integers(0, len(LOCAIS), n)],
+        'Acao': [f'Ação sintética {i}' for i in range(n)],
+        'Corpo': np.array(corpos, dtype=object)[rng.integers(0, len(corpos), n)],
+        'Nível': np.array(NIVEIS, dtype=object)[rng.integers(0, len(NIVEIS), n)],
+        'Impacto': np.where(rng.random(n) < 0.4, np.array(IMPACTOS, dtype=object)[rng.integers(0, 3, n)], None),
+        'Responsavel': pd.Series(area).map(mapeamento).to_numpy(),
+        'Inicio Plan': inicio_plan.where(~sem_inicio),
+        'Fim Plan': fim_plan.where(~(sem_inicio | sem_fim)),
+        'Inicio Real': inicio_real.where(iniciada),
+        'Fim Real': fim_real.where(concluida),
+        'Inicio(REPRO)': inicio_repro.where(reprogramada),
+        'Fim(REPRO)': fim_repro.where(reprogramada),
+        'Observações': np.where(rng.random(n) < 0.2, 'Observação de campo', None),
+        'Nota de Trabalho': np.where(rng.random(n) < 0.3, [f'NT{i:07d}' for i in range(n)], None),
+        'O resultado esperado foi alcançado?': np.where(concluida, np.array(RESULTADOS, dtype=object)[rng.integers(0, 2, n)], None),
+        'Se não, o que será feito?': None,
+        'Classificação Impacto': None,
+    })
+    df['Status'] = calcular_status_vetorizado(df, hoje)
+    return df[COLUNAS_OBRIGATORIAS]
@@ -0,0 +1,197 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+import pandas as pd
+
+from armazenamento import COLUNA_ID
+
+
+# Campos de texto livre pesquisáveis e o peso de cada um na pontuação
+CAMPOS_BUSCA = {
+    'Acao': 3.0,
+    'Nota de Trabalho': 2.0,
+    'Observações': 1.0,
+    'O resultado esperado foi alcançado?': 1.0,
+    'Se não, o que será feito?': 1.0,
+}
+
+# Palavras muito comuns em português, ignoradas no índice e na consulta
+PALAVRAS_VAZIAS = {
+    'a', 'ao', 'aos', 'as', 'com', 'da', 'das', 'de', 'do', 'dos', 'e', 'em', 'na', 'nas', 'no', 'nos',
+    'o', 'os', 'ou', 'para', 'pela', 'pelo', 'por', 'que', 'se', 'um', 'uma',
+}
+
+# Peso de um termo encontrado por prefixo em relação ao termo exato
+PESO_PREFIXO = 0.5
+
+# Prefixos menores que isto só casam com o termo exato (evita expandir para metade do vocabulário)
+TAMANHO_MINIMO_PREFIXO = 2
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+# Função para normalizar um texto: minúsculas e sem acentos ("Manutenção" -> "manutencao")
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return texto.encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def _termos(tokens):
+    return [token for token in tokens if token not in PALAVRAS_VAZIAS]
+
+
+# Função para separar um texto em termos normalizados
+def tokenizar(texto):
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return []
+    return _termos(_TOKEN.findall(normalizar(texto)))
+
+
+# Função para calcular os termos de um registro e o peso de cada um (frequência x peso do campo)
+def termos_registro(registro):
+    pesos = Counter()
+    for campo, peso in CAMPOS_BUSCA.items():
+        for termo in tokenizar(registro.get(campo)):
+            pesos[termo] += peso
+    return pesos
+
+
+# Mesma tokenização de tokenizar, aplicada à coluna inteira de uma vez
+def _tokenizar_coluna(coluna):
+    texto = coluna.astype(pd.StringDtype()).fillna('')
+    texto = texto.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+    return texto.str.findall(_TOKEN)
+
+
+# Índice invertido dos campos de texto livre: termo -> {ID da ação: peso}.
+# A consulta é normalizada do mesmo jeito (sem acentos, minúsculas); cada palavra da consulta casa
+# com o termo exato ou com os termos que começam com ela (vocabulário ordenado + busca binária), e a
+# ação precisa conter todas as palavras. A pontuação soma peso x idf de cada termo encontrado.
+# Como os agregados do painel, o índice é mantido por deltas a cada gravação, edição ou exclusão.
+class IndiceBusca:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.reconstrucoes = 0
+        self._postings = {}
+        self._vocabulario = []
+        self._vocabulario_ordenado = True
+        self._documentos = 0
+
+    def reconstruir(self, df, versao):
+        postings = {}
+        ids = df[COLUNA_ID].tolist()
+        for campo, peso in CAMPOS_BUSCA.items():
+            if campo not in df.columns:
+                continue
+            for id_acao, tokens in zip(ids, _tokenizar_coluna(df[campo])):
+                for termo in _termos(tokens):
+                    documentos = postings.setdefault(termo, {})
+                    documentos[id_acao] = documentos.get(id_acao, 0.0) + peso
+        with self._trava:
+            self._postings = postings
+            self._vocabulario = sorted(postings)
+            self._vocabulario_ordenado = True
+            self._documentos = len(ids)
+            self.versao = versao
+            self.reconstrucoes += 1
+
+    # Garante que o índice corresponde à versão dos dados
+    def sincronizar(self, carregar_df, versao):
+        with self._trava:
+            atualizado = self.versao == versao
+        if not atualizado:
+            self.reconstruir(carregar_df(), versao)
+        return self
+
+    def _remover(self, id_acao, termos):
+        for termo in termos:
+            documentos = self._postings.get(termo)
+            if documentos is None:
+                continue
+            documentos.pop(id_acao, None)
+            if not documentos:
+                del self._postings[termo]
+                self._vocabulario_ordenado = False
+
+    def _incluir(self, id_acao, termos):
+        for termo, peso in termos.items():
+            documentos = self._postings.get(termo)
+            if documentos is None:
+                documentos = self._postings[termo] = {}
+                self._vocabulario_ordenado = False
+            documentos[id_acao] = peso
+
+    # Aplica a diferença de uma gravação: antigo=None para inclusão, novo=None para exclusão.
+    # Se o índice não estava na versão anterior à gravação, ele é marcado para reconstrução.
+    def aplicar(self, antigo, novo, versao_antes, versao_depois):
+        with self._trava:
+            if self.versao != versao_antes:
+                self.versao = None
+                return
+            if antigo is not None:
+                self._remover(int(antigo[COLUNA_ID]), termos_registro(antigo))
+                self._documentos -= 1
+            if novo is not None:
+                self._incluir(int(novo[COLUNA_ID]), termos_registro(novo))
+                self._documentos += 1
+            self.versao = versao_depois
+
+    def invalidar(self):
+        with self._trava:
+            self.versao = None
+
+    # Termos do vocabulário que começam com a palavra (o vocabulário é reordenado só quando mudou)
+    def _expandir(self, palavra):
+        if len(palavra) < TAMANHO_MINIMO_PREFIXO:
+            return [palavra] if palavra in self._postings else []
+        if not self._vocabulario_ordenado:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_ordenado = True
+        termos = []
+        for posicao in range(bisect_left(self._vocabulario, palavra), len(self._vocabulario)):
+            termo = self._vocabulario[posicao]
+            if not termo.startswith(palavra):
+                break
+            termos.append(termo)
+        return termos
+
+    # Função para buscar as ações que contêm todas as palavras da consulta (ou prefixos delas).
+    # Retorna [(ID, pontuação)] da mais relevante para a menos relevante.
+    def buscar(self, consulta, limite=None):
+        palavras = list(dict.fromkeys(tokenizar(consulta)))
+        if not palavras:
+            return []
+        pontuacao = None
+        with self._trava:
+            expansoes = [(palavra, self._expandir(palavra)) for palavra in palavras]
+            # As palavras mais raras primeiro: a interseção encolhe mais cedo
+            expansoes.sort(key=lambda expansao: sum(len(self._postings[termo]) for termo in expansao[1]))
+            for palavra, termos in expansoes:
+                da_palavra = {}
+                for termo in termos:
+                    documentos = self._postings[termo]
+                    idf = math.log(1 + self._documentos / len(documentos))
+                    fator = idf * (1.0 if termo == palavra else PESO_PREFIXO)
+                    for id_acao, peso in documentos.items():
+                        if pontuacao is None or id_acao in pontuacao:
+                            da_palavra[id_acao] = da_palavra.get(id_acao, 0.0) + peso * fator
+                if pontuacao is not None:
+                    da_palavra = {id_acao: pontuacao[id_acao] + valor for id_acao, valor in da_palavra.items()}
+                pontuacao = da_palavra
+                if not pontuacao:
+                    return []
+        if limite is None:
+            return sorted(pontuacao.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(limite, pontuacao.items(), key=lambda item: item[1])
+
+    # Tamanho do índice (termos distintos e ações indexadas)
+    def estatisticas(self):
+        with self._trava:
+            return {'termos': len(self._postings), 'acoes': self._documentos}
+
@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Função para obter a assinatura de um arquivo (mtime e tamanho); None se ele não existir
+def assinatura_arquivo(caminho):
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+# DataFrames saem como cópia rasa (as colunas são compartilhadas e copiadas só se alteradas); os
+# demais valores saem como estão em cache
+def _copiar(valor):
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=False)
+    return valor
+
+
+# Cache de carga de arquivos, válido para todo o processo (sobrevive aos reruns do Streamlit).
+# Cada entrada é indexada pelo caminho absoluto e guarda a assinatura (mtime, tamanho) do
+# arquivo no momento da leitura; enquanto a assinatura não muda o arquivo não é lido de novo.
+# Os valores são compartilhados entre as sessões e não devem ser alterados no lugar: quem precisa
+# alterar (ex.: um dicionário antes de gravá-lo de volta) altera uma cópia.
+class CacheArquivos:
+    def __init__(self):
+        self._entradas = {}
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    # Retorna o conteúdo em cache ou chama o carregador se o arquivo mudou
+    def obter(self, caminho, carregador):
+        chave = os.path.abspath(caminho)
+        assinatura = assinatura_arquivo(chave)
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == assinatura:
+                self.acertos += 1
+                return _copiar(entrada[1])
+            self.falhas += 1
+
+        valor = carregador()
+        with self._trava:
+            self._entradas[chave] = (assinatura, valor)
+        return _copiar(valor)
+
+    # Descarta a entrada de um arquivo (ou todas, se nenhum caminho for informado)
+    def invalidar(self, caminho=None):
+        with self._trava:
+            if caminho is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(os.path.abspath(caminho), None)
+
+    def estatisticas(self):
+        with self._trava:
+            return {'acertos': self.acertos, 'falhas': self.falhas, 'entradas': len(self._entradas)}
+
+
+# Instância compartilhada por todas as sessões do processo
+cache_carga = CacheArquivos()
+
+
+# Versões guardadas de cada cálculo (ex.: as duas últimas versões do plano e as opções mais usadas)
+LIMITE_POR_CALCULO = 4
+
+
+# Cache de cálculos derivados do plano (tabelas de exibição, linhas de base, figuras), válido para
+# todo o processo: sessões que pedem o mesmo cálculo com a mesma chave (versão dos dados, dia e
+# opções) recebem o mesmo objeto, sem uma cópia por sessão. Os valores são compartilhados e não
+# devem ser alterados no lugar. Cada cálculo guarda as LIMITE_POR_CALCULO chaves usadas mais recentemente.
+class CacheCalculos:
+    def __init__(self, limite_por_calculo=LIMITE_POR_CALCULO):
+        self.limite_por_calculo = limite_por_calculo
+        self._calculos = {}
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, nome, chave, calcular):
+        with self._trava:
+            entradas = self._calculos.setdefault(nome, OrderedDict())
+            if chave in entradas:
+                entradas.move_to_end(chave)
+                self.acertos += 1
+                return entradas[chave]
+            self.falhas += 1
+
+        # Calculado fora da trava: um cálculo lento não bloqueia os outros
+        valor = calcular()
+        with self._trava:
+            entradas[chave] = valor
+            while len(entradas) > self.limite_por_calculo:
+                entradas.popitem(last=False)
+        return valor
+
+    def estatisticas(self):
+        with self._trava:
+            return {'acertos': self.acertos, 'falhas': self.falhas, 'entradas': sum(len(entradas) for entradas in self._calculos.values())}
+
+
+# Instância compartilhada por todas as sessões do processo
+cache_calculos = CacheCalculos()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+# Função para calcular status automaticamente
+def calcular_status(inicio_real, fim_real, inicio_plan, fim_plan, inicio_repro=None, fim_repro=None, hoje=None):
+    hoje = pd.to_datetime(hoje if hoje is not None else datetime.now().date())
+
+    # Certifique-se de que as entradas sejam do tipo Timestamp
+    inicio_plan = pd.to_datetime(inicio_plan) if pd.notna(inicio_plan) else pd.NaT
+    fim_plan = pd.to_datetime(fim_plan) if pd.notna(fim_plan) else pd.NaT
+    inicio_real = pd.to_datetime(inicio_real) if pd.notna(inicio_real) else pd.NaT
+    fim_real = pd.to_datetime(fim_real) if pd.notna(fim_real) else pd.NaT
+    inicio_repro = pd.to_datetime(inicio_repro) if pd.notna(inicio_repro) else pd.NaT
+    fim_repro = pd.to_datetime(fim_repro) if pd.notna(fim_repro) else pd.NaT
+
+    # Verifica se o campo de início planejado está vazio
+    if pd.isna(inicio_plan):
+        return "_"
+    # Atrasada: Início planejado é menor que hoje e fim planejado está vazio
+    if pd.isna(fim_plan) and inicio_plan < hoje:
+        return "ATRASADA"
+    # Programada: Início planejado é maior que hoje
+    elif (pd.isna(fim_plan) and inicio_plan > hoje) or (not pd.isna(fim_plan) and fim_plan > hoje):
+        return "PROGRAMADA"
+    # Concluída: Fim real não está vazio
+    elif not pd.isna(fim_real):
+        return "CONCLUÍDA"
+    # Em andamento: Fim real não está vazio e início real é menor que hoje
+    elif not pd.isna(fim_real) and inicio_real <= hoje:
+        return "EM ANDAMENTO"
+    # Atrasada: Se o início real estiver vazio e a data final planejada estiver no passado
+    elif pd.isna(fim_real) and fim_plan < hoje:
+        return "ATRASADA"
+    # Em andamento: Qualquer outro caso
+    return "EM ANDAMENTO"
+
+
+# Função para calcular o status de todas as linhas de uma vez, com máscaras booleanas.
+# Produz exatamente os mesmos rótulos que calcular_status aplicada linha a linha.
+def calcular_status_vetorizado(df, hoje=None):
+    hoje = pd.to_datetime(hoje if hoje is not None else datetime.now().date())
+
+    inicio_plan = pd.to_datetime(df['Inicio Plan'], errors='coerce')
+    fim_plan = pd.to_datetime(df['Fim Plan'], errors='coerce')
+    fim_real = pd.to_datetime(df['Fim Real'], errors='coerce')
+
+    sem_inicio_plan = inicio_plan.isna().to_numpy()
+    sem_fim_plan = fim_plan.isna().to_numpy()
+    com_fim_real = fim_real.notna().to_numpy()
+    # Comparações com NaT resultam em False, como nas comparações escalares
+    inicio_antes = (inicio_plan < hoje).to_numpy()
+    inicio_depois = (inicio_plan > hoje).to_numpy()
+    fim_antes = (fim_plan < hoje).to_numpy()
+    fim_depois = (fim_plan > hoje).to_numpy()
+
+    # A ordem das condições reproduz a cadeia de if/elif de calcular_status
+    condicoes = [
+        sem_inicio_plan,
+        sem_fim_plan & inicio_antes,
+        (sem_fim_plan & inicio_depois) | fim_depois,
+        com_fim_real,
+        fim_antes,
+    ]
+    rotulos = ["_", "ATRASADA", "PROGRAMADA", "CONCLUÍDA", "ATRASADA"]
+
+    return pd.Series(np.select(condicoes, rotulos, default="EM ANDAMENTO"), index=df.index, dtype=object)
@@ -0,0 +1 @@
+# A raiz do projeto entra no sys.path dos testes (os módulos ficam no nível de cima, sem pacote)
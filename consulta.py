@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNA_ID
+from cache_arquivos import cache_calculos
+
+
+# Colunas com filtro por valor e colunas com filtro por intervalo de datas na tabela
+COLUNAS_FILTRO = ['Area', 'Status', 'Corpo', 'Nível', 'Responsavel']
+COLUNAS_FILTRO_DATA = ['Inicio Plan', 'Fim Plan', 'Inicio Real', 'Fim Real', 'Inicio(REPRO)', 'Fim(REPRO)']
+
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+
+
+# Função para agrupar as posições das linhas por valor (vazio -> '').
+# Colunas categóricas (esquema do plano) são agrupadas pelos códigos, sem comparar textos.
+def _posicoes_por_valor(coluna):
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        codigos = coluna.cat.codes.to_numpy()
+        categorias = [str(categoria) for categoria in coluna.cat.categories] + ['']
+        return {
+            categorias[codigo]: np.asarray(posicoes)
+            for codigo, posicoes in pd.Series(codigos).groupby(codigos).indices.items()
+        }
+    chaves = coluna.astype(object).where(coluna.notna(), '').astype(str).to_numpy()
+    return {
+        valor: np.asarray(posicoes)
+        for valor, posicoes in pd.Series(chaves).groupby(chaves).indices.items()
+    }
+
+
+# Índices pré-calculados sobre um DataFrame para filtrar, ordenar e paginar sem varrer o frame:
+# - valor -> posições das linhas, para as colunas de filtro por valor
+# - datas ordenadas + posições correspondentes, para os filtros por intervalo
+# - ordem global de cada coluna (calculada na primeira vez que a coluna é ordenada)
+class IndiceConsulta:
+    def __init__(self, df):
+        self.df = df
+        self.total = df.shape[0]
+        self.valores = {}
+        self.datas = {}
+        self._ordens = {}
+        self._posicoes_id = None
+        self._trava = threading.Lock()
+
+        for coluna in COLUNAS_FILTRO:
+            if coluna in df.columns:
+                self.valores[coluna] = _posicoes_por_valor(df[coluna])
+
+        for coluna in COLUNAS_FILTRO_DATA:
+            if coluna in df.columns:
+                datas = pd.to_datetime(df[coluna], errors='coerce').to_numpy(dtype='datetime64[ns]')
+                validas = np.flatnonzero(~np.isnat(datas))
+                ordem = validas[np.argsort(datas[validas], kind='stable')]
+                self.datas[coluna] = (datas[ordem], ordem)
+
+    # Valores disponíveis em uma coluna de filtro, para popular os seletores
+    def opcoes(self, coluna):
+        return sorted(valor for valor in self.valores.get(coluna, {}) if valor != '')
+
+    # Limites (mínimo e máximo) de uma coluna de data
+    def limites(self, coluna):
+        datas, _ = self.datas.get(coluna, (np.array([], dtype='datetime64[ns]'), None))
+        if datas.size == 0:
+            return None, None
+        return pd.Timestamp(datas[0]), pd.Timestamp(datas[-1])
+
+    # Função para aplicar os filtros e retornar uma máscara booleana das linhas selecionadas.
+    # filtros_valor: {coluna: [valores]}; filtros_data: {coluna: (início, fim)}
+    def filtrar(self, filtros_valor=None, filtros_data=None):
+        mascara = np.ones(self.total, dtype=bool)
+
+        for coluna, selecionados in (filtros_valor or {}).items():
+            if not selecionados:
+                continue
+            indice = self.valores.get(coluna, {})
+            filtro = np.zeros(self.total, dtype=bool)
+            for valor in selecionados:
+                posicoes = indice.get(str(valor))
+                if posicoes is not None:
+                    filtro[posicoes] = True
+            mascara &= filtro
+
+        for coluna, (inicio, fim) in (filtros_data or {}).items():
+            datas, ordem = self.datas[coluna]
+            esquerda = 0 if inicio is None else np.searchsorted(datas, np.datetime64(pd.Timestamp(inicio), 'ns'), side='left')
+            direita = datas.size if fim is None else np.searchsorted(datas, np.datetime64(pd.Timestamp(fim), 'ns'), side='right')
+            filtro = np.zeros(self.total, dtype=bool)
+            filtro[ordem[esquerda:direita]] = True
+            mascara &= filtro
+
+        return mascara
+
+    def _ordem(self, coluna):
+        with self._trava:
+            if coluna not in self._ordens:
+                valores = self.df[coluna].reset_index(drop=True)
+                try:
+                    ordenados = valores.sort_values(kind='stable', na_position='last')
+                except TypeError:
+                    # Colunas com tipos misturados (ex.: número e texto) são ordenadas como texto
+                    ordenados = valores.where(valores.isna(), valores.astype(str)).sort_values(kind='stable', na_position='last')
+                # Valores vazios vão para o fim, independentemente do sentido da ordenação
+                self._ordens[coluna] = (valores.notna().to_numpy(), ordenados.index.to_numpy())
+            return self._ordens[coluna]
+
+    # Função para converter IDs de ações em posições das linhas (IDs ausentes são descartados)
+    def posicoes(self, ids):
+        with self._trava:
+            if self._posicoes_id is None:
+                self._posicoes_id = pd.Index(self.df[COLUNA_ID].to_numpy())
+        posicoes = self._posicoes_id.get_indexer(np.asarray(ids, dtype=np.int64))
+        return posicoes[posicoes >= 0]
+
+    # Função para retornar as posições da página solicitada, já ordenadas. `ordem_padrao` é uma ordem
+    # pronta de posições (ex.: relevância da busca), usada quando não há coluna de ordenação.
+    def paginar(self, mascara, ordenar_por=None, crescente=True, pagina=1, tamanho=TAMANHOS_PAGINA[0], ordem_padrao=None):
+        if ordenar_por is None and ordem_padrao is not None:
+            posicoes = ordem_padrao[mascara[ordem_padrao]]
+        elif ordenar_por is None:
+            posicoes = np.flatnonzero(mascara)
+        else:
+            preenchidos, ordem = self._ordem(ordenar_por)
+            ordem = ordem[mascara[ordem]]
+            if not crescente:
+                cheios = ordem[preenchidos[ordem]]
+                vazios = ordem[~preenchidos[ordem]]
+                ordem = np.concatenate([cheios[::-1], vazios])
+            posicoes = ordem
+
+        total = posicoes.size
+        inicio = (max(pagina, 1) - 1) * tamanho
+        return posicoes[inicio:inicio + tamanho], total
+
+
+# Função para obter o índice de uma versão dos dados, construindo-o apenas uma vez por versão.
+# A versão é única por plano compartilhado (site e partições selecionadas), então sessões com
+# seleções diferentes não descartam o índice umas das outras: o cache guarda as versões usadas
+# mais recentemente (LIMITE_POR_CALCULO).
+def obter_indice(df, versao):
+    return cache_calculos.obter('indice_consulta', versao, lambda: IndiceConsulta(df))
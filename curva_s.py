@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+
+# Séries da Curva S e a coluna de data de término que alimenta cada uma
+SERIES_CURVA_S = {
+    'Planejado': 'Fim Plan',
+    'Real': 'Fim Real',
+    'Reprogramado': 'Fim(REPRO)',
+}
+
+# Granularidades suportadas (rótulo exibido -> frequência de período do pandas)
+GRANULARIDADES = {
+    'Diária': 'D',
+    'Semanal': 'W-SUN',
+    'Mensal': 'M',
+}
+
+
+# Função para ordenar uma coluna de datas uma única vez, descartando valores vazios
+def _datas_ordenadas(coluna):
+    datas = pd.to_datetime(coluna, errors='coerce').dropna()
+    return np.sort(datas.to_numpy(dtype='datetime64[ns]'))
+
+
+# Função para gerar as datas de fechamento de cada período entre início e fim
+def gerar_datas_curva(data_inicio, data_fim, granularidade='D'):
+    frequencia = GRANULARIDADES.get(granularidade, granularidade)
+    if frequencia == 'D':
+        return pd.date_range(start=data_inicio, end=data_fim)
+    periodos = pd.period_range(start=data_inicio, end=data_fim, freq=frequencia)
+    return periodos.to_timestamp(how='end').normalize()
+
+
+# Função para contar quantas datas de uma coluna são menores ou iguais a cada data informada
+def contar_acumulado(datas_ordenadas, datas):
+    alvo = pd.DatetimeIndex(datas).to_numpy(dtype='datetime64[ns]')
+    return np.searchsorted(datas_ordenadas, alvo, side='right')
+
+
+# Função para calcular a Curva S (contagem cumulativa de términos por período).
+# Cada coluna de término é ordenada uma vez e as contagens saem de searchsorted,
+# em O(n log n + períodos) no lugar de uma varredura do DataFrame por dia.
+def calcular_curva_s(df, data_inicio=None, data_fim=None, granularidade='D', percentual=False):
+    if data_inicio is None:
+        data_inicio = pd.to_datetime(df['Inicio Plan'], errors='coerce').min()
+    if data_fim is None:
+        data_fim = pd.to_datetime(df['Fim Plan'], errors='coerce').max()
+    if pd.isna(data_inicio) or pd.isna(data_fim):
+        return pd.DataFrame(columns=list(SERIES_CURVA_S.keys()), dtype=float)
+
+    datas = gerar_datas_curva(data_inicio, data_fim, granularidade)
+    curva = pd.DataFrame(index=datas)
+    curva.index.name = 'Data'
+
+    for nome, coluna in SERIES_CURVA_S.items():
+        curva[nome] = contar_acumulado(_datas_ordenadas(df[coluna]), datas)
+
+    if percentual:
+        total = df.shape[0]
+        curva = curva * 100.0 / total if total else curva.astype(float)
+
+    return curva
+
+
+# Função para calcular a série planejada de uma linha de base (ID, Inicio Plan, Fim Plan) nas datas
+# da Curva S do plano atual; em percentual, sobre o total de ações da linha de base
+def curva_linha_base(linha_base, datas, percentual=False):
+    serie = pd.Series(contar_acumulado(_datas_ordenadas(linha_base['Fim Plan']), datas), index=datas, dtype=float)
+    if percentual:
+        total = linha_base.shape[0]
+        serie = serie * 100.0 / total if total else serie
+    return serie
+
+
+# Função para obter o progresso acumulado de cada série em uma data específica (ex.: hoje)
+def progresso_na_data(df, data, percentual=False):
+    progresso = {
+        nome: int(contar_acumulado(_datas_ordenadas(df[coluna]), [data])[0])
+        for nome, coluna in SERIES_CURVA_S.items()
+    }
+    if percentual:
+        total = df.shape[0]
+        progresso = {nome: (valor * 100.0 / total if total else 0.0) for nome, valor in progresso.items()}
+    return progresso
+
+
+# Função para manter só os pontos em que uma série acumulada muda de valor, além do primeiro e do último.
+# Desenhada em degraus (line_shape='hv'), a série reduzida tem o mesmo formato da série completa.
+def pontos_de_mudanca(serie):
+    valores = serie.to_numpy()
+    if valores.size <= 2:
+        return serie
+    manter = np.empty(valores.size, dtype=bool)
+    manter[0] = manter[-1] = True
+    manter[1:-1] = valores[1:-1] != valores[:-2]
+    return serie[manter]
+
+
+# Função para escolher `maximo` pontos de uma série preservando o formato visual
+# (Largest-Triangle-Three-Buckets); retorna as posições escolhidas, sempre com o primeiro e o último ponto
+def lttb(x, y, maximo):
+    n = len(x)
+    if maximo >= n or maximo < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Os pontos do meio são divididos em maximo - 2 faixas; de cada faixa sai o ponto que forma o
+    # maior triângulo com o ponto escolhido na faixa anterior e a média da faixa seguinte
+    limites = np.linspace(1, n - 1, maximo - 1).astype(np.int64)
+    escolhidos = np.empty(maximo, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for faixa in range(maximo - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        if faixa + 2 < limites.size:
+            x_seguinte = x[fim:limites[faixa + 2]].mean()
+            y_seguinte = y[fim:limites[faixa + 2]].mean()
+        else:
+            x_seguinte, y_seguinte = x[-1], y[-1]
+        areas = np.abs(
+            (x[anterior] - x_seguinte) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (y_seguinte - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[faixa + 1] = anterior
+    return escolhidos
+
+
+# Função para reduzir uma série da Curva S para desenho: primeiro os degraus, depois LTTB se ainda passar do máximo
+def reduzir_serie(serie, maximo):
+    serie = pontos_de_mudanca(serie)
+    if len(serie) <= maximo:
+        return serie
+    x = pd.DatetimeIndex(serie.index).asi8
+    return serie.iloc[lttb(x, serie.to_numpy(), maximo)]
@@ -0,0 +1,217 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from agregados import AgregadosPlano
+from armazenamento import COLUNA_ID
+from busca import IndiceBusca
+from esquema import atribuir, concatenar, registro_como_dict, tipar_plano
+from fila_gravacao import FilaGravacao, TravaArquivo, caminho_trava
+from intervalos import IndiceIntervalos
+from particoes import SITE_PADRAO, ArmazenamentoParticionado, ResumoParticoes
+
+
+# Contador de versões comum a todos os planos do processo: os caches indexados pela versão
+# (índices de consulta e de semanas, cálculos da sessão) não confundem planos de seleções diferentes
+_versoes = itertools.count(1)
+
+
+# Aplica as atualizações de várias ações de uma vez ({ID: campos}): cada coluna recebe uma
+# atribuição por valor distinto, e não uma por ação (ex.: 200 ações concluídas na mesma data)
+def _atualizar_linhas(df, alteracoes):
+    if not alteracoes:
+        return df
+    df = df.copy(deep=False)
+    posicoes = pd.Index(df[COLUNA_ID].to_numpy()).get_indexer(list(alteracoes))
+    linhas_por_valor = {}
+    for posicao, campos in zip(posicoes, alteracoes.values()):
+        if posicao < 0:
+            continue
+        for coluna, valor in campos.items():
+            if coluna != COLUNA_ID and coluna in df.columns:
+                linhas_por_valor.setdefault((coluna, repr(valor)), (valor, []))[1].append(posicao)
+    for (coluna, _), (valor, linhas) in linhas_por_valor.items():
+        df = atribuir(df, df.index[linhas], coluna, valor)
+    return df
+
+
+# Conjunto de dados do plano compartilhado por todas as sessões do processo.
+# Cada versão é um DataFrame imutável identificado por um contador: as sessões guardam
+# apenas o número da versão e leem o mesmo objeto, sem copiar. Gravações passam por aqui,
+# alteram o armazenamento e publicam uma nova versão aplicando só a diferença do registro;
+# mudanças feitas por fora (outro processo ou edição externa) são detectadas pela versão
+# do armazenamento e provocam uma recarga completa. As gravações de todas as sessões
+# entram em uma fila única: rajadas viram uma só gravação persistida, sob uma trava de
+# arquivo que também vale entre processos. As estruturas derivadas do plano (agregados do painel,
+# índice de intervalos, índice de busca e resumo das partições) recebem a diferença de cada gravação.
+# Uma ação gravada fora das partições carregadas (ex.: mudou para um Corpo não selecionado) sai da versão.
+class PlanoCompartilhado:
+    def __init__(self, armazenamento, agregados=None, intervalos=None, busca=None, resumo=None):
+        self.armazenamento = armazenamento
+        self.agregados = agregados
+        self.intervalos = intervalos
+        self.busca = busca
+        self.resumo = resumo
+        self._derivados = [derivado for derivado in (agregados, intervalos, busca, resumo) if derivado is not None]
+        self._trava = threading.RLock()
+        self._df = None
+        self._versao_armazenamento = None
+        self.versao = 0
+        self.recargas = 0
+        # Um lote que falhou só é refeito por sessão se o armazenamento não deixou nada gravado
+        self.fila = FilaGravacao(self._gravar_lote, refazer_separado=armazenamento.lote_atomico)
+
+    def _publicar(self, df, versao_armazenamento):
+        self._df = df
+        self._versao_armazenamento = versao_armazenamento
+        self.versao = next(_versoes)
+
+    # Retorna (versão, DataFrame) consistentes; o DataFrame não deve ser alterado no lugar
+    # (use df.copy(deep=False) antes de criar ou trocar colunas)
+    def obter(self):
+        with self._trava:
+            versao_armazenamento = self.armazenamento.versao()
+            if self._df is None or versao_armazenamento != self._versao_armazenamento:
+                # Única tipagem do plano: as abas usam os tipos do esquema sem converter de novo
+                self._publicar(tipar_plano(self.armazenamento.carregar()), versao_armazenamento)
+                self.recargas += 1
+            return self.versao, self._df
+
+    # Sincroniza uma estrutura derivada (agregados, intervalos, busca, resumo) com o plano atual. Todas
+    # usam como versão a do armazenamento, a mesma das diferenças aplicadas nas gravações, lida junto
+    # com o DataFrame: o app e a API compartilham o estado sem um descartar o do outro.
+    def sincronizar(self, derivado, *argumentos):
+        with self._trava:
+            _, df = self.obter()
+            versao = self._versao_armazenamento
+        return derivado.sincronizar(lambda: df, versao, *argumentos)
+
+    # Força a recarga na próxima leitura (ex.: após uma importação em lote)
+    def invalidar(self):
+        with self._trava:
+            self._descartar()
+
+    def _descartar(self):
+        self._df = None
+        for derivado in self._derivados:
+            derivado.invalidar()
+
+    def _registro(self, df, id_acao):
+        linhas = df.index[df[COLUNA_ID] == id_acao]
+        return registro_como_dict(df.loc[linhas[0]]) if len(linhas) else None
+
+    def _registro_pendente(self, df, posicoes, id_acao, pendentes):
+        posicao = posicoes.get_indexer([id_acao])[0]
+        if posicao < 0:
+            return None
+        return {**registro_como_dict(df.iloc[posicao]), **pendentes.get(id_acao, {})}
+
+    def registro(self, id_acao):
+        _, df = self.obter()
+        return self._registro(df, id_acao)
+
+    # Executado pelo gravador da fila: grava o lote inteiro sob a trava do arquivo (uma única
+    # transação ou reescrita) e publica uma nova versão com as diferenças aplicadas.
+    # Se o armazenamento já tinha mudado por fora, a próxima leitura recarrega tudo.
+    # Cada item da fila é (operação, autor): o lote junta gravações de sessões diferentes.
+    def _gravar_lote(self, itens):
+        operacoes = [operacao for operacao, _ in itens]
+        autores = [autor for _, autor in itens]
+        with TravaArquivo(caminho_trava(self.armazenamento.caminho)), self._trava:
+            versao_antes = self.armazenamento.versao()
+            atualizado = self._df is not None and versao_antes == self._versao_armazenamento
+            try:
+                resultados = self.armazenamento.gravar_lote(operacoes, autores)
+            except Exception:
+                self._descartar()
+                raise
+            versao_depois = self.armazenamento.versao()
+            if not atualizado:
+                self._descartar()
+                return resultados
+
+            # Atualizações seguidas se acumulam e são aplicadas ao DataFrame juntas (antes de uma
+            # inclusão ou exclusão e no fim do lote); o registro antigo já considera as pendentes
+            df = self._df
+            pendentes = {}
+            posicoes = None
+            versao_derivados = versao_antes
+            for (tipo, id_acao, dados), resultado in zip(operacoes, resultados):
+                if tipo == 'atualizar':
+                    if posicoes is None:
+                        posicoes = pd.Index(df[COLUNA_ID].to_numpy())
+                    antigo = self._registro_pendente(df, posicoes, id_acao, pendentes)
+                    novo = {**(antigo or {}), **dados}
+                    if self.armazenamento.pertence(novo):
+                        if antigo is not None:
+                            pendentes[id_acao] = {**pendentes.get(id_acao, {}), **dados}
+                    else:
+                        novo = None
+                        df, pendentes, posicoes = _atualizar_linhas(df, pendentes), {}, None
+                        df = df[df[COLUNA_ID] != id_acao].reset_index(drop=True)
+                else:
+                    df, pendentes, posicoes = _atualizar_linhas(df, pendentes), {}, None
+                    if tipo == 'inserir':
+                        antigo, novo = None, {**dados, COLUNA_ID: resultado}
+                        if not self.armazenamento.pertence(novo):
+                            continue
+                        df = concatenar(df, pd.DataFrame([novo]))
+                    else:
+                        antigo, novo = self._registro(df, id_acao), None
+                        df = df[df[COLUNA_ID] != id_acao].reset_index(drop=True)
+                if antigo is None and novo is None:
+                    continue
+                for derivado in self._derivados:
+                    derivado.aplicar(antigo, novo, versao_derivados, versao_depois)
+                versao_derivados = versao_depois
+
+            df = _atualizar_linhas(df, pendentes)
+            self._publicar(df, versao_depois)
+            return resultados
+
+    # Insere uma ação e retorna a chave primária gerada. `autor` é quem fez a alteração, registrado
+    # no histórico (sem ele, a conta do servidor).
+    def inserir(self, registro, autor=None):
+        return self.fila.gravar((('inserir', None, registro), autor))
+
+    def atualizar(self, id_acao, campos, autor=None):
+        self.fila.gravar((('atualizar', id_acao, campos), autor))
+
+    def apagar(self, id_acao, autor=None):
+        self.fila.gravar((('apagar', id_acao, None), autor))
+
+    # Grava várias operações (tipo, ID, dados) no mesmo lote: uma única transação ou escrita no diário
+    # por arquivo, e uma única versão nova do plano. Retorna um resultado por operação.
+    def gravar_lote(self, operacoes, autor=None):
+        return self.fila.gravar_grupo([(operacao, autor) for operacao in operacoes])
+
+    # Trava o arquivo de dados para gravações feitas fora da fila (ex.: importação em lote)
+    def trava_arquivo(self):
+        return TravaArquivo(caminho_trava(self.armazenamento.caminho))
+
+
+# Máximo de planos (seleções de site e partições) mantidos em memória no processo
+PLANOS_EM_MEMORIA = 4
+
+_planos = OrderedDict()
+_trava_planos = threading.Lock()
+
+
+# Função para obter o plano compartilhado de um site e de uma seleção de partições (Corpos).
+# Sessões com a mesma seleção compartilham o plano; cada plano tem as suas estruturas derivadas e
+# os menos usados recentemente saem da memória quando há mais de PLANOS_EM_MEMORIA seleções.
+def obter_plano_compartilhado(site=None, corpos=None, tipo=None):
+    armazenamento = ArmazenamentoParticionado(site or SITE_PADRAO, corpos, tipo)
+    chave = (armazenamento.tipo, armazenamento.site, None if corpos is None else tuple(sorted(set(corpos))))
+    with _trava_planos:
+        if chave not in _planos:
+            _planos[chave] = PlanoCompartilhado(
+                armazenamento, AgregadosPlano(), intervalos=IndiceIntervalos(), busca=IndiceBusca(),
+                resumo=ResumoParticoes(armazenamento)
+            )
+            while len(_planos) > PLANOS_EM_MEMORIA:
+                _planos.popitem(last=False)
+        _planos.move_to_end(chave)
+        return _planos[chave]
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+
+CAMINHO_LOG_DIAGNOSTICO = 'diagnostico.jsonl'
+
+# Ativa o perfilador em todas as sessões (além do interruptor do painel Diagnóstico)
+DIAGNOSTICO_ATIVO = os.environ.get('PLANO_DIAGNOSTICO', '') not in ('', '0')
+
+
+# Função para estimar os bytes serializados de um objeto enviado ao navegador
+def tamanho_serializado(objeto):
+    if objeto is None:
+        return 0
+    if isinstance(objeto, (bytes, bytearray)):
+        return len(objeto)
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(index=True, deep=True).sum())
+    if hasattr(objeto, 'to_json'):
+        return len(objeto.to_json().encode('utf-8'))
+    return len(str(objeto).encode('utf-8'))
+
+
+# Seção usada quando o perfilador está desligado: não mede nada
+class _SecaoNula:
+    linhas = None
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def serializado(self, objeto):
+        pass
+
+
+_SECAO_NULA = _SecaoNula()
+
+
+class _Secao:
+    def __init__(self, perfilador, nome, linhas):
+        self._perfilador = perfilador
+        self.nome = nome
+        self.linhas = linhas
+        self.bytes = 0
+
+    def __enter__(self):
+        self._perfilador._pilha.append(self.nome)
+        self._nome_completo = '/'.join(self._perfilador._pilha)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        duracao = time.perf_counter() - self._inicio
+        self._perfilador._pilha.pop()
+        self._perfilador.secoes.append({
+            'secao': self._nome_completo,
+            'duracao_s': duracao,
+            'linhas': self.linhas,
+            'bytes': self.bytes,
+        })
+        return False
+
+    # Soma ao registro os bytes de um objeto enviado ao navegador (figura, tabela ou arquivo)
+    def serializado(self, objeto):
+        self.bytes += tamanho_serializado(objeto)
+
+
+# Perfilador de um rerun: mede o tempo de cada seção nomeada (carga, mapeamento, abas,
+# gráficos e exportação), com linhas processadas e bytes serializados. Seções aninhadas
+# recebem o nome completo (ex.: 'GRÁFICOS/curva_s'). Desligado, cada seção é um objeto
+# nulo compartilhado, sem relógio nem alocação.
+class Perfilador:
+    _trava_log = threading.Lock()
+
+    def __init__(self, ativo=False, caminho_log=CAMINHO_LOG_DIAGNOSTICO):
+        self.ativo = ativo
+        self.caminho_log = caminho_log
+        self.secoes = []
+        self._pilha = []
+        self._inicio = time.perf_counter()
+
+    def secao(self, nome, linhas=None):
+        if not self.ativo:
+            return _SECAO_NULA
+        return _Secao(self, nome, linhas)
+
+    # Encerra a execução: grava uma linha JSON no log e retorna o registro (None se desligado)
+    def concluir(self, execucao='rerun'):
+        if not self.ativo:
+            return None
+        registro = {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'execucao': execucao,
+            'total_s': time.perf_counter() - self._inicio,
+            'secoes': self.secoes,
+        }
+        with self._trava_log:
+            with open(self.caminho_log, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self.secoes = []
+        self._inicio = time.perf_counter()
+        return registro
+
+
+# Função para ler as últimas execuções registradas no log
+def ler_log(caminho=CAMINHO_LOG_DIAGNOSTICO, limite=200):
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            linhas = arquivo.readlines()[-limite:]
+    except FileNotFoundError:
+        return []
+    registros = []
+    for linha in linhas:
+        try:
+            registros.append(json.loads(linha))
+        except json.JSONDecodeError:
+            continue
+    return registros
+
+
+# Tabela com os tempos das seções de uma execução
+def tabela_execucao(registro):
+    if not registro or not registro['secoes']:
+        return pd.DataFrame(columns=['secao', 'duracao_ms', 'linhas', 'bytes'])
+    tabela = pd.DataFrame(registro['secoes'])
+    tabela['duracao_ms'] = (tabela.pop('duracao_s') * 1000).round(1)
+    return tabela[['secao', 'duracao_ms', 'linhas', 'bytes']]
+
+
+# Resumo do log por seção: número de medições, mediana e máximo do tempo e média de bytes
+def resumir_log(registros):
+    secoes = [secao for registro in registros for secao in registro.get('secoes', [])]
+    if not secoes:
+        return pd.DataFrame(columns=['secao', 'medicoes', 'mediana_ms', 'max_ms', 'bytes_medio'])
+    tabela = pd.DataFrame(secoes)
+    tabela['duracao_ms'] = tabela['duracao_s'] * 1000
+    resumo = tabela.groupby('secao').agg(
+        medicoes=('duracao_ms', 'size'),
+        mediana_ms=('duracao_ms', 'median'),
+        max_ms=('duracao_ms', 'max'),
+        bytes_medio=('bytes', 'mean'),
+    ).round(1)
+    return resumo.sort_values('mediana_ms', ascending=False).reset_index()
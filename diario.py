@@ -0,0 +1,190 @@
+import getpass
+import json
+import os
+import socket
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+
+
+# Limites do diário de alterações: passando de qualquer um deles o compactador o incorpora à planilha
+TAMANHO_MAXIMO_DIARIO = 1_000_000
+IDADE_MAXIMA_DIARIO_S = 15 * 60
+
+# Intervalo entre as verificações do compactador em segundo plano
+INTERVALO_COMPACTADOR_S = 30
+
+OPERACOES = ('inserir', 'atualizar', 'apagar')
+
+
+# Função para obter o caminho do diário de alterações mantido ao lado da planilha
+def caminho_diario(caminho):
+    return os.path.splitext(caminho)[0] + '.diario.jsonl'
+
+
+# Função para obter o caminho do histórico, que recebe as linhas do diário já incorporadas à planilha
+def caminho_historico(caminho):
+    return os.path.splitext(caminho)[0] + '.historico.jsonl'
+
+
+# Autor registrado nas linhas gravadas sem autor informado (scripts, linha de comando): o usuário e a
+# máquina do servidor. O app informa quem fez a alteração em cada gravação.
+def _autor():
+    try:
+        usuario = getpass.getuser()
+    except (KeyError, OSError):
+        usuario = 'desconhecido'
+    return f'{usuario}@{socket.gethostname()}'
+
+
+AUTOR = _autor()
+
+
+# Função para converter um valor do pandas/streamlit em um valor aceito pelo JSON
+def _valor_json(valor):
+    if valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (date, datetime, pd.Timestamp)):
+        return pd.Timestamp(valor).isoformat()
+    if isinstance(valor, (str, bool, int, float)):
+        return valor
+    if hasattr(valor, 'item'):  # Escalares do numpy
+        return valor.item()
+    return str(valor)
+
+
+# Função para converter os campos gravados por uma operação em um dicionário aceito pelo JSON
+def campos_json(dados):
+    return {coluna: _valor_json(valor) for coluna, valor in dados.items()}
+
+
+def _sincronizar_disco(arquivo):
+    arquivo.flush()
+    os.fsync(arquivo.fileno())
+
+
+# Diário de alterações (write-ahead) do plano em planilha: cada operação gravada vira uma linha JSON
+# acrescentada ao fim do arquivo, com quando, autor, operação, ID e campos gravados. Uma queda no
+# meio da escrita perde no máximo a última linha, que fica incompleta e é ignorada na leitura.
+# Na compactação as linhas incorporadas à planilha passam para o histórico (trilha de auditoria).
+class DiarioAlteracoes:
+    def __init__(self, caminho_dados):
+        self.caminho = caminho_diario(caminho_dados)
+        self.caminho_historico = caminho_historico(caminho_dados)
+        self.linhas_ignoradas = 0
+
+    # Acrescenta as operações (operação, ID, dados) em uma única escrita, confirmada no disco.
+    # `autores` traz o autor de cada operação (None ou vazio: a conta do servidor)
+    def acrescentar(self, operacoes, autores=None):
+        quando = datetime.now().isoformat(timespec='milliseconds')
+        autores = autores or [None] * len(operacoes)
+        linhas = []
+        for (operacao, id_acao, dados), autor in zip(operacoes, autores):
+            entrada = {'quando': quando, 'autor': autor or AUTOR, 'operacao': operacao, 'id': int(id_acao)}
+            if dados is not None:
+                entrada['dados'] = campos_json(dados)
+            linhas.append(json.dumps(entrada, ensure_ascii=False))
+        conteudo = ('\n'.join(linhas) + '\n').encode('utf-8')
+        with open(self.caminho, 'a+b') as arquivo:
+            # Uma linha incompleta deixada por uma queda não pode se juntar à próxima
+            if arquivo.seek(0, os.SEEK_END) > 0:
+                arquivo.seek(-1, os.SEEK_END)
+                if arquivo.read(1) != b'\n':
+                    conteudo = b'\n' + conteudo
+            arquivo.write(conteudo)
+            _sincronizar_disco(arquivo)
+
+    # Lê as entradas do diário na ordem em que foram gravadas (linhas inválidas são ignoradas)
+    def ler(self):
+        entradas = []
+        ignoradas = 0
+        try:
+            with open(self.caminho, 'rb') as arquivo:
+                for linha in arquivo:
+                    if not linha.strip():
+                        continue
+                    try:
+                        entrada = json.loads(linha)
+                    except ValueError:
+                        ignoradas += 1
+                        continue
+                    if isinstance(entrada, dict) and entrada.get('operacao') in OPERACOES and 'id' in entrada:
+                        entradas.append(entrada)
+                    else:
+                        ignoradas += 1
+        except FileNotFoundError:
+            pass
+        self.linhas_ignoradas = ignoradas
+        return entradas
+
+    # Tamanho do diário em bytes (0 se ele não existir)
+    def tamanho(self):
+        try:
+            return os.path.getsize(self.caminho)
+        except FileNotFoundError:
+            return 0
+
+    # Segundos desde a entrada mais antiga ainda não incorporada à planilha
+    def idade_s(self):
+        try:
+            with open(self.caminho, 'rb') as arquivo:
+                primeira = json.loads(arquivo.readline())
+            return (datetime.now() - datetime.fromisoformat(primeira['quando'])).total_seconds()
+        except FileNotFoundError:
+            return 0.0
+        except (ValueError, KeyError, TypeError):
+            # Primeira linha ilegível: a idade passa a ser a do próprio arquivo
+            return max(0.0, datetime.now().timestamp() - os.path.getmtime(self.caminho))
+
+    # Move os primeiros `tamanho` bytes do diário (já incorporados à planilha) para o histórico.
+    # O que foi acrescentado depois continua no diário.
+    def arquivar(self, tamanho):
+        with open(self.caminho, 'rb') as arquivo:
+            incorporado = arquivo.read(tamanho)
+            restante = arquivo.read()
+        if incorporado.strip():
+            with open(self.caminho_historico, 'ab') as historico:
+                historico.write(incorporado if incorporado.endswith(b'\n') else incorporado + b'\n')
+                _sincronizar_disco(historico)
+        if restante:
+            temporario = self.caminho + '.tmp'
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(restante)
+                _sincronizar_disco(arquivo)
+            os.replace(temporario, self.caminho)
+        else:
+            os.remove(self.caminho)
+
+
+# Compactador em segundo plano: a cada intervalo, ou quando avisado depois de uma gravação,
+# verifica se o diário precisa ser incorporado à planilha e chama `compactar()`.
+# Uma falha (ex.: trava ocupada por uma importação longa) é tentada de novo na próxima verificação.
+class Compactador:
+    def __init__(self, precisa_compactar, compactar, intervalo_s=INTERVALO_COMPACTADOR_S):
+        self._precisa_compactar = precisa_compactar
+        self._compactar = compactar
+        self.intervalo_s = intervalo_s
+        self._evento = threading.Event()
+        self._trava = threading.Lock()
+        self._thread = None
+        self.ultimo_erro = None
+
+    # Inicia o compactador, se ainda não estiver rodando, e pede uma verificação imediata
+    def avisar(self):
+        with self._trava:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='compactador-diario', daemon=True)
+                self._thread.start()
+        self._evento.set()
+
+    def _executar(self):
+        while True:
+            self._evento.wait(self.intervalo_s)
+            self._evento.clear()
+            try:
+                if self._precisa_compactar():
+                    self._compactar()
+                self.ultimo_erro = None
+            except Exception as erro:
+                self.ultimo_erro = erro
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNA_ID, COLUNAS_DATA
+from calculo_status import calcular_status_vetorizado
+from esquema import registro_como_dict
+from importacao import PARES_DATAS
+
+
+# Máximo de ações exibidas de uma vez na grade de edição (filtros reduzem a seleção)
+MAXIMO_LINHAS_GRADE = 1000
+
+# Colunas não editáveis na grade: a chave, o Status (recalculado nas linhas alteradas) e as datas
+# planejadas, que também ficam bloqueadas no formulário de edição
+COLUNAS_BLOQUEADAS = [COLUNA_ID, 'Status', 'Inicio Plan', 'Fim Plan']
+
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip()) or (not isinstance(valor, str) and pd.isna(valor))
+
+
+# Coluna como texto para comparação (vazio, NA e espaços contam como o mesmo valor)
+def _texto_comparavel(coluna):
+    return coluna.astype(object).where(coluna.notna(), '').astype(str).str.strip().to_numpy()
+
+
+def _valor_gravado(coluna, valor):
+    if _vazio(valor):
+        return None
+    if coluna in COLUNAS_DATA:
+        return pd.Timestamp(valor)
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+# Função para calcular as células alteradas na grade: {ID: {coluna: valor novo}}.
+# `original` é o que foi exibido e `editado` o que a grade devolveu (mesmas linhas, na mesma ordem).
+def diferencas(original, editado):
+    alteracoes = {}
+    ids = original[COLUNA_ID].to_numpy()
+    for coluna in editado.columns:
+        if coluna in COLUNAS_BLOQUEADAS or coluna not in original.columns:
+            continue
+        if coluna in COLUNAS_DATA:
+            antes = pd.to_datetime(original[coluna], errors='coerce').to_numpy(dtype='datetime64[ns]')
+            depois = pd.to_datetime(editado[coluna], errors='coerce').to_numpy(dtype='datetime64[ns]')
+            mudou = antes.view(np.int64) != depois.view(np.int64)
+        else:
+            mudou = _texto_comparavel(original[coluna]) != _texto_comparavel(editado[coluna])
+        for posicao in np.flatnonzero(mudou):
+            alteracoes.setdefault(int(ids[posicao]), {})[coluna] = _valor_gravado(coluna, editado[coluna].iloc[posicao])
+    return alteracoes
+
+
+# Função para validar as alterações da grade em conjunto e montar as operações de gravação.
+# Usa a mesma ordem das datas da importação e da edição de registros (só nos pares com alguma data
+# editada: uma inversão já gravada em colunas não tocadas não impede a edição) e exige o Responsável;
+# o Status é recalculado só para as ações alteradas. Retorna (operações, erros): havendo qualquer
+# erro, nada deve ser gravado. Ações que já não existem no plano (apagadas por outra sessão) contam
+# como erro.
+def preparar_edicoes(df_plano, alteracoes, hoje=None):
+    ids = list(alteracoes)
+    posicoes = pd.Index(df_plano[COLUNA_ID].to_numpy()).get_indexer(np.asarray(ids, dtype=np.int64))
+    erros = [{'ID': id_acao, 'Erro': "Ação não encontrada (apagada por outra sessão?)"}
+             for id_acao, posicao in zip(ids, posicoes) if posicao < 0]
+    ids = [id_acao for id_acao, posicao in zip(ids, posicoes) if posicao >= 0]
+    if not ids:
+        return [], pd.DataFrame(erros, columns=['ID', 'Erro'])
+
+    antes = df_plano.iloc[posicoes[posicoes >= 0]]
+    depois = pd.DataFrame([{**registro_como_dict(linha), **alteracoes[id_acao]} for id_acao, (_, linha) in zip(ids, antes.iterrows())])
+    for coluna in COLUNAS_DATA:
+        depois[coluna] = pd.to_datetime(depois[coluna], errors='coerce')
+
+    mensagens = {id_acao: [] for id_acao in ids}
+    for inicio, fim in PARES_DATAS:
+        editado = np.array([inicio in alteracoes[id_acao] or fim in alteracoes[id_acao] for id_acao in ids], dtype=bool)
+        fora_de_ordem = editado & depois[inicio].notna() & depois[fim].notna() & (depois[inicio] > depois[fim])
+        for id_acao in depois.loc[fora_de_ordem, COLUNA_ID]:
+            mensagens[id_acao].append(f"'{inicio}' posterior a '{fim}'")
+    for id_acao in depois.loc[[_vazio(valor) for valor in depois['Responsavel']], COLUNA_ID]:
+        mensagens[id_acao].append("Responsável não pode ficar vazio")
+    erros += [{'ID': id_acao, 'Erro': '; '.join(lista)} for id_acao, lista in mensagens.items() if lista]
+    if erros:
+        return [], pd.DataFrame(erros, columns=['ID', 'Erro'])
+
+    status = calcular_status_vetorizado(depois, hoje)
+    operacoes = []
+    for id_acao, status_antes, status_novo in zip(ids, antes['Status'], status):
+        campos = dict(alteracoes[id_acao])
+        if _vazio(status_antes) or str(status_antes) != status_novo:
+            campos['Status'] = status_novo
+        operacoes.append(('atualizar', id_acao, campos))
+    return operacoes, pd.DataFrame(erros, columns=['ID', 'Erro'])
@@ -0,0 +1,119 @@
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from armazenamento import COLUNA_ID, COLUNAS_DATA, COLUNAS_OBRIGATORIAS
+
+
+# Esquema do plano de ação em memória. O DataFrame é tipado uma única vez, na carga;
+# o restante do app conta com estes tipos e não converte as colunas de novo.
+#
+#   Coluna                                 Tipo             Observação
+#   ID                                     int64            chave primária, nunca vazia
+#   Area                                   category         poucas áreas, repetidas em todas as ações
+#   Status                                 category         _, ATRASADA, PROGRAMADA, CONCLUÍDA, EM ANDAMENTO
+#   Corpo                                  category         BAL, CGA, FGS, GAL, SER e os adicionados no cadastro
+#   Nível                                  category         N1 a N50
+#   Responsavel                            category         um por área
+#   Inicio Plan, Fim Plan                  datetime64[ns]   NaT quando vazia
+#   Inicio Real, Fim Real                  datetime64[ns]   NaT quando vazia
+#   Inicio(REPRO), Fim(REPRO)              datetime64[ns]   NaT quando vazia
+#   Local, Acao, Impacto, Observações,     string           texto livre, <NA> quando vazio
+#   Nota de Trabalho, O resultado
+#   esperado foi alcançado?, Se não, o
+#   que será feito?, Classificação Impacto
+COLUNAS_CATEGORICAS = ['Area', 'Status', 'Corpo', 'Nível', 'Responsavel']
+TIPO_DATA = 'datetime64[ns]'
+TIPO_TEXTO = pd.StringDtype()
+
+ESQUEMA = {COLUNA_ID: 'int64'}
+for _coluna in COLUNAS_OBRIGATORIAS:
+    if _coluna in COLUNAS_CATEGORICAS:
+        ESQUEMA[_coluna] = 'category'
+    elif _coluna in COLUNAS_DATA:
+        ESQUEMA[_coluna] = TIPO_DATA
+    else:
+        ESQUEMA[_coluna] = TIPO_TEXTO
+
+
+# Função para converter uma coluna para o tipo do esquema
+def _tipar_coluna(coluna, tipo):
+    if tipo == TIPO_DATA:
+        if coluna.dtype == TIPO_DATA:
+            return coluna
+        return pd.to_datetime(coluna, errors='coerce').astype(TIPO_DATA)
+    if tipo == 'category':
+        if isinstance(coluna.dtype, CategoricalDtype):
+            return coluna
+        # Valores de tipos misturados (ex.: número e texto) viram texto antes de categorizar
+        texto = coluna.astype(TIPO_TEXTO)
+        return texto.astype(CategoricalDtype(sorted(texto.dropna().unique())))
+    if tipo == TIPO_TEXTO:
+        return coluna.astype(TIPO_TEXTO)
+    return coluna.astype(tipo)
+
+
+# Função para tipar o plano conforme o esquema (colunas fora do esquema são mantidas como estão)
+def tipar_plano(df):
+    df = df.copy(deep=False)
+    for coluna, tipo in ESQUEMA.items():
+        if coluna not in df.columns:
+            df[coluna] = None
+        df[coluna] = _tipar_coluna(df[coluna], tipo)
+    return df
+
+
+# Junta as categorias de duas colunas categóricas, em ordem alfabética
+def _categorias_unidas(*colunas):
+    categorias = set()
+    for coluna in colunas:
+        categorias.update(coluna.cat.categories)
+    return sorted(categorias)
+
+
+# Função para acrescentar linhas ao plano mantendo o esquema (as categorias novas são incorporadas)
+def concatenar(df, novos):
+    novos = tipar_plano(novos)[list(df.columns)]
+    if df.empty:
+        return novos.reset_index(drop=True)
+    df = df.copy(deep=False)
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            categorias = _categorias_unidas(df[coluna], novos[coluna])
+            df[coluna] = df[coluna].cat.set_categories(categorias)
+            novos[coluna] = novos[coluna].cat.set_categories(categorias)
+    return pd.concat([df, novos], ignore_index=True)
+
+
+# Função para atribuir um valor às linhas selecionadas de uma coluna, respeitando o esquema
+def atribuir(df, linhas, coluna, valor):
+    vazio = valor is None or (not isinstance(valor, str) and pd.isna(valor))
+    tipo = ESQUEMA.get(coluna)
+    if tipo == TIPO_DATA:
+        valor = pd.NaT if vazio else pd.Timestamp(valor)
+    elif tipo == 'category':
+        valor = None if vazio else str(valor)
+        if valor is not None and valor not in df[coluna].cat.categories:
+            df[coluna] = df[coluna].cat.set_categories(sorted([*df[coluna].cat.categories, valor]))
+    elif tipo == TIPO_TEXTO:
+        valor = pd.NA if vazio else str(valor)
+    df.loc[linhas, coluna] = valor
+    return df
+
+
+# Função para converter uma linha do plano em dicionário, com None no lugar de NA/NaT/NaN
+def registro_como_dict(linha):
+    return {coluna: (None if not isinstance(valor, str) and pd.isna(valor) else valor) for coluna, valor in linha.items()}
+
+
+# Função para preparar uma cópia do plano para exibição: texto vazio no lugar de <NA>
+def para_exibicao(df):
+    df = df.copy(deep=False)
+    for coluna in df.columns:
+        if pd.api.types.is_string_dtype(df[coluna].dtype) and not isinstance(df[coluna].dtype, CategoricalDtype):
+            df[coluna] = df[coluna].fillna('')
+    return df
+
+
+# Memória ocupada pelo plano em bytes (inclui o conteúdo dos textos)
+def memoria_plano(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,83 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from openpyxl import Workbook
+
+
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Quantidade de exportações mantidas em cache (uma por versão dos dados)
+LIMITE_CACHE_EXPORTACAO = 4
+
+_cache_exportacao = OrderedDict()
+_trava_exportacao = threading.Lock()
+
+
+# Função para calcular a versão (hash) do conteúdo de um DataFrame
+def versao_dados(df):
+    resumo = hashlib.sha1()
+    resumo.update('\x1f'.join(map(str, df.columns)).encode('utf-8'))
+    resumo.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return resumo.hexdigest()
+
+
+# Função para converter um valor do pandas em um valor aceito pelo openpyxl
+def _valor_celula(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return None if pd.isna(valor) else valor.to_pydatetime()
+    if isinstance(valor, float) and pd.isna(valor):
+        return None
+    if valor is pd.NaT or valor is pd.NA:
+        return None
+    if hasattr(valor, 'item'):  # Escalares do numpy
+        return valor.item()
+    return valor
+
+
+def _escrever_planilha(planilha, df):
+    planilha.append([str(coluna) for coluna in df.columns])
+    for linha in df.itertuples(index=False, name=None):
+        planilha.append([_valor_celula(valor) for valor in linha])
+
+
+def _salvar(workbook):
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+# Função para gerar a planilha Excel com o writer em modo streaming do openpyxl
+# (write_only): as linhas são gravadas uma a uma, sem montar a planilha inteira em memória
+def gerar_excel(df):
+    workbook = Workbook(write_only=True)
+    _escrever_planilha(workbook.create_sheet(), df)
+    return _salvar(workbook)
+
+
+# Função para gerar uma pasta de trabalho com várias planilhas ({título: DataFrame}), também em streaming
+def gerar_excel_planilhas(planilhas):
+    workbook = Workbook(write_only=True)
+    for titulo, df in planilhas.items():
+        _escrever_planilha(workbook.create_sheet(titulo), df)
+    return _salvar(workbook)
+
+
+# Função para obter a planilha de exportação, reaproveitando a última gerada para a mesma versão dos dados
+def obter_excel(df):
+    versao = versao_dados(df)
+    with _trava_exportacao:
+        if versao in _cache_exportacao:
+            _cache_exportacao.move_to_end(versao)
+            return _cache_exportacao[versao]
+
+    conteudo = gerar_excel(df)
+    with _trava_exportacao:
+        _cache_exportacao[versao] = conteudo
+        while len(_cache_exportacao) > LIMITE_CACHE_EXPORTACAO:
+            _cache_exportacao.popitem(last=False)
+    return conteudo
@@ -0,0 +1,190 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Trava entre processos: flock no Linux/macOS e msvcrt.locking no Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# Espera máxima para juntar operações que chegam quase ao mesmo tempo em uma única gravação
+JANELA_LOTE_S = 0.05
+TAMANHO_MAXIMO_LOTE = 500
+ESPERA_TRAVA_S = 30
+
+
+# Erro de um lote que ficou gravado só em parte: a falha aconteceu depois de uma parte do lote já
+# confirmada. `gravadas` traz as posições das operações do lote que ficaram gravadas por inteiro.
+class GravacaoParcial(Exception):
+    def __init__(self, mensagem, gravadas):
+        super().__init__(mensagem)
+        self.gravadas = gravadas
+
+
+# Função para obter o caminho do arquivo de trava de um arquivo de dados
+def caminho_trava(caminho):
+    return caminho + '.lock'
+
+
+# Trava exclusiva de arquivo, válida entre processos (vários servidores Streamlit, scripts
+# de importação ou a linha de comando gravando no mesmo plano)
+class TravaArquivo:
+    def __init__(self, caminho, espera_s=ESPERA_TRAVA_S):
+        self.caminho = caminho
+        self.espera_s = espera_s
+        self._arquivo = None
+
+    def _tentar(self):
+        if fcntl is not None:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            self._arquivo.seek(0)
+            msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _liberar(self):
+        if fcntl is not None:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        else:
+            self._arquivo.seek(0)
+            msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self):
+        self._arquivo = open(self.caminho, 'a+b')
+        limite = time.monotonic() + self.espera_s
+        while True:
+            try:
+                self._tentar()
+                return self
+            except OSError:
+                if time.monotonic() >= limite:
+                    self._arquivo.close()
+                    raise TimeoutError(f"Não foi possível travar '{self.caminho}' em {self.espera_s} s")
+                time.sleep(0.05)
+
+    def __exit__(self, *excecao):
+        try:
+            self._liberar()
+        finally:
+            self._arquivo.close()
+        return False
+
+
+# Fila de gravações com um único gravador em segundo plano.
+# As sessões enfileiram operações e recebem um Future que é concluído quando a operação
+# estiver persistida. O gravador junta as operações que chegam dentro da janela em um lote
+# e chama `executar_lote(operacoes)` uma vez, que retorna um resultado por operação.
+# Se o lote falhar e `refazer_separado` for verdadeiro (quem executa garante tudo ou nada: a falha não
+# deixou nada gravado), cada sessão é regravada separadamente e recebe o próprio erro. Sem essa
+# garantia, ou com GravacaoParcial, nada é refeito: refazer gravaria de novo o que já foi gravado.
+class FilaGravacao:
+    def __init__(self, executar_lote, janela_s=JANELA_LOTE_S, tamanho_maximo=TAMANHO_MAXIMO_LOTE, refazer_separado=True):
+        self._executar_lote = executar_lote
+        self.refazer_separado = refazer_separado
+        self.janela_s = janela_s
+        self.tamanho_maximo = tamanho_maximo
+        self._fila = queue.Queue()
+        self._trava = threading.Lock()
+        self._gravador = None
+        self.lotes = 0
+        self.operacoes = 0
+
+    def _iniciar(self):
+        with self._trava:
+            if self._gravador is None or not self._gravador.is_alive():
+                self._gravador = threading.Thread(target=self._executar, name='gravador-plano', daemon=True)
+                self._gravador.start()
+
+    def _enfileirar(self, operacoes, grupo):
+        futuro = Future()
+        self._fila.put((operacoes, grupo, futuro))
+        self._iniciar()
+        return futuro
+
+    # Enfileira uma operação e retorna o Future com o seu resultado
+    def enviar(self, operacao):
+        return self._enfileirar([operacao], False)
+
+    # Enfileira uma operação e espera a confirmação da gravação
+    def gravar(self, operacao, espera_s=None):
+        return self.enviar(operacao).result(timeout=espera_s)
+
+    # Enfileira um grupo de operações gravado inteiro no mesmo lote (nunca dividido entre lotes);
+    # o Future recebe a lista de resultados, na ordem das operações
+    def enviar_grupo(self, operacoes):
+        operacoes = list(operacoes)
+        if not operacoes:
+            futuro = Future()
+            futuro.set_result([])
+            return futuro
+        return self._enfileirar(operacoes, True)
+
+    def gravar_grupo(self, operacoes, espera_s=None):
+        return self.enviar_grupo(operacoes).result(timeout=espera_s)
+
+    # Um grupo grande pode passar do tamanho máximo do lote: ele nunca é dividido
+    def _coletar_lote(self):
+        lote = [self._fila.get()]
+        quantidade = len(lote[0][0])
+        limite = time.monotonic() + self.janela_s
+        while quantidade < self.tamanho_maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            lote.append(item)
+            quantidade += len(item[0])
+        return lote
+
+    # Conclui o Future de um item com a sua parte dos resultados do lote
+    def _concluir(self, grupo, futuro, resultados):
+        resultados_item = list(resultados)
+        futuro.set_result(resultados_item if grupo else resultados_item[0])
+
+    # Depois de uma falha no lote, cada item é gravado sozinho: a operação inválida falha só para
+    # quem a enviou e as demais são confirmadas. Um grupo continua sendo tudo ou nada.
+    def _executar_separado(self, lote):
+        for operacoes_item, grupo, futuro in lote:
+            try:
+                resultados = self._executar_lote(operacoes_item)
+            except Exception as erro:
+                futuro.set_exception(erro)
+            else:
+                self._concluir(grupo, futuro, resultados)
+
+    # Cada sessão recebe um GravacaoParcial com as posições das suas próprias operações já gravadas
+    def _falhar_parcial(self, lote, erro):
+        gravadas = set(erro.gravadas)
+        inicio = 0
+        for operacoes_item, _, futuro in lote:
+            posicoes = [posicao for posicao in range(len(operacoes_item)) if inicio + posicao in gravadas]
+            futuro.set_exception(GravacaoParcial(str(erro), posicoes))
+            inicio += len(operacoes_item)
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote()
+            operacoes = [operacao for operacoes_item, _, _ in lote for operacao in operacoes_item]
+            try:
+                resultados = self._executar_lote(operacoes)
+            except GravacaoParcial as erro:
+                self._falhar_parcial(lote, erro)
+            except Exception as erro:
+                if len(lote) > 1 and self.refazer_separado:
+                    self._executar_separado(lote)
+                else:
+                    for _, _, futuro in lote:
+                        futuro.set_exception(erro)
+            else:
+                inicio = 0
+                for operacoes_item, grupo, futuro in lote:
+                    self._concluir(grupo, futuro, resultados[inicio:inicio + len(operacoes_item)])
+                    inicio += len(operacoes_item)
+            self.lotes += 1
+            self.operacoes += len(operacoes)
@@ -6,136 +6,171 @@ import io
 import openpyxl
 import matplotlib.dates as mdates
 from wordcloud import WordCloud
-import plotly.graph_objs as go
 import os
-
-
-# Função para calcular status automaticamente
-def calcular_status(inicio_real, fim_real, inicio_plan, fim_plan, inicio_repro=None, fim_repro=None):
-    hoje = pd.to_datetime(datetime.now().date())
-
-    # Certifique-se de que as entradas sejam do tipo Timestamp
-    inicio_plan = pd.to_datetime(inicio_plan) if pd.notna(inicio_plan) else pd.NaT
-    fim_plan = pd.to_datetime(fim_plan) if pd.notna(fim_plan) else pd.NaT
-    inicio_real = pd.to_datetime(inicio_real) if pd.notna(inicio_real) else pd.NaT
-    fim_real = pd.to_datetime(fim_real) if pd.notna(fim_real) else pd.NaT
-    inicio_repro = pd.to_datetime(inicio_repro) if pd.notna(inicio_repro) else pd.NaT
-    fim_repro = pd.to_datetime(fim_repro) if pd.notna(fim_repro) else pd.NaT
-
-    # Verifica se o campo de início planejado está vazio
-    if pd.isna(inicio_plan):
-        return "_"
-    # Atrasada: Início planejado é menor que hoje e fim planejado está vazio
-    if pd.isna(fim_plan) and inicio_plan < hoje:
-        return "ATRASADA"
-    # Programada: Início planejado é maior que hoje
-    elif (pd.isna(fim_plan) and inicio_plan > hoje) or (not pd.isna(fim_plan) and fim_plan > hoje):
-        return "PROGRAMADA" 
-    # Concluída: Fim real não está vazio
-    elif not pd.isna(fim_real):
-        return "CONCLUÍDA"
-    # Em andamento: Fim real não está vazio e início real é menor que hoje
-    elif not pd.isna(fim_real) and inicio_real <= hoje:
-        return "EM ANDAMENTO"
-    # Atrasada: Se o início real estiver vazio e a data final planejada estiver no passado
-    elif pd.isna(fim_real) and fim_plan < hoje:
-        return "ATRASADA"
-    # Em andamento: Qualquer outro caso
-    return "EM ANDAMENTO"
-
-
-# Função para garantir que uma coluna é do tipo datetime
-def converter_para_datetime(coluna):
-    return pd.to_datetime(coluna, errors='coerce')
-
-# Função para carregar e salvar o mapeamento Área-Responsável
-def carregar_mapeamento_area_responsavel():
-    try:
-        df_map = pd.read_csv('area_responsavel.csv')
-        mapeamento = dict(zip(df_map['Área'], df_map['Responsável']))
-    except FileNotFoundError:
-        mapeamento = {
-            'Transporte': 'Renan Tales',
-            'Infraestrutura': 'Jayr Rodrigues',
-            'Desenvolvimento': 'Felipe Zanela',
-            'Ventilação': 'Geraldo Duarte',
-            'Backlog': 'Osman Pereira',
-            'Caldeiraria': 'Darley',
-            'ObraCivil': 'Darley',
-            'Mec.Rochas': 'Jeferson Lage'
-        }
-        salvar_mapeamento_area_responsavel(mapeamento)
-    return mapeamento
-
-def salvar_mapeamento_area_responsavel(mapeamento):
-    df_map = pd.DataFrame(list(mapeamento.items()), columns=['Área', 'Responsável'])
-    df_map.to_csv('area_responsavel.csv', index=False)
-
-def salvar_dados(df):
-    caminho_arquivo = os.path.join(os.getcwd(), 'dados_projeto.xlsx')
-    df.to_excel(caminho_arquivo, index=False)
-
-# Carregar dados
-def carregar_dados():
-    required_columns = [
-        'Area', 'Local', 'Acao', 'Impacto', 'Responsavel', 'Inicio Plan',
-        'Fim Plan', 'Inicio Real', 'Fim Real', 'Status', 'Observações', 'Nota de Trabalho',
-        'O resultado esperado foi alcançado?', 'Se não, o que será feito?', 'Classificação Impacto',
-        'Corpo', 'Nível', 'Inicio(REPRO)', 'Fim(REPRO)'  # Novas colunas adicionadas
-    ]
-    try:
-        df = pd.read_excel('dados_projeto.xlsx')
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = None
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=required_columns)
-    
-    # Verifica se a coluna 'Area' existe; caso contrário, tenta ajustar ou criar com valor padrão
-    if 'Area' not in df.columns:
-        if 'Área' in df.columns:  # Verifica se a coluna está com acento
-            df.rename(columns={'Área': 'Area'}, inplace=True)
-        else:
-            st.warning("A coluna 'Area' ou 'Área' não foi encontrada. Uma coluna padrão será criada.")
-            df['Area'] = 'Área Padrão'  # Cria uma coluna 'Area' com valor padrão se não existir
-
-    return df
-
-def salvar_dados(df):
-    df.to_excel('dados_projeto.xlsx', index=False)
-
-# Inicializando a chave 'dados_formulario' no session_state
-if 'dados_formulario' not in st.session_state:
-    st.session_state['dados_formulario'] = []
+import functools
+import time
+import numpy as np
+import uuid
+import zlib
+from calculo_status import calcular_status, calcular_status_vetorizado
+from curva_s import GRANULARIDADES
+from graficos import MAXIMO_ACOES_GANTT, figura_curva_s, figura_gantt, figura_ocupacao, figura_pizza, figura_status_area, porcentagens_resumo, ultimos_atrasados
+from intervalos import TIPOS_INTERVALO, ocupacao_diaria
+from linhas_base import obter_linhas_base
+from armazenamento import COLUNA_ID, COLUNAS_OBRIGATORIAS
+from particoes import CORPO_VAZIO, ArmazenamentoParticionado, CatalogoParticoes, corpos_do_site, sites_disponiveis
+from referencias import CORPOS_PADRAO, NIVEIS, carregar_mapeamento_area_responsavel, salvar_mapeamento_area_responsavel, carregar_responsaveis
+from cache_arquivos import cache_calculos, cache_carga
+from exportacao import MIME_EXCEL, obter_excel
+from importacao import contar_linhas, importar_acoes
+from consulta import COLUNAS_FILTRO_DATA, TAMANHOS_PAGINA, obter_indice
+from edicao_lote import COLUNAS_BLOQUEADAS, MAXIMO_LINHAS_GRADE, diferencas, preparar_edicoes
+from semanas import obter_indice_semanas, semana_relativa
+from dados_compartilhados import obter_plano_compartilhado
+from esquema import COLUNAS_CATEGORICAS, memoria_plano, para_exibicao, registro_como_dict
+from diagnostico import DIAGNOSTICO_ATIVO, Perfilador, ler_log, resumir_log, tabela_execucao
+
+
+# Perfilador do rerun: ligado pela variável PLANO_DIAGNOSTICO ou pelo painel Diagnóstico
+perfilador = Perfilador(ativo=DIAGNOSTICO_ATIVO or st.session_state.get('diagnostico_ativo', False))
 
 # Inicializando a chave 'corpos' no session_state
 if 'corpos' not in st.session_state:
-    st.session_state['corpos'] = ['BAL', 'CGA', 'FGS', 'GAL', 'SER']  # Valores padrão
+    st.session_state['corpos'] = list(CORPOS_PADRAO)  # Valores padrão
 
 # Carregar o mapeamento de áreas e responsáveis
-area_responsavel = carregar_mapeamento_area_responsavel()
-
-df = carregar_dados()
-
-# Se houver dados no arquivo, carregue-os no session_state
-if df.shape[0] > 0:
-    st.session_state['dados_formulario'] = df.to_dict(orient='records')
-
-# Convertendo colunas para datetime
-df['Inicio Plan'] = converter_para_datetime(df['Inicio Plan'])
-df['Fim Plan'] = converter_para_datetime(df['Fim Plan'])
-df['Inicio Real'] = converter_para_datetime(df['Inicio Real'])
-df['Fim Real'] = converter_para_datetime(df['Fim Real'])
-df['Inicio(REPRO)'] = converter_para_datetime(df['Inicio(REPRO)'])  # Nova coluna
-df['Fim(REPRO)'] = converter_para_datetime(df['Fim(REPRO)'])  # Nova coluna
+with perfilador.secao('mapeamento'):
+    area_responsavel = carregar_mapeamento_area_responsavel()
+
+# Site e partições (Corpos) carregados nesta sessão: só as partições selecionadas entram no plano
+with st.sidebar:
+    st.header("Site e partições")
+    sites = sites_disponiveis()
+    site = st.selectbox("Site", options=sites, key='site')
+    corpos_site = corpos_do_site(site)
+    # O site inteiro inclui os Corpos criados depois (ex.: pelo cadastro)
+    site_inteiro = st.checkbox("Carregar o site inteiro", value=True, key=f'site_inteiro_{site}')
+    corpos_selecionados = st.multiselect(
+        "Corpos carregados", options=corpos_site, key=f'corpos_carregados_{site}', disabled=site_inteiro
+    )
+    # Autor registrado no histórico de alterações: o nome informado ou, sem ele, o código da sessão
+    # (o app não tem login; a conta do servidor fica só para gravações feitas fora do app)
+    if 'codigo_sessao' not in st.session_state:
+        st.session_state['codigo_sessao'] = uuid.uuid4().hex[:8]
+    nome_autor = st.text_input("Seu nome (registrado no histórico)", key='nome_autor')
+autor = nome_autor.strip() or f"sessão {st.session_state['codigo_sessao']}"
+corpos_carga = None if site_inteiro or not corpos_selecionados else corpos_selecionados
+selecao_dados = (site, None if corpos_carga is None else tuple(sorted(corpos_carga)))
+
+# Os Corpos que já têm partição no site entram nas opções do cadastro
+for corpo_site in corpos_site:
+    if corpo_site != CORPO_VAZIO and corpo_site not in st.session_state['corpos']:
+        st.session_state['corpos'].append(corpo_site)
+
+with perfilador.secao('carga') as secao_carga:
+    # Plano compartilhado por todas as sessões do processo que carregam a mesma seleção de partições
+    # (SQLite por padrão; a planilha Excel passa a ser destino de exportação). A sessão guarda
+    # apenas a versão que está exibindo.
+    plano = obter_plano_compartilhado(site, corpos_carga)
+    armazenamento = plano.armazenamento
+    linhas_base = obter_linhas_base(armazenamento.caminho)
+
+    versao_dados, df_plano = plano.obter()
+    secao_carga.linhas = df_plano.shape[0]
+
+    # Outra sessão (ou processo) gravou desde o último rerun desta sessão, com a mesma seleção
+    versao_sessao = st.session_state.get('versao_dados')
+    if versao_sessao is not None and versao_sessao != versao_dados and st.session_state.get('selecao_dados') == selecao_dados:
+        st.toast("O plano foi atualizado por outro usuário; os dados exibidos já estão atualizados.")
+    st.session_state['versao_dados'] = versao_dados
+    st.session_state['selecao_dados'] = selecao_dados
+
+# Totais de todas as partições a partir dos resumos gravados, sem carregar as partições não selecionadas
+with perfilador.secao('totais_particoes'), st.sidebar:
+    plano.sincronizar(plano.resumo)
+    totais_site = armazenamento.totais()
+    st.dataframe(totais_site[['Corpo', 'Ações', 'Concluídas', 'Atrasadas', 'Atualizado']], hide_index=True)
+    st.caption(
+        f"Site {site}: {int(totais_site['Ações'].sum())} ações em {totais_site.shape[0]} partições, "
+        f"{int(totais_site['Concluídas'].sum())} concluídas e {int(totais_site['Atrasadas'].sum())} atrasadas."
+    )
+    desatualizados = int((~totais_site['Atualizado']).sum())
+    if desatualizados:
+        st.caption(f"{desatualizados} resumos desatualizados (gravados fora desta seleção ou por outro processo).")
+        if st.button("Recalcular resumos"):
+            armazenamento.recalcular_resumos()
+            st.rerun()
+    if len(sites) > 1:
+        totais_sites = pd.DataFrame([
+            {'Site': outro_site, **ArmazenamentoParticionado(outro_site).totais()[['Ações', 'Concluídas', 'Atrasadas']].sum().astype(int)}
+            for outro_site in sites
+        ])
+        st.write("Todos os sites:")
+        st.dataframe(totais_sites, hide_index=True)
+
+
+# Rerun completo do script em andamento; fragmentos reexecutados sozinhos encontram False
+execucao_completa = True
+
+
+# Função para transformar uma aba (ou um gráfico) em fragmento: interagir com os widgets dele
+# reexecuta só esse trecho, não o app inteiro. Cada fragmento lê o plano compartilhado por conta
+# própria, e seus cálculos pesados só são refeitos quando a versão dos dados muda (memorizar).
+# No rerun completo a medição entra no perfilador do script; nos reruns do próprio fragmento
+# ela é gravada como uma execução 'fragmento:<nome>'.
+def fragmento(nome):
+    def decorar(funcao):
+        @st.fragment
+        @functools.wraps(funcao)
+        def executar():
+            global perfilador
+            if execucao_completa:
+                with perfilador.secao(nome) as secao:
+                    funcao(secao)
+                return
+            perfilador = Perfilador(ativo=DIAGNOSTICO_ATIVO or st.session_state.get('diagnostico_ativo', False))
+            with perfilador.secao(nome) as secao:
+                funcao(secao)
+            perfilador.concluir(f'fragmento:{nome}')
+        return executar
+    return decorar
+
+
+# Função para reaproveitar um cálculo enquanto a chave (versão dos dados, dia e parâmetros) não mudar.
+# O resultado fica no cache do processo, compartilhado pelas sessões, e não no session_state
+# (que teria uma cópia do plano de exibição ou da linha de base por sessão)
+def memorizar(nome, chave, calcular):
+    return cache_calculos.obter(nome, chave, calcular)
+
+
+# Função para concluir uma gravação feita nesta sessão: passa a exibir a nova versão do plano e
+# reexecuta o app inteiro (as outras abas dependem dos dados), com o aviso guardado para a aba
+def concluir_gravacao(aba, mensagem):
+    st.session_state['versao_dados'] = plano.obter()[0]
+    st.session_state.setdefault(f'avisos_{aba}', []).append(mensagem)
+    st.rerun()
+
+
+# Função para concluir uma alteração das configurações: só a aba é reexecutada, já com o mapeamento novo
+# (ou o app inteiro, quando a alteração aparece em outras abas)
+def concluir_configuracao(mensagem, app_inteiro=False):
+    st.session_state.setdefault('avisos_configuracoes', []).append(mensagem)
+    st.rerun(scope='app' if execucao_completa or app_inteiro else 'fragment')
+
+
+def mostrar_avisos(aba):
+    for mensagem in st.session_state.pop(f'avisos_{aba}', []):
+        st.success(mensagem)
 
 
 st.title('Sistema de Gestão - Plano de Ação')
 
 tab1, tab2, tab3, tab4 = st.tabs(["CADASTRO", "TABELAS", "GRÁFICOS", "CONFIGURAÇÕES"])
 
-with tab1:
+@fragmento('CADASTRO')
+def aba_cadastro(secao):
     st.subheader("Cadastro de Ação")
+    mostrar_avisos('cadastro')
     with st.form("formulario_acao"):
         col1, col2, col3 = st.columns(3)
         
@@ -171,7 +206,7 @@ with tab1:
         with col6:
             corpo = st.selectbox("Corpo", options=st.session_state['corpos'])
         with col7:
-            nivel = st.selectbox("Nível", options=[f'N{n}' for n in range(1, 51)])
+            nivel = st.selectbox("Nível", options=NIVEIS)
         with col8:
             impacto = st.text_input("Impacto")
 
@@ -249,91 +284,210 @@ with tab1:
                 'Status': status  # Armazenando o status aqui
             }
             
-            # Adiciona o novo registro ao session_state
-            st.session_state['dados_formulario'].append(novo_dado)
-            
-            # Converte o session_state para um DataFrame
-            df_atualizado = pd.DataFrame(st.session_state['dados_formulario'])
-            
-            # Salva o DataFrame no arquivo Excel
-            salvar_dados(df_atualizado)
-            
-            st.success("Informações enviadas e salvas com sucesso!")
+            # Grava apenas o novo registro no armazenamento, que devolve a chave primária,
+            # e publica a nova versão do plano para todas as sessões
+            novo_dado[COLUNA_ID] = plano.inserir(novo_dado, autor)
+            if armazenamento.pertence(novo_dado):
+                concluir_gravacao('cadastro', "Informações enviadas e salvas com sucesso!")
+            else:
+                concluir_gravacao('cadastro', f"Informações salvas no Corpo '{corpo_final}', que não está entre os Corpos carregados.")
+
+    # Importação em lote de planos de ação a partir de planilhas CSV/XLSX
+    with st.expander("Importação em Lote", expanded='resultado_importacao' in st.session_state):
+        st.write("Colunas esperadas: " + ", ".join(COLUNAS_OBRIGATORIAS) + ". O Responsável é preenchido pelo mapeamento da Área.")
+        arquivo_importacao = st.file_uploader("Arquivo com as ações", type=['csv', 'xlsx'], key='arquivo_importacao')
+
+        if arquivo_importacao is not None and st.button("Importar Ações"):
+            total_linhas = contar_linhas(arquivo_importacao, arquivo_importacao.name)
+            barra_progresso = st.progress(0.0, text="Importando...")
+
+            def atualizar_progresso(lidas, importadas, com_erro):
+                fracao = min(lidas / total_linhas, 1.0) if total_linhas else 1.0
+                barra_progresso.progress(fracao, text=f"{lidas} linhas lidas, {importadas} importadas, {com_erro} com erro")
+
+            # A importação grava direto no armazenamento, sob a mesma trava de arquivo da fila de gravação
+            with plano.trava_arquivo():
+                importadas, erros_importacao = importar_acoes(
+                    arquivo_importacao, arquivo_importacao.name, armazenamento, area_responsavel,
+                    ao_progredir=atualizar_progresso, autor=autor
+                )
+            barra_progresso.progress(1.0, text="Importação concluída")
+
+            # Recarrega o plano para que as demais abas já mostrem as ações importadas;
+            # o resultado é exibido depois do rerun completo
+            plano.invalidar()
+            st.session_state['resultado_importacao'] = (importadas, erros_importacao)
+            concluir_gravacao('cadastro', f"{importadas} ações importadas com sucesso!")
+
+        if 'resultado_importacao' in st.session_state:
+            _, erros_importacao = st.session_state.pop('resultado_importacao')
+            if not erros_importacao.empty:
+                st.error(f"{erros_importacao.shape[0]} linhas não foram importadas:")
+                st.dataframe(erros_importacao, hide_index=True)
+                st.download_button(
+                    label="Baixar relatório de erros",
+                    data=erros_importacao.to_csv(index=False).encode('utf-8-sig'),
+                    file_name="erros_importacao.csv",
+                    mime="text/csv",
+                    on_click='ignore'
+                )
 
-# Aba 2: TABELAS
-with tab2:
+
+with tab1:
+    aba_cadastro()
+
+# Aba 2: TABELAS (os filtros, a ordenação e a paginação reexecutam só esta aba)
+@fragmento('TABELAS')
+def aba_tabelas(secao_tabelas):
     st.subheader("Tabela de Acompanhamento")
+    mostrar_avisos('tabelas')
+    versao_dados, df_plano = plano.obter()
     
     # Exibe os dados cadastrados
-    if 'dados_formulario' in st.session_state and st.session_state['dados_formulario']:
-        df = pd.DataFrame(st.session_state['dados_formulario'])
-
-        # Certifique-se de que as colunas de data estão no formato datetime
-        df['Inicio Plan'] = converter_para_datetime(df['Inicio Plan'])
-        df['Inicio Real'] = converter_para_datetime(df['Inicio Real'])
-        df['Fim Plan'] = converter_para_datetime(df['Fim Plan'])
-        df['Fim Real'] = converter_para_datetime(df['Fim Real'])
-
-        df['Status'] = df.apply(lambda row: calcular_status(
-        pd.to_datetime(row['Inicio Real']) if pd.notna(row['Inicio Real']) else pd.NaT,
-        pd.to_datetime(row['Fim Real']) if pd.notna(row['Fim Real']) else pd.NaT,
-        pd.to_datetime(row['Inicio Plan']) if pd.notna(row['Inicio Plan']) else pd.NaT,
-        pd.to_datetime(row['Fim Plan']) if pd.notna(row['Fim Plan']) else pd.NaT
-        ), axis=1)
-        
-        df['Status'] = df.apply(lambda row: calcular_status(
-            row['Inicio Real'], 
-            row['Fim Real'], 
-            row['Inicio Plan'],  # Passa o valor de Inicio Plan
-            row['Fim Plan']      # Passa o valor de Fim Plan
-        ), axis=1)
-
-        # Adicionar a coluna 'Semana do Ano' baseada na coluna 'Inicio Plan'
-        df['Semana do Ano'] = df['Inicio Plan'].dt.isocalendar().week
-
-        # Converte colunas para garantir que os tipos estão corretos para exibição
-        df['Inicio Plan'] = pd.to_datetime(df['Inicio Plan'], errors='coerce')
-        df['Fim Plan'] = pd.to_datetime(df['Fim Plan'], errors='coerce')
-        df['Inicio Real'] = pd.to_datetime(df['Inicio Real'], errors='coerce')
-        df['Fim Real'] = pd.to_datetime(df['Fim Real'], errors='coerce')
-        df['Inicio(REPRO)'] = pd.to_datetime(df['Inicio(REPRO)'], errors='coerce')  # Garante o tipo datetime
-        df['Fim(REPRO)'] = pd.to_datetime(df['Fim(REPRO)'], errors='coerce') 
-        df['Status'] = df['Status'].astype(str)  # Converte Status para string
-        df['Area'] = df['Area'].astype(str)      # Converte Area para string
-        df['Impacto'] = df['Impacto'].astype(str)  # Converte Impacto para string
-        for col in df.columns:
-            if df[col].dtype == "object":
-                df[col].fillna('', inplace=True)  # Substitui valores nulos por string vazia em colunas de texto
-            elif pd.api.types.is_numeric_dtype(df[col]):
-                df[col].fillna(0, inplace=True)
-
-        # Filtro de área
-        area_filtro = st.selectbox("Filtrar por Área", options=['Todas'] + list(area_responsavel.keys()))
-        
-        if area_filtro != 'Todas':
-            df = df[df['Area'] == area_filtro]
+    if not df_plano.empty:
+        # As colunas já chegam tipadas pelo esquema (datas em datetime64, categorias e texto)
+        df = df_plano.copy(deep=False)
 
-        st.dataframe(df)
+        df['Status'] = calcular_status_vetorizado(df).astype('category')
 
-        # Calcular a última e a próxima semana
-        hoje = datetime.now()
-        ultima_semana = hoje.isocalendar()[1] - 1  # Última semana do ano
-        proxima_semana = hoje.isocalendar()[1] + 1  # Próxima semana do ano
-        
-        # Filtrando apenas os dados da última semana passada
-        df_ultima_semana = df[df['Semana do Ano'] == ultima_semana]
+        # Adicionar a coluna 'Semana do Ano' a partir do índice de semanas ISO (construído uma vez por versão)
+        indice_semanas = obter_indice_semanas(df, versao_dados)
+        df['Semana do Ano'] = indice_semanas.semana_do_ano
+
+        # Substitui valores nulos por string vazia nas colunas de texto
+        df = para_exibicao(df)
 
-        # Exibe a tabela da última semana
-        #st.markdown("<style>th {color: red;}</style>", unsafe_allow_html=True)
-        #st.subheader("Tabela da Última Semana Passada")
-        #st.dataframe(df_ultima_semana)
+        # Índices de consulta construídos uma vez por versão dos dados (e por dia, pois o Status depende de hoje)
+        indice_consulta = obter_indice(df, (versao_dados, date.today()))
 
-        # Filtrando apenas os dados da próxima semana
-        df_proxima_semana = df[df['Semana do Ano'] == proxima_semana]
+        # Painel de consulta: filtros por valor, intervalo de datas, ordenação e paginação
+        with st.expander("Filtros", expanded=True):
+            texto_busca = st.text_input(
+                "Buscar no texto", placeholder="Ação, Observações, Nota de Trabalho, resultado alcançado, providência", key='busca_texto'
+            )
+            col_f1, col_f2, col_f3 = st.columns(3)
+            with col_f1:
+                filtro_area = st.multiselect("Área", options=sorted(set(area_responsavel.keys()) | set(indice_consulta.opcoes('Area'))), key='filtro_area')
+                filtro_status = st.multiselect("Status", options=indice_consulta.opcoes('Status'), key='filtro_status')
+            with col_f2:
+                filtro_corpo = st.multiselect("Corpo", options=indice_consulta.opcoes('Corpo'), key='filtro_corpo')
+                filtro_nivel = st.multiselect("Nível", options=indice_consulta.opcoes('Nível'), key='filtro_nivel')
+            with col_f3:
+                filtro_responsavel = st.multiselect("Responsável", options=indice_consulta.opcoes('Responsavel'), key='filtro_responsavel')
+                coluna_data_filtro = st.selectbox("Filtrar por data", options=['(nenhuma)'] + COLUNAS_FILTRO_DATA, key='coluna_data_filtro')
+
+            filtros_data = {}
+            if coluna_data_filtro != '(nenhuma)':
+                data_minima, data_maxima = indice_consulta.limites(coluna_data_filtro)
+                if data_minima is None:
+                    st.info(f"Nenhuma data preenchida em '{coluna_data_filtro}'.")
+                else:
+                    intervalo = st.date_input(
+                        "Intervalo", value=(data_minima.date(), data_maxima.date()), format="DD/MM/YYYY", key='intervalo_data_filtro'
+                    )
+                    if len(intervalo) == 2:
+                        filtros_data[coluna_data_filtro] = intervalo
+
+        mascara = indice_consulta.filtrar(
+            {'Area': filtro_area, 'Status': filtro_status, 'Corpo': filtro_corpo, 'Nível': filtro_nivel, 'Responsavel': filtro_responsavel},
+            filtros_data
+        )
 
-        # Exibe a tabela da próxima semana
-        #st.subheader("Tabela da Próxima Semana")
-        #st.dataframe(df_proxima_semana)
+        # Busca no texto livre pelo índice invertido: restringe às ações encontradas e, sem outra
+        # ordenação escolhida, mostra as mais relevantes primeiro
+        ordem_busca = None
+        if texto_busca.strip():
+            plano.sincronizar(plano.busca)
+            inicio_busca = time.perf_counter()
+            ordem_busca = indice_consulta.posicoes([id_acao for id_acao, _ in plano.busca.buscar(texto_busca)])
+            tempo_busca_ms = (time.perf_counter() - inicio_busca) * 1000
+            encontrados = np.zeros(mascara.size, dtype=bool)
+            encontrados[ordem_busca] = True
+            mascara &= encontrados
+        total_filtrado = int(mascara.sum())
+
+        col_o1, col_o2, col_o3, col_o4 = st.columns(4)
+        with col_o1:
+            ordenar_por = st.selectbox("Ordenar por", options=['(ordem de cadastro)'] + list(df.columns), key='ordenar_tabela')
+        with col_o2:
+            crescente = st.radio("Ordem", options=['Crescente', 'Decrescente'], horizontal=True, key='ordem_tabela') == 'Crescente'
+        with col_o3:
+            tamanho_pagina = st.selectbox("Linhas por página", options=TAMANHOS_PAGINA, key='tamanho_pagina')
+        total_paginas = max((total_filtrado + tamanho_pagina - 1) // tamanho_pagina, 1)
+        with col_o4:
+            pagina = min(st.number_input("Página", min_value=1, value=1, step=1, key='pagina_tabela'), total_paginas)
+
+        posicoes_pagina, _ = indice_consulta.paginar(
+            mascara,
+            ordenar_por=None if ordenar_por == '(ordem de cadastro)' else ordenar_por,
+            crescente=crescente,
+            pagina=pagina,
+            tamanho=tamanho_pagina,
+            ordem_padrao=ordem_busca
+        )
+
+        # Apenas a página visível é enviada ao navegador
+        legenda = f"{total_filtrado} registros encontrados - página {pagina} de {total_paginas}"
+        if ordem_busca is not None:
+            legenda += f" - busca em {tempo_busca_ms:.0f} ms" + (", por relevância" if ordenar_por == '(ordem de cadastro)' else "")
+        st.caption(legenda)
+        st.dataframe(df.iloc[posicoes_pagina])
+        secao_tabelas.linhas = df.shape[0]
+        secao_tabelas.serializado(df.iloc[posicoes_pagina])
+
+        # Edição em grade das ações filtradas: as células alteradas em várias ações são validadas em
+        # conjunto e gravadas em um único lote, que publica uma só versão nova do plano
+        with st.expander("Edição em Grade", expanded=False):
+            posicoes_grade = np.flatnonzero(mascara)
+            if posicoes_grade.size == 0:
+                st.info("Nenhuma ação filtrada para editar.")
+            elif posicoes_grade.size > MAXIMO_LINHAS_GRADE:
+                st.info(f"{posicoes_grade.size} ações filtradas: use os filtros para deixar até {MAXIMO_LINHAS_GRADE} ações na grade.")
+            else:
+                grade = df_plano.iloc[posicoes_grade].copy()
+                grade['Status'] = df['Status'].iloc[posicoes_grade].to_numpy()
+                for coluna in COLUNAS_CATEGORICAS:
+                    grade[coluna] = grade[coluna].astype(object).where(grade[coluna].notna(), None)
+                opcoes_responsavel = sorted(
+                    set(carregar_responsaveis()) | set(area_responsavel.values()) | set(grade['Responsavel'].dropna())
+                )
+                # A grade recomeça só quando a seleção muda, para não reaplicar edições em outras linhas.
+                # Uma gravação de outra sessão não descarta as edições ainda não gravadas: elas são
+                # reaplicadas sobre o plano novo, e as ações apagadas nesse meio tempo são recusadas ao gravar.
+                selecao_grade = zlib.crc32(grade[COLUNA_ID].to_numpy().tobytes())
+                chave_grade = f'grade_edicao_{selecao_grade}'
+                editado = st.data_editor(
+                    grade,
+                    key=chave_grade,
+                    hide_index=True,
+                    disabled=COLUNAS_BLOQUEADAS,
+                    column_config={
+                        'Area': st.column_config.SelectboxColumn("Area", options=sorted(set(area_responsavel.keys()) | set(grade['Area'].dropna()))),
+                        'Corpo': st.column_config.SelectboxColumn("Corpo", options=st.session_state['corpos']),
+                        'Nível': st.column_config.SelectboxColumn("Nível", options=NIVEIS),
+                        'Responsavel': st.column_config.SelectboxColumn("Responsavel", options=opcoes_responsavel),
+                        **{coluna: st.column_config.DateColumn(coluna, format="DD/MM/YYYY") for coluna in COLUNAS_FILTRO_DATA},
+                    },
+                )
+                alteracoes = diferencas(grade, editado)
+                st.caption(f"{sum(len(campos) for campos in alteracoes.values())} células alteradas em {len(alteracoes)} ações")
+
+                if st.button("Gravar alterações", disabled=not alteracoes, key='gravar_grade'):
+                    operacoes, erros_grade = preparar_edicoes(df_plano, alteracoes)
+                    if not erros_grade.empty:
+                        st.error(f"{erros_grade.shape[0]} ações com erro: nenhuma alteração foi gravada.")
+                        st.dataframe(erros_grade, hide_index=True)
+                    else:
+                        # Todas as ações alteradas em uma única gravação; a grade recomeça do plano gravado
+                        try:
+                            plano.gravar_lote(operacoes, autor)
+                        except LookupError as erro:
+                            st.error(f"{erro} (apagada por outra sessão?): nenhuma alteração foi gravada.")
+                        else:
+                            st.session_state.pop(chave_grade, None)
+                            concluir_gravacao('tabelas', f"{len(operacoes)} ações atualizadas em uma única gravação!")
+
+        df = df[mascara]
     else:
         st.write("Nenhum dado cadastrado ainda.")
 
@@ -341,13 +495,13 @@ with tab2:
     with st.expander("Editar Registros Existentes", expanded=False):
         st.subheader("Editar Registros Existentes")
 
-        if 'dados_formulario' in st.session_state and st.session_state['dados_formulario']:
-            indices_disponiveis = list(range(len(st.session_state['dados_formulario'])))
+        if not df_plano.empty:
+            indices_disponiveis = list(range(df_plano.shape[0]))
             registro_selecionado = st.selectbox("Selecione o número do registro para editar", indices_disponiveis, key='registro_editar')
             st.subheader(f"Editando registro #{registro_selecionado}")
 
             # Obter dados do registro selecionado
-            registro_data = st.session_state['dados_formulario'][registro_selecionado]
+            registro_data = registro_como_dict(df_plano.iloc[registro_selecionado])
 
             area_options = list(area_responsavel.keys())
             area_value = registro_data['Area']
@@ -392,7 +546,7 @@ with tab2:
                 key='fim_repro_edit'
             )
 
-            nivel_edit = st.selectbox('Nível', options=[f'N{n}' for n in range(1, 51)], index=int(registro_data['Nível'][1:]))
+            nivel_edit = st.selectbox('Nível', options=NIVEIS, index=int(registro_data['Nível'][1:]))
             
             # Selectbox para alterar o status manualmente
             status_opcoes = [''] + ['Concluída', 'Atrasada', 'Em andamento', 'Programada', '-']  # Opção vazia adicionada
@@ -425,69 +579,234 @@ with tab2:
                 elif not responsavel_edit:
                     st.error("O campo de responsável não pode estar vazio.")
                 else:
-                    # Atualiza os dados no DataFrame original
-                    st.session_state['dados_formulario'][registro_selecionado]['Area'] = area_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Responsavel'] = responsavel_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Local'] = local_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Acao'] = acao_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Impacto'] = impacto_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Inicio Plan'] = inicio_plan_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Fim Plan'] = fim_plan_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Inicio Real'] = inicio_real_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Fim Real'] = fim_real_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Inicio(REPRO)'] = inicio_repro_edit  # Atualiza o novo campo
-                    st.session_state['dados_formulario'][registro_selecionado]['Fim(REPRO)'] = fim_repro_edit  # Atualiza o novo campo
-                    st.session_state['dados_formulario'][registro_selecionado]['Observações'] = observacoes_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Nota de Trabalho'] = nota_trabalho_edit
-                    st.session_state['dados_formulario'][registro_selecionado]['Nível'] = nivel_edit  # Atualiza o campo Nível
-                    st.session_state['dados_formulario'][registro_selecionado]['O resultado esperado foi alcançado?'] = resultado_esperado_alcancado_edit
+                    # Campos alterados do registro selecionado
+                    registro_atualizado = dict(registro_data)
+                    registro_atualizado['Area'] = area_edit
+                    registro_atualizado['Responsavel'] = responsavel_edit
+                    registro_atualizado['Local'] = local_edit
+                    registro_atualizado['Acao'] = acao_edit
+                    registro_atualizado['Impacto'] = impacto_edit
+                    registro_atualizado['Inicio Plan'] = inicio_plan_edit
+                    registro_atualizado['Fim Plan'] = fim_plan_edit
+                    registro_atualizado['Inicio Real'] = inicio_real_edit
+                    registro_atualizado['Fim Real'] = fim_real_edit
+                    registro_atualizado['Inicio(REPRO)'] = inicio_repro_edit  # Atualiza o novo campo
+                    registro_atualizado['Fim(REPRO)'] = fim_repro_edit  # Atualiza o novo campo
+                    registro_atualizado['Observações'] = observacoes_edit
+                    registro_atualizado['Nota de Trabalho'] = nota_trabalho_edit
+                    registro_atualizado['Nível'] = nivel_edit  # Atualiza o campo Nível
+                    registro_atualizado['O resultado esperado foi alcançado?'] = resultado_esperado_alcancado_edit
 
                     # Atualiza o status com base no selectbox
                     if status_preenchido:  # Se o usuário selecionou um status
-                        st.session_state['dados_formulario'][registro_selecionado]['Status'] = status_preenchido
+                        registro_atualizado['Status'] = status_preenchido
                     else:  # Caso contrário, calcula o status
-                        st.session_state['dados_formulario'][registro_selecionado]['Status'] = calcular_status(
-                            st.session_state['dados_formulario'][registro_selecionado]['Inicio Real'],
-                            st.session_state['dados_formulario'][registro_selecionado]['Fim Real'],
-                            st.session_state['dados_formulario'][registro_selecionado]['Inicio Plan'],
-                            st.session_state['dados_formulario'][registro_selecionado]['Fim Plan'],
-                            st.session_state['dados_formulario'][registro_selecionado]['Inicio(REPRO)'],
-                            st.session_state['dados_formulario'][registro_selecionado]['Fim(REPRO)']
+                        registro_atualizado['Status'] = calcular_status(
+                            registro_atualizado['Inicio Real'],
+                            registro_atualizado['Fim Real'],
+                            registro_atualizado['Inicio Plan'],
+                            registro_atualizado['Fim Plan'],
+                            registro_atualizado['Inicio(REPRO)'],
+                            registro_atualizado['Fim(REPRO)']
                         )
 
-                    # Salva as alterações no arquivo
-                    salvar_dados(pd.DataFrame(st.session_state['dados_formulario']))
-                    st.success("Registro atualizado com sucesso!")
+                    # Salva apenas o registro alterado e publica a nova versão do plano
+                    try:
+                        plano.atualizar(registro_atualizado[COLUNA_ID], registro_atualizado, autor)
+                    except LookupError:
+                        st.error("A ação não existe mais (apagada por outra sessão?); nada foi gravado.")
+                    else:
+                        concluir_gravacao('tabelas', "Registro atualizado com sucesso!")
 
         # Verifica se existem registros antes de exibir o botão de apagar
-        if len(st.session_state['dados_formulario']) > 0:
+        if df_plano.shape[0] > 0:
             # Botão de apagar registro
             if st.button("Apagar Registro"):
-                # Remover o registro selecionado
-                st.session_state['dados_formulario'].pop(registro_selecionado)
-                
-                # Atualizar o DataFrame e salvar
-                df_atualizado = pd.DataFrame(st.session_state['dados_formulario'])
-                salvar_dados(df_atualizado)
-                
-                st.success(f"Registro #{registro_selecionado} apagado com sucesso!")
+                # Apaga apenas a linha do registro selecionado no armazenamento
+                try:
+                    plano.apagar(registro_data[COLUNA_ID], autor)
+                except LookupError:
+                    st.error("A ação não existe mais (apagada por outra sessão?).")
+                else:
+                    concluir_gravacao('tabelas', f"Registro #{registro_selecionado} apagado com sucesso!")
 
         else:
             st.info("Não há registros para editar.")
 
+
+with tab2:
+    aba_tabelas()
+
+# Curva S em fragmento: trocar a granularidade ou o percentual redesenha só este gráfico,
+# e a figura é reaproveitada enquanto a versão dos dados e as opções não mudarem
+@fragmento('curva_s')
+def grafico_curva_s(secao_grafico):
+    versao_dados, df = plano.obter()
+    secao_grafico.linhas = df.shape[0]
+    data_inicio = df['Inicio Plan'].min()
+    data_fim = df['Fim Plan'].max()
+    if pd.isna(data_inicio) or pd.isna(data_fim):
+        return
+
+    col_granularidade, col_percentual, col_linha_base = st.columns(3)
+    with col_granularidade:
+        granularidade = st.selectbox("Granularidade da Curva S", options=list(GRANULARIDADES.keys()), key='granularidade_curva_s')
+    with col_percentual:
+        percentual = st.checkbox("Exibir em percentual do total", value=True, key='percentual_curva_s')
+    with col_linha_base:
+        versoes_base = {f"{versao['versao']} - {versao['nome']}": versao for versao in reversed(linhas_base.versoes())}
+        escolha_base = st.selectbox("Comparar com a linha de base", options=['(nenhuma)', *versoes_base], key='linha_base_curva_s')
+
+    # Linha de base reconstruída a partir das diferenças gravadas, uma vez por versão escolhida
+    versao_base = versoes_base.get(escolha_base)
+    linha_base = None
+    if versao_base is not None:
+        linha_base = memorizar(
+            'linha_base', (linhas_base.pasta, versao_base['versao']), lambda: linhas_base.reconstruir(versao_base['versao'])
+        )
+        # As linhas de base guardam o site inteiro; a comparação é com os mesmos Corpos carregados
+        if armazenamento.selecao is not None:
+            linha_base = linha_base[linha_base['Corpo'].isin(armazenamento.selecao)]
+        inicio_base, fim_base = linha_base['Inicio Plan'].min(), linha_base['Fim Plan'].max()
+        if not pd.isna(inicio_base):
+            data_inicio = min(data_inicio, inicio_base)
+        if not pd.isna(fim_base):
+            data_fim = max(data_fim, fim_base)
+
+    fig_s = memorizar(
+        'curva_s', (versao_dados, date.today(), granularidade, percentual, versao_base and versao_base['versao']),
+        lambda: figura_curva_s(
+            df, data_inicio, data_fim, granularidade=granularidade, percentual=percentual, linha_base=linha_base,
+            nome_linha_base=f"Linha de base: {versao_base['nome']}" if versao_base else 'Linha de base'
+        )
+    )
+    st.plotly_chart(fig_s)
+    secao_grafico.serializado(fig_s)
+
+
+# Plano preparado para as tabelas do painel (Status do dia, semana ISO e texto vazio no lugar
+# de <NA>), montado uma vez por versão dos dados
+def plano_para_tabelas(versao_dados, df_plano):
+    def preparar():
+        df = df_plano.copy(deep=False)
+        df['Status'] = calcular_status_vetorizado(df).astype('category')
+
+        # Adicionar a coluna 'Semana do Ano' a partir do índice de semanas ISO (construído uma vez por versão)
+        indice_semanas = obter_indice_semanas(df, versao_dados)
+        df['Semana do Ano'] = indice_semanas.semana_do_ano
+
+        # Substitui valores nulos por string vazia nas colunas de texto
+        return para_exibicao(df), indice_semanas
+    return memorizar('plano_para_tabelas', (versao_dados, date.today()), preparar)
+
+
+# Tabelas semanais em fragmento: escolher o ano e a semana reexecuta só estas tabelas
+@fragmento('tabelas_semanais')
+def tabelas_semanais(secao_grafico):
+    versao_dados, df_plano = plano.obter()
+    df, indice_semanas = plano_para_tabelas(versao_dados, df_plano)
+    secao_grafico.linhas = df.shape[0]
+
+    # Semanas ISO (ano, semana) relativas a hoje; o ano evita misturar semanas de anos diferentes
+    hoje = datetime.now().date()
+    ultima_semana = semana_relativa(hoje, -1)
+    semana_atual = semana_relativa(hoje)
+    proxima_semana = semana_relativa(hoje, 1)
+
+    # Filtrando apenas os dados da última semana passada
+    df_ultima_semana = df.iloc[indice_semanas.linhas(*ultima_semana)]
+
+    # Exibe a tabela da última semana
+    st.markdown("<style>th {color: red;}</style>", unsafe_allow_html=True)
+    st.subheader("Atividades planejadas da semana passada")
+    st.dataframe(df_ultima_semana)
+    secao_grafico.serializado(df_ultima_semana)
+
+    df_semana_atual = df.iloc[indice_semanas.linhas(*semana_atual)]
+
+    # Exibe a tabela da semana atual
+    st.subheader("Atividades planejadas da semana atual")
+    st.dataframe(df_semana_atual)
+    secao_grafico.serializado(df_semana_atual)
+
+    # Filtrando apenas os dados da próxima semana
+    df_proxima_semana = df.iloc[indice_semanas.linhas(*proxima_semana)]
+
+    # Exibe a tabela da próxima semana
+    st.subheader("Atividades planejadas da semana seguinte")
+    st.dataframe(df_proxima_semana)
+    secao_grafico.serializado(df_proxima_semana)
+
+    # Consulta de uma semana qualquer
+    st.subheader("Atividades planejadas por semana")
+    col_ano, col_semana = st.columns(2)
+    with col_ano:
+        ano_selecionado = st.number_input("Ano", min_value=2000, max_value=2100, value=semana_atual[0], step=1, key='ano_semana_x')
+    with col_semana:
+        semana_selecionada = st.number_input("Semana", min_value=1, max_value=53, value=semana_atual[1], step=1, key='semana_x')
+    st.dataframe(df.iloc[indice_semanas.linhas(ano_selecionado, semana_selecionada)])
+
+
+# Ações ativas em uma janela (Gantt e ocupação diária), por Corpo e Nível, respondidas pelo índice de
+# intervalos sem varrer o plano; o índice acompanha as gravações por deltas
+@fragmento('ocupacao')
+def grafico_ocupacao(secao_grafico):
+    versao_dados, df_plano = plano.obter()
+    plano.sincronizar(plano.intervalos)
+
+    st.subheader("Ações ativas por Corpo e Nível")
+    hoje = date.today()
+    col_janela, col_tipos = st.columns(2)
+    with col_janela:
+        janela = st.date_input(
+            "Janela", value=(hoje - timedelta(days=7), hoje + timedelta(days=30)), format="DD/MM/YYYY", key='janela_ocupacao'
+        )
+    with col_tipos:
+        tipos = st.multiselect("Intervalos", options=list(TIPOS_INTERVALO), default=list(TIPOS_INTERVALO), key='tipos_ocupacao')
+    col_corpo, col_nivel = st.columns(2)
+    with col_corpo:
+        corpos = st.multiselect("Corpo", options=list(df_plano['Corpo'].cat.categories), key='corpos_ocupacao')
+    with col_nivel:
+        niveis = st.multiselect("Nível", options=list(df_plano['Nível'].cat.categories), key='niveis_ocupacao')
+
+    if len(janela) != 2 or not tipos:
+        st.info("Selecione o início e o fim da janela e ao menos um tipo de intervalo.")
+        return
+    inicio, fim = janela
+    ativos = plano.intervalos.ativos(inicio, fim, tipos=tipos, corpos=corpos, niveis=niveis)
+    secao_grafico.linhas = ativos.shape[0]
+    st.caption(f"{ativos[COLUNA_ID].nunique()} ações ativas ({ativos.shape[0]} intervalos) entre {inicio:%d/%m/%Y} e {fim:%d/%m/%Y}")
+    if ativos.empty:
+        return
+
+    fig_ocupacao = figura_ocupacao(ocupacao_diaria(ativos, inicio, fim))
+    st.plotly_chart(fig_ocupacao)
+    secao_grafico.serializado(fig_ocupacao)
+
+    # O Gantt mostra as primeiras ações da janela (pelo início); a tabela abaixo traz todas
+    ids_gantt = ativos[COLUNA_ID].drop_duplicates().head(MAXIMO_ACOES_GANTT)
+    acoes = df_plano.loc[df_plano[COLUNA_ID].isin(ativos[COLUNA_ID]), [COLUNA_ID, 'Acao', 'Area', 'Local']]
+    ativos = ativos.merge(acoes, on=COLUNA_ID, how='left')
+    ativos['Rotulo'] = '#' + ativos[COLUNA_ID].astype(str) + ' ' + ativos['Acao'].fillna('').astype(str).str.slice(0, 40)
+    if ids_gantt.size < ativos[COLUNA_ID].nunique():
+        st.caption(f"Gantt limitado às {MAXIMO_ACOES_GANTT} primeiras ações da janela.")
+    fig_gantt = figura_gantt(ativos[ativos[COLUNA_ID].isin(ids_gantt)], inicio, fim)
+    st.plotly_chart(fig_gantt)
+    secao_grafico.serializado(fig_gantt)
+
+    tabela_ativos = para_exibicao(ativos.drop(columns='Rotulo'))
+    st.dataframe(tabela_ativos, hide_index=True)
+    secao_grafico.serializado(tabela_ativos)
+
+
 # Gráficos
-with tab3:
+@fragmento('GRÁFICOS')
+def aba_graficos(secao):
     st.subheader("Gráficos")
+    versao_dados, df_plano = plano.obter()
+    df = df_plano.copy(deep=False)
 
-    if 'dados_formulario' in st.session_state and st.session_state['dados_formulario']:
-        df = pd.DataFrame(st.session_state['dados_formulario'])
-        
-        # Convertendo as colunas de data para datetime
-        df['Inicio Plan'] = pd.to_datetime(df['Inicio Plan'], errors='coerce')
-        df['Fim Plan'] = pd.to_datetime(df['Fim Plan'], errors='coerce')
-        df['Fim Real'] = pd.to_datetime(df['Fim Real'], errors='coerce')
-        df['Fim(REPRO)'] = pd.to_datetime(df['Fim(REPRO)'], errors='coerce')
-
+    if not df_plano.empty:
         data_inicio = df['Inicio Plan'].dropna().min()
         data_fim = df['Fim Plan'].dropna().max()
 
@@ -497,295 +816,60 @@ with tab3:
             datas = pd.date_range(start=data_inicio, end=data_fim)
 
     if not df.empty:
+        # Agregados do painel mantidos por deltas; só são recalculados se a versão dos dados ou o dia mudarem
+        plano.sincronizar(plano.agregados)
+
         data_inicio = df['Inicio Plan'].min()
         data_fim = df['Fim Plan'].max()
 
-        # Convertendo as colunas de data para datetime
-        df['Inicio Plan'] = pd.to_datetime(df['Inicio Plan'], errors='coerce')
-        df['Fim Plan'] = pd.to_datetime(df['Fim Plan'], errors='coerce')
-        df['Fim Real'] = pd.to_datetime(df['Fim Real'], errors='coerce')
-        df['Fim(REPRO)'] = pd.to_datetime(df['Fim(REPRO)'], errors='coerce')
-
         if pd.isna(data_inicio) or pd.isna(data_fim):
             st.warning("As datas de início ou fim planejadas não estão disponíveis. Os gráficos não podem ser criados.")
         else:
-            datas = pd.date_range(start=data_inicio, end=data_fim)
+            grafico_curva_s()
 
-            progresso_planejado = [
-                df[df['Fim Plan'].notna() & (df['Fim Plan'] <= data)].shape[0] for data in datas
-            ]
-            progresso_real = [
-                df[df['Fim Real'].notna() & (df['Fim Real'] <= data)].shape[0] for data in datas
-            ]
-            progresso_reprogramado = [
-                df[df['Fim(REPRO)'].notna() & (df['Fim(REPRO)'] <= data)].shape[0] for data in datas
-            ]
-
-            fig_s = go.Figure()
-
-            # Adicionando as linhas planejadas
-            fig_s.add_trace(go.Scatter(
-                x=datas, 
-                y=progresso_planejado, 
-                mode='lines+markers', 
-                name='Planejado', 
-                line=dict(color='black'),
-                marker=dict(symbol='circle', size=6)
-            ))
-
-            # Adicionando as linhas reais
-            fig_s.add_trace(go.Scatter(
-                x=datas, 
-                y=progresso_real, 
-                mode='lines+markers', 
-                name='Real', 
-                line=dict(color='orange'),
-                marker=dict(symbol='circle', size=6)
-            ))
-
-            # Adicionando a linha reprogramada
-            fig_s.add_trace(go.Scatter(
-                x=datas, 
-                y=progresso_reprogramado, 
-                mode='lines+markers', 
-                name='Reprogramado', 
-                line=dict(color='red'),
-                marker=dict(symbol='circle', size=6)
-            ))
-
-            # Verificando se há valores em progresso_planejado, progresso_real e progresso_reprogramado
-            y_max = max(
-                max(progresso_planejado) if progresso_planejado else 0,
-                max(progresso_real) if progresso_real else 0,
-                max(progresso_reprogramado) if progresso_reprogramado else 0
-            )
-
-            hoje = pd.Timestamp(datetime.now().date())
-
-            # Calcular o progresso até hoje
-            progresso_hoje = [
-                df[df['Fim Plan'].notna() & (df['Fim Plan'] <= hoje)].shape[0],
-                df[df['Fim Real'].notna() & (df['Fim Real'] <= hoje)].shape[0],
-                df[df['Fim(REPRO)'].notna() & (df['Fim(REPRO)'] <= hoje)].shape[0]
-            ]
-
-            datas_ate_hoje = datas[datas <= hoje]
-            progresso_real_ate_hoje = progresso_real[:len(datas_ate_hoje)]
-
-            # Adicionar a linha de "Hoje" com estilo tracejado, seguindo o eixo X como uma linha horizontal
-            fig_s.add_trace(go.Scatter(
-                x=datas,  # Usa a mesma série de datas para que a linha "Hoje" siga o mesmo padrão no eixo X
-                y=[progresso_hoje[0]] * len(datas),  # Mantém o valor de progresso até hoje constante ao longo do eixo X
-                mode='lines+markers', 
-                name='Hoje', 
-                line=dict(color='blue', dash='dash'),  # Define a linha como tracejada
-                marker=dict(symbol='circle', size=6)
-            ))
-
-            # Configurando o layout do gráfico de Curva S
-            fig_s.update_layout(
-                title="Curva S - Progresso Cumulativo (Planejado vs Real vs Reprogramado)",
-                xaxis_title="Data",
-                yaxis_title="Progresso (%)",
-                xaxis=dict(tickformat='%d/%m/%Y'),
-                legend=dict(x=0, y=1, bgcolor='rgba(0,0,0,0)'),
-                hovermode="x unified"
-            )
-
-            fig_s.update_yaxes(range=[0, 12])
-            st.plotly_chart(fig_s)
-            
-  
-
-            df['Status'] = df.apply(lambda row: calcular_status(
-                pd.to_datetime(row['Inicio Real']) if pd.notna(row['Inicio Real']) else pd.NaT,
-                pd.to_datetime(row['Fim Real']) if pd.notna(row['Fim Real']) else pd.NaT,
-                pd.to_datetime(row['Inicio Plan']) if pd.notna(row['Inicio Plan']) else pd.NaT,
-                pd.to_datetime(row['Fim Plan']) if pd.notna(row['Fim Plan']) else pd.NaT
-            ), axis=1)
-
-            # Criação de um DataFrame para contagem de registros por status e área
-            df_status_area = df.groupby(['Area', 'Status']).size().reset_index(name='Count')
-
-            # Definindo cores para cada área
-            cores_area = {
-                'Transporte': '#A4450C',  
-                'Infraestrutura': '#F66A6B',  
-                'Desenvolvimento': '#FF4F72',  
-                'Ventilação': '#FBBC00',  
-                'Backlog': '#FF6D01',  
-                'Caldeiraria': '#ED6B3C',  
-                'ObraCivil': '#FF00FF',  
-                'Mec.Rochas': '#943134'   
-            }
-
-            df_status_area['Color'] = df_status_area['Area'].map(cores_area)
-
-            fig_bar = go.Figure()
-
-            df_soma_area = df_status_area.groupby('Area')['Count'].sum().reset_index()
-            soma_area_dict = dict(zip(df_soma_area['Area'], df_soma_area['Count']))
-
-            for area in df_status_area['Area'].unique():
-                # Filtra os dados para a área atual
-                filtered_df = df_status_area[df_status_area['Area'] == area]
-                
-                # Cria uma string de hover para mostrar o total de cada status
-                hover_text = '<br>'.join([f"{status}: {count}" for status, count in zip(filtered_df['Status'], filtered_df['Count'])])
-                
-                # Adiciona uma barra para a área com o texto de hover personalizado
-                fig_bar.add_trace(go.Bar(
-                    x=[area],  # Nome da área no eixo X
-                    y=[filtered_df['Count'].sum()],  # Soma total dos status para essa área
-                    name=area,
-                    marker_color=cores_area.get(area, '#333333'),  # Obtém a cor da área ou usa uma cor padrão
-                    width=0.4,
-                    hovertemplate=f"Área: {area}<br>{hover_text}<extra></extra>"  # Texto de hover com a soma dos status
-                ))
-
-            fig_bar.update_layout(
-                title="Status das Ações (total) - Gráfico Empilhado",
-                xaxis_title="Status",
-                yaxis_title="Quantidade de Cadastros",
-                barmode='stack',
-                legend_title_text="Área",
-                height=600,
-                legend=dict(
-                    x=1,  # Mover a legenda para fora do gráfico à direita
-                    y=1,  # Posicionar no topo do gráfico
-                    traceorder='normal',
-                    orientation='v'  # Orientação vertical
-                )
-            )
-            st.plotly_chart(fig_bar)
+            with perfilador.secao('status_area') as secao_grafico:
+                # Contagem de registros por status e área, lida dos agregados
+                fig_bar = figura_status_area(plano.agregados.tabela_area_status())
+                st.plotly_chart(fig_bar)
+                secao_grafico.serializado(fig_bar)
         
-            if 'Status' not in df.columns:
-                df['Status'] = df.apply(lambda row: calcular_status(
-                    pd.to_datetime(row['Inicio Real']) if pd.notna(row['Inicio Real']) else pd.NaT,
-                    pd.to_datetime(row['Fim Real']) if pd.notna(row['Fim Real']) else pd.NaT,
-                    pd.to_datetime(row['Inicio Plan']) if pd.notna(row['Inicio Plan']) else pd.NaT,
-                    pd.to_datetime(row['Fim Plan']) if pd.notna(row['Fim Plan']) else pd.NaT
-                ), axis=1)
-
-            status_counts = df['Status'].value_counts()
-
-            # Contando a quantidade de cada status, excluindo o status "-"
-            status_counts = status_counts[status_counts.index != '_']
-
-            # Dicionário de cores padrão para os status
-            cores_status = {
-                'CONCLUÍDA': '#8E44AD',  # Azul
-                'ATRASADA': '#E74C3C',   # Vermelho
-                'EM ANDAMENTO': '#F39C12', # Laranja
-                'PROGRAMADA': '#ED6B3C'   # Verde
-            }
-
-            # Criando o gráfico de pizza
-            fig_pizza = go.Figure(data=[go.Pie(
-                labels=status_counts.index, 
-                values=status_counts.values, 
-                marker=dict(colors=[cores_status[status] for status in status_counts.index])
-            )])
-
-            # Atualizando o layout do gráfico
-            fig_pizza.update_layout(
-                title="Distribuição Percentual dos Status das Ações",
-                legend_title="Status",
-                height=400,
-                showlegend=True
-            )
-
-            # Exibindo o gráfico
-            st.plotly_chart(fig_pizza)
-
-                    # Tabela de últimos 5 registros atrasados
-            st.subheader("Últimos 5 Registros Atrasados")
-
-            # Filtrando registros atrasados
-            registros_atrasados = df[df['Status'] == 'Atrasada']
-
-            # Ordenar pelos mais atrasados
-            registros_atrasados = registros_atrasados.sort_values(by='Fim Plan', ascending=True)
-
-            # Selecionar os últimos 5
-            ultimos_5_atrasados = registros_atrasados.head(5)
-
-                    # Adicionar a coluna 'Semana do Ano' baseada na coluna 'Inicio Plan'
-            df['Semana do Ano'] = df['Inicio Plan'].dt.isocalendar().week
-
-            df['Inicio Plan'] = pd.to_datetime(df['Inicio Plan'], errors='coerce')
-            df['Fim Plan'] = pd.to_datetime(df['Fim Plan'], errors='coerce')
-            df['Fim Real'] = pd.to_datetime(df['Fim Real'], errors='coerce')
-            df['Fim(REPRO)'] = pd.to_datetime(df['Fim(REPRO)'], errors='coerce')
+            with perfilador.secao('pizza') as secao_grafico:
+                fig_pizza = figura_pizza(plano.agregados.contagem_status())
 
-            for col in df.columns:
-                if df[col].dtype == "object":
-                    df[col].fillna('', inplace=True)  # Substitui valores nulos por string vazia em colunas de texto
-                elif pd.api.types.is_numeric_dtype(df[col]):
-                    df[col].fillna(0, inplace=True)  # Substitui valores nulos por 0 em colunas numéricas
-                elif pd.api.types.is_datetime64_any_dtype(df[col]):
-                    df[col].fillna(pd.NaT, inplace=True)
+                st.plotly_chart(fig_pizza)
+                secao_grafico.serializado(fig_pizza)
 
-            # Exibir a tabela se houver registros atrasados
-            if not ultimos_5_atrasados.empty:
-                st.dataframe(ultimos_5_atrasados)
-            else:
-                st.write("Não há registros atrasados.")
-
-            # Calcular a última e a próxima semana
-            hoje = datetime.now()
-            ultima_semana = hoje.isocalendar()[1] - 1  # Última semana do ano
-            semana_atual = hoje.isocalendar()[1] 
-            proxima_semana = hoje.isocalendar()[1] + 1  # Próxima semana do ano
-            
-            # Filtrando apenas os dados da última semana passada
-            df_ultima_semana = df[df['Semana do Ano'] == ultima_semana]
+            with perfilador.secao('atrasados', linhas=df.shape[0]) as secao_grafico:
+                df, _ = plano_para_tabelas(versao_dados, df_plano)
 
-            # Exibe a tabela da última semana
-            st.markdown("<style>th {color: red;}</style>", unsafe_allow_html=True)
-            st.subheader("Atividades planejadas da semana passada")
-            st.dataframe(df_ultima_semana)
+                        # Tabela de últimos 5 registros atrasados
+                st.subheader("Últimos 5 Registros Atrasados")
 
-            df_semana_atual = df[df['Semana do Ano'] == semana_atual]
+                # Registros atrasados há mais tempo
+                ultimos_5_atrasados = ultimos_atrasados(df)
 
-            # Exibe a tabela da semana atual
-            st.subheader("Atividades planejadas da semana atual")
-            st.dataframe(df_semana_atual)
+                # Exibir a tabela se houver registros atrasados
+                if not ultimos_5_atrasados.empty:
+                    st.dataframe(ultimos_5_atrasados)
+                    secao_grafico.serializado(ultimos_5_atrasados)
+                else:
+                    st.write("Não há registros atrasados.")
 
-            # Filtrando apenas os dados da próxima semana
-            df_proxima_semana = df[df['Semana do Ano'] == proxima_semana]
+            tabelas_semanais()
 
-            # Exibe a tabela da próxima semana
-            st.subheader("Atividades planejadas da semana seguinte")
-            st.dataframe(df_proxima_semana)
+            grafico_ocupacao()
 
         # Função para exibir as porcentagens de atividades e de impacto em cartões aprimorados
-        def exibir_resumo_atividades(df):
-            total_atividades = df.shape[0]
-            
-            # Calcula o total de atividades concluídas e atrasadas
-            atividades_concluídas = df[df['Status'] == 'Concluída'].shape[0]
-            atividades_atrasadas = df[df['Status'] == 'Atrasada'].shape[0]
-            
-            # Verifica se não há atividades
-            if total_atividades == 0:
-                porcentagem_planejada = 0.0
-                porcentagem_concluida = 0.0
-                porcentagem_atrasada = 0.0
-            else:
-                porcentagem_planejada = 100.0
-                porcentagem_concluida = (atividades_concluídas / total_atividades) * 100
-                porcentagem_atrasada = (atividades_atrasadas / total_atividades) * 100
-
-            # Cálculo de atividades com e sem impacto
-            atividades_com_impacto = df[df['Impacto'].notna() & (df['Impacto'] != '')].shape[0]
-            atividades_sem_impacto = total_atividades - atividades_com_impacto
+        def exibir_resumo_atividades(resumo):
+            total_atividades = resumo['total']
 
-            if total_atividades > 0:
-                porcentagem_impacto = (atividades_com_impacto / total_atividades) * 100
-                porcentagem_sem_impacto = (atividades_sem_impacto / total_atividades) * 100
-            else:
-                porcentagem_impacto = porcentagem_sem_impacto = 0.0
+            # Porcentagens sobre o total de atividades (zero quando não há atividades)
+            porcentagens = porcentagens_resumo(resumo)
+            porcentagem_planejada = porcentagens['planejadas']
+            porcentagem_concluida = porcentagens['concluidas']
+            porcentagem_atrasada = porcentagens['atrasadas']
+            porcentagem_impacto = porcentagens['com_impacto']
+            porcentagem_sem_impacto = porcentagens['sem_impacto']
 
             # Layout aprimorado dos cartões
             col1, col2, col3, col4 = st.columns([1, 1, 1, 1])  # Definindo a proporção das colunas
@@ -888,32 +972,25 @@ with tab3:
                 )
 
         # Chamar a função para exibir os cartões estilizados
-        exibir_resumo_atividades(df)
+        with perfilador.secao('resumo'):
+            exibir_resumo_atividades(plano.agregados.resumo())
 
 
-# Função para carregar os responsáveis de um arquivo ou criar lista padrão
-def carregar_responsaveis():
-    try:
-        with open('responsaveis.txt', 'r') as file:
-            responsaveis = file.read().splitlines()
-    except FileNotFoundError:
-        # Caso o arquivo não exista, cria uma lista padrão de responsáveis
-        responsaveis = ['Renan Tales', 'Felipe Zanela', 'Jayr Rodrigues', 'Geraldo Duarte', 'Osman Pereira', 'Darley', 'Jeferson Lage']
-    return responsaveis
-
-def salvar_responsaveis(responsaveis):
-    with open('responsaveis.txt', 'w') as file:
-        for responsavel in responsaveis:
-            file.write(f"{responsavel}\n")
+with tab3:
+    aba_graficos()
 
 # Inicializando a lista de responsáveis
 responsaveis = carregar_responsaveis()
 
 # Aba 4: CONFIGURAÇÕES
-with tab4:
+@fragmento('CONFIGURAÇÕES')
+def aba_configuracoes(secao):
     st.subheader("Configurações")
+    mostrar_avisos('configuracoes')
+    versao_dados, df_plano = plano.obter()
     st.write("Gerenciar configurações, áreas e responsáveis.")
     with st.expander("Gerenciar Áreas e Responsáveis"):
+        # O mapeamento é usado nas outras abas: uma alteração reexecuta o app inteiro
         st.write("Mapeamento Atual:")
         df_mapeamento = pd.DataFrame(list(area_responsavel.items()), columns=['Área', 'Responsável'])
         st.table(df_mapeamento)
@@ -923,9 +1000,8 @@ with tab4:
         if st.button("Adicionar Mapeamento"):
             if nova_area and novo_responsavel:
                 if nova_area not in area_responsavel:
-                    area_responsavel[nova_area] = novo_responsavel
-                    salvar_mapeamento_area_responsavel(area_responsavel)
-                    st.success(f"Mapeamento '{nova_area}' -> '{novo_responsavel}' adicionado!")
+                    salvar_mapeamento_area_responsavel({**area_responsavel, nova_area: novo_responsavel})
+                    concluir_configuracao(f"Mapeamento '{nova_area}' -> '{novo_responsavel}' adicionado!", app_inteiro=True)
                 else:
                     st.error(f"A área '{nova_area}' já existe.")
             else:
@@ -948,28 +1024,121 @@ with tab4:
         )
 
         if st.button("Atualizar Mapeamento"):
-            area_responsavel[area_para_editar] = novo_responsavel_editar
-            salvar_mapeamento_area_responsavel(area_responsavel)
-            st.success(f"Mapeamento '{area_para_editar}' atualizado para Responsável '{novo_responsavel_editar}'.")
+            salvar_mapeamento_area_responsavel({**area_responsavel, area_para_editar: novo_responsavel_editar})
+            concluir_configuracao(f"Mapeamento '{area_para_editar}' atualizado para Responsável '{novo_responsavel_editar}'.", app_inteiro=True)
 
     st.write("**Excluir Mapeamento**")
     area_para_excluir = st.selectbox("Selecione a Área para excluir o mapeamento", options=list(area_responsavel.keys()), key='area_excluir_mapeamento')
     if st.button("Excluir Mapeamento"):
         if area_para_excluir:
-            del area_responsavel[area_para_excluir]
-            salvar_mapeamento_area_responsavel(area_responsavel)
-            st.success(f"Mapeamento da Área '{area_para_excluir}' excluído com sucesso!")
+            salvar_mapeamento_area_responsavel({area: responsavel for area, responsavel in area_responsavel.items() if area != area_para_excluir})
+            concluir_configuracao(f"Mapeamento da Área '{area_para_excluir}' excluído com sucesso!", app_inteiro=True)
         else:
             st.error("Selecione uma Área válida para excluir.")
 
+    with st.expander("Linhas de base"):
+        st.write(f"Fotografias das datas planejadas do site {site} para comparar com o plano atual na Curva S. Cada versão guarda só o que mudou desde a anterior.")
+        tabela_linhas_base = linhas_base.tabela()
+        if not tabela_linhas_base.empty:
+            st.dataframe(tabela_linhas_base, hide_index=True)
+        semana_atual = date.today().isocalendar()
+        nome_linha_base = st.text_input("Nome da nova linha de base", value=f"Semana {semana_atual[1]}/{semana_atual[0]}", key='nome_linha_base')
+        if st.button("Salvar linha de base"):
+            if nome_linha_base.strip():
+                # A linha de base é sempre do site inteiro, mesmo com só alguns Corpos carregados
+                df_site = df_plano if armazenamento.selecao is None else ArmazenamentoParticionado(site, tipo=armazenamento.tipo).carregar()
+                entrada = linhas_base.salvar(nome_linha_base.strip(), df_site)
+                concluir_configuracao(
+                    f"Linha de base {entrada['versao']} '{entrada['nome']}' salva: {entrada['acoes']} ações, "
+                    f"{entrada['alteradas']} novas ou alteradas e {entrada['removidas']} removidas desde a anterior.",
+                    app_inteiro=True
+                )
+            else:
+                st.error("Informe o nome da linha de base.")
+
+    with st.expander("Sites"):
+        st.write("Cada site tem o seu plano, dividido em uma partição por Corpo. Os Corpos novos do cadastro viram partições do site.")
+        novo_site = st.text_input("Nome do novo site", key='nome_novo_site')
+        if st.button("Adicionar site"):
+            if not novo_site.strip():
+                st.error("Informe o nome do site.")
+            elif novo_site.strip() in sites:
+                st.error(f"O site '{novo_site.strip()}' já existe.")
+            else:
+                CatalogoParticoes().criar_site(novo_site.strip())
+                concluir_configuracao(f"Site '{novo_site.strip()}' adicionado.", app_inteiro=True)
+
+    with st.expander("Armazenamento"):
+        st.write(f"Armazenamento em uso: {armazenamento.tipo}, site {site}, partições carregadas: {', '.join(armazenamento.corpos) or '(nenhuma)'}")
+        if armazenamento.tipo == 'excel':
+            particoes = [armazenamento.particao(corpo) for corpo in armazenamento.corpos if corpo in armazenamento.particoes_site()]
+            st.write(f"Diário de alterações: {sum(particao.diario.tamanho() for particao in particoes) / 1e3:.1f} KB ainda não incorporados às planilhas, {sum(particao.compactacoes for particao in particoes)} compactações neste processo")
+            for particao in particoes:
+                if particao.compactador.ultimo_erro is not None:
+                    st.warning(f"A última compactação do diário de {os.path.basename(particao.caminho)} falhou e será tentada de novo: {particao.compactador.ultimo_erro}")
+        st.write(f"Plano compartilhado: versão {versao_dados}, {df_plano.shape[0]} ações, {memoria_plano(df_plano) / 1e6:.1f} MB em memória, {plano.recargas} recargas completas neste processo")
+        st.write(f"Fila de gravação: {plano.fila.operacoes} operações gravadas em {plano.fila.lotes} lotes")
+        estatisticas_busca = plano.busca.estatisticas()
+        st.write(f"Índice de busca: {estatisticas_busca['termos']} termos em {estatisticas_busca['acoes']} ações, {plano.busca.reconstrucoes} reconstruções completas neste processo")
+        estatisticas_cache = cache_carga.estatisticas()
+        st.write(f"Cache de arquivos: {estatisticas_cache['acertos']} acertos, {estatisticas_cache['falhas']} leituras, {estatisticas_cache['entradas']} arquivos em cache")
+        estatisticas_calculos = cache_calculos.estatisticas()
+        st.write(f"Cache de cálculos: {estatisticas_calculos['acertos']} acertos, {estatisticas_calculos['falhas']} cálculos, {estatisticas_calculos['entradas']} resultados compartilhados entre as sessões")
+        if st.button("Verificar agregados do painel"):
+            divergencias = plano.agregados.verificar(armazenamento.carregar())
+            if divergencias:
+                st.error("Agregados divergentes do recálculo completo: " + "; ".join(divergencias))
+                plano.agregados.invalidar()
+            else:
+                st.success(f"Agregados consistentes ({plano.agregados.reconstrucoes} reconstruções completas neste processo).")
+        if st.button("Exportar para dados_projeto.xlsx"):
+            armazenamento.exportar_excel()
+            st.success("Plano exportado para dados_projeto.xlsx.")
+
+    # Diagnóstico de desempenho: tempo por seção do rerun, linhas processadas e bytes enviados
+    with st.expander("Diagnóstico"):
+        st.checkbox("Medir o tempo de cada seção (grava em diagnostico.jsonl)", key='diagnostico_ativo')
+        if DIAGNOSTICO_ATIVO:
+            st.caption("Medição ligada para todas as sessões pela variável PLANO_DIAGNOSTICO.")
+        ultima_execucao = st.session_state.get('diagnostico_ultima_execucao')
+        if ultima_execucao:
+            st.write(f"Última execução ({ultima_execucao['data']}): {ultima_execucao['total_s'] * 1000:.0f} ms no total")
+            st.dataframe(tabela_execucao(ultima_execucao), hide_index=True)
+            st.write("Histórico do log (últimas execuções):")
+            st.dataframe(resumir_log(ler_log(perfilador.caminho_log)), hide_index=True)
+        elif perfilador.ativo:
+            st.info("As medições aparecem a partir do próximo rerun.")
+
+
+
+with tab4:
+    aba_configuracoes()
+
+# Exportação gerada apenas quando o botão é clicado, a partir do conjunto de dados
+# canônico (sem filtros) e reaproveitada enquanto a versão dos dados não mudar.
+# O clique chega depois de o rerun ter terminado: a medição usa um perfilador próprio, com o
+# estado do diagnóstico capturado ao desenhar a página.
+def gerar_download(diagnostico_ativo=perfilador.ativo):
+    perfilador = Perfilador(ativo=diagnostico_ativo)
+    with perfilador.secao('exportacao') as secao_exportacao:
+        _, dados = plano.obter()
+        conteudo = obter_excel(dados)
+        secao_exportacao.linhas = dados.shape[0]
+        secao_exportacao.serializado(conteudo)
+    perfilador.concluir('exportacao')
+    return conteudo
 
-buffer = io.BytesIO()
-with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-    df.to_excel(writer, index=False)
 
 st.download_button(
     label="Baixar dados em Excel",
-    data=buffer.getvalue(),
+    data=gerar_download,
     file_name="dados_projeto.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
\ No newline at end of file
+    mime=MIME_EXCEL
+)
+
+# Registra as medições deste rerun no log e no painel Diagnóstico
+registro_diagnostico = perfilador.concluir()
+if registro_diagnostico is not None:
+    st.session_state['diagnostico_ultima_execucao'] = registro_diagnostico
+
+execucao_completa = False
@@ -0,0 +1,263 @@
+from datetime import datetime
+
+import pandas as pd
+import plotly.graph_objs as go
+
+from curva_s import calcular_curva_s, curva_linha_base, progresso_na_data, reduzir_serie
+
+
+# Cores de cada área no gráfico de status por área
+CORES_AREA = {
+    'Transporte': '#A4450C',
+    'Infraestrutura': '#F66A6B',
+    'Desenvolvimento': '#FF4F72',
+    'Ventilação': '#FBBC00',
+    'Backlog': '#FF6D01',
+    'Caldeiraria': '#ED6B3C',
+    'ObraCivil': '#FF00FF',
+    'Mec.Rochas': '#943134'
+}
+
+# Cores das séries da Curva S
+CORES_CURVA_S = {
+    'Planejado': 'black',
+    'Real': 'orange',
+    'Reprogramado': 'red'
+}
+
+# Linha de base sobreposta à Curva S (o planejado de uma versão anterior do plano)
+COR_LINHA_BASE = 'gray'
+
+# Acima deste número de datas a Curva S é desenhada em WebGL, com as séries reduzidas
+LIMITE_PONTOS_SVG = 1000
+
+# Máximo de pontos enviados ao navegador por série da Curva S em WebGL
+MAXIMO_PONTOS_SERIE = 2000
+
+# Máximo de ações (linhas) desenhadas no Gantt das ações ativas
+MAXIMO_ACOES_GANTT = 200
+
+# Dicionário de cores padrão para os status
+CORES_STATUS = {
+    'CONCLUÍDA': '#8E44AD',
+    'ATRASADA': '#E74C3C',
+    'EM ANDAMENTO': '#F39C12',
+    'PROGRAMADA': '#ED6B3C'
+}
+
+
+# Função para montar a Curva S cumulativa (Planejado vs Real vs Reprogramado, com a linha de hoje).
+# Com muitas datas (planos de vários anos em granularidade diária) as séries passam a ser desenhadas
+# em WebGL, só com os pontos em que mudam de valor, em degraus. Uma linha de base (ID, Inicio Plan,
+# Fim Plan de uma versão anterior do plano) pode ser sobreposta como uma série tracejada.
+def figura_curva_s(df, data_inicio, data_fim, granularidade='Diária', percentual=True, hoje=None,
+                   linha_base=None, nome_linha_base='Linha de base'):
+    # Curva S cumulativa: cada coluna de término é ordenada uma única vez
+    curva = calcular_curva_s(df, data_inicio, data_fim, granularidade=granularidade, percentual=percentual)
+    datas = curva.index
+    webgl = len(datas) > LIMITE_PONTOS_SVG
+
+    series = [(nome, curva[nome], dict(color=cor)) for nome, cor in CORES_CURVA_S.items()]
+    if linha_base is not None:
+        series.append((
+            nome_linha_base, curva_linha_base(linha_base, datas, percentual=percentual), dict(color=COR_LINHA_BASE, dash='dash')
+        ))
+
+    fig_s = go.Figure()
+
+    # Adicionando as linhas planejada, real e reprogramada (e a linha de base, se houver)
+    for nome, serie, linha in series:
+        if webgl:
+            serie = reduzir_serie(serie, MAXIMO_PONTOS_SERIE)
+            fig_s.add_trace(go.Scattergl(
+                x=serie.index,
+                y=serie.to_numpy(),
+                mode='lines',
+                name=nome,
+                line=dict(linha, shape='hv')
+            ))
+        else:
+            fig_s.add_trace(go.Scatter(
+                x=datas,
+                y=serie,
+                mode='lines+markers',
+                name=nome,
+                line=linha,
+                marker=dict(symbol='circle', size=6)
+            ))
+
+    hoje = pd.Timestamp(hoje if hoje is not None else datetime.now().date())
+
+    # Calcular o progresso até hoje
+    progresso_hoje = progresso_na_data(df, hoje, percentual=percentual)
+
+    # Linha "Hoje": o progresso planejado até hoje como uma forma horizontal tracejada (não uma série com
+    # um ponto por data), e uma marca vertical na data de hoje quando ela está no período do gráfico
+    fig_s.add_hline(
+        y=progresso_hoje['Planejado'],
+        line=dict(color='blue', dash='dash'),
+        name='Hoje',
+        showlegend=True
+    )
+    if len(datas) and datas[0] <= hoje <= datas[-1]:
+        fig_s.add_shape(
+            type='line', x0=hoje, x1=hoje, yref='paper', y0=0, y1=1,
+            line=dict(color='blue', dash='dot', width=1)
+        )
+
+    # Configurando o layout do gráfico de Curva S
+    fig_s.update_layout(
+        title="Curva S - Progresso Cumulativo (Planejado vs Real vs Reprogramado)",
+        xaxis_title="Data",
+        yaxis_title="Progresso (%)" if percentual else "Ações concluídas (acumulado)",
+        xaxis=dict(tickformat='%d/%m/%Y'),
+        legend=dict(x=0, y=1, bgcolor='rgba(0,0,0,0)'),
+        hovermode="x unified"
+    )
+
+    # Em percentual o eixo vai de 0 a 100; em contagem ele acompanha o maior valor acumulado
+    if percentual:
+        fig_s.update_yaxes(range=[0, 100])
+    else:
+        fig_s.update_yaxes(rangemode='tozero')
+    return fig_s
+
+
+# Função para montar o Gantt das ações ativas na janela: uma barra por intervalo, cortada nos limites
+# da janela (intervalos em aberto vão até o fim dela). `intervalos` traz ID, Tipo, Inicio, Fim e Rotulo.
+def figura_gantt(intervalos, inicio, fim):
+    inicio = pd.Timestamp(inicio)
+    fim = pd.Timestamp(fim)
+    fig_gantt = go.Figure()
+
+    for tipo, cor in CORES_CURVA_S.items():
+        do_tipo = intervalos[intervalos['Tipo'] == tipo]
+        if do_tipo.empty:
+            continue
+        inicios = do_tipo['Inicio'].clip(lower=inicio)
+        fins = do_tipo['Fim'].fillna(fim).clip(upper=fim)
+        # A barra cobre o dia final inteiro
+        duracoes_ms = (fins - inicios + pd.Timedelta(days=1)) / pd.Timedelta(milliseconds=1)
+        fig_gantt.add_trace(go.Bar(
+            x=duracoes_ms,
+            base=inicios,
+            y=do_tipo['Rotulo'],
+            orientation='h',
+            name=tipo,
+            marker_color=cor,
+            customdata=list(zip(do_tipo['Inicio'].dt.strftime('%d/%m/%Y'), do_tipo['Fim'].dt.strftime('%d/%m/%Y').fillna('em aberto'))),
+            hovertemplate="%{y}<br>" + tipo + ": %{customdata[0]} a %{customdata[1]}<extra></extra>"
+        ))
+
+    fig_gantt.update_layout(
+        title="Ações ativas na janela (Gantt)",
+        barmode='group',
+        height=max(300, 24 * intervalos['Rotulo'].nunique() + 150),
+        xaxis=dict(type='date', range=[inicio, fim + pd.Timedelta(days=1)], tickformat='%d/%m/%Y'),
+        yaxis=dict(autorange='reversed'),
+        legend_title="Intervalo"
+    )
+    return fig_gantt
+
+
+# Função para montar a ocupação diária (ações ativas por dia) de cada tipo de intervalo
+def figura_ocupacao(ocupacao):
+    fig_ocupacao = go.Figure()
+    for tipo, cor in CORES_CURVA_S.items():
+        if tipo in ocupacao.columns:
+            fig_ocupacao.add_trace(go.Scatter(
+                x=ocupacao.index,
+                y=ocupacao[tipo],
+                mode='lines',
+                name=tipo,
+                line=dict(color=cor, shape='hv')
+            ))
+    fig_ocupacao.update_layout(
+        title="Ocupação - ações ativas por dia",
+        xaxis_title="Data",
+        yaxis_title="Ações ativas",
+        xaxis=dict(tickformat='%d/%m/%Y'),
+        hovermode="x unified"
+    )
+    fig_ocupacao.update_yaxes(rangemode='tozero')
+    return fig_ocupacao
+
+
+# Função para montar o gráfico empilhado de status por área a partir da contagem Área x Status
+def figura_status_area(df_status_area):
+    df_status_area = df_status_area.copy()
+    df_status_area['Color'] = df_status_area['Area'].map(CORES_AREA)
+
+    fig_bar = go.Figure()
+
+    for area in df_status_area['Area'].unique():
+        # Filtra os dados para a área atual
+        filtered_df = df_status_area[df_status_area['Area'] == area]
+
+        # Cria uma string de hover para mostrar o total de cada status
+        hover_text = '<br>'.join([f"{status}: {count}" for status, count in zip(filtered_df['Status'], filtered_df['Count'])])
+
+        # Adiciona uma barra para a área com o texto de hover personalizado
+        fig_bar.add_trace(go.Bar(
+            x=[area],  # Nome da área no eixo X
+            y=[filtered_df['Count'].sum()],  # Soma total dos status para essa área
+            name=area,
+            marker_color=CORES_AREA.get(area, '#333333'),  # Obtém a cor da área ou usa uma cor padrão
+            width=0.4,
+            hovertemplate=f"Área: {area}<br>{hover_text}<extra></extra>"  # Texto de hover com a soma dos status
+        ))
+
+    fig_bar.update_layout(
+        title="Status das Ações (total) - Gráfico Empilhado",
+        xaxis_title="Status",
+        yaxis_title="Quantidade de Cadastros",
+        barmode='stack',
+        legend_title_text="Área",
+        height=600,
+        legend=dict(
+            x=1,  # Mover a legenda para fora do gráfico à direita
+            y=1,  # Posicionar no topo do gráfico
+            traceorder='normal',
+            orientation='v'  # Orientação vertical
+        )
+    )
+    return fig_bar
+
+
+# Função para montar o gráfico de pizza com a distribuição dos status (sem o status "_")
+def figura_pizza(status_counts):
+    status_counts = status_counts[status_counts.index != '_']
+
+    fig_pizza = go.Figure(data=[go.Pie(
+        labels=status_counts.index,
+        values=status_counts.values,
+        marker=dict(colors=[CORES_STATUS[status] for status in status_counts.index])
+    )])
+
+    fig_pizza.update_layout(
+        title="Distribuição Percentual dos Status das Ações",
+        legend_title="Status",
+        height=400,
+        showlegend=True
+    )
+    return fig_pizza
+
+
+# Função para selecionar os registros atrasados há mais tempo (pela data de fim planejada)
+def ultimos_atrasados(df, quantidade=5):
+    registros_atrasados = df[df['Status'] == 'ATRASADA']
+    return registros_atrasados.sort_values(by='Fim Plan', ascending=True).head(quantidade)
+
+
+# Função para calcular as porcentagens do resumo do painel (planejadas, concluídas, atrasadas e impacto)
+def porcentagens_resumo(resumo):
+    total = resumo['total']
+    if total == 0:
+        return {'planejadas': 0.0, 'concluidas': 0.0, 'atrasadas': 0.0, 'com_impacto': 0.0, 'sem_impacto': 0.0}
+    return {
+        'planejadas': 100.0,
+        'concluidas': resumo['concluidas'] / total * 100,
+        'atrasadas': resumo['atrasadas'] / total * 100,
+        'com_impacto': resumo['com_impacto'] / total * 100,
+        'sem_impacto': resumo['sem_impacto'] / total * 100,
+    }
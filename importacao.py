@@ -0,0 +1,157 @@
+import re
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from armazenamento import COLUNAS_DATA, COLUNAS_OBRIGATORIAS
+from calculo_status import calcular_status_vetorizado
+
+
+# Quantidade de linhas lidas, validadas e gravadas por vez
+TAMANHO_BLOCO = 1000
+
+# Pares de datas (início, fim) que precisam estar em ordem
+PARES_DATAS = [
+    ('Inicio Plan', 'Fim Plan'),
+    ('Inicio Real', 'Fim Real'),
+    ('Inicio(REPRO)', 'Fim(REPRO)'),
+]
+
+
+# Datas ISO (AAAA-MM-DD, com ou sem hora), o formato gravado pelo pandas e pelo próprio app
+_DATA_ISO = re.compile(r'^\d{4}-\d{1,2}-\d{1,2}([ T].*)?$')
+
+
+def _eh_excel(nome):
+    return nome.lower().endswith(('.xlsx', '.xlsm'))
+
+
+# Função para estimar o total de linhas do arquivo (usada apenas na barra de progresso)
+def contar_linhas(arquivo, nome):
+    if _eh_excel(nome):
+        workbook = load_workbook(arquivo, read_only=True)
+        total = (workbook.active.max_row or 1) - 1
+        workbook.close()
+    else:
+        total = max(sum(pedaco.count(b'\n') for pedaco in iter(lambda: arquivo.read(1 << 20), b'')) - 1, 0)
+    arquivo.seek(0)
+    return total
+
+
+# Função para ler o arquivo em blocos, sem carregar todas as linhas em memória:
+# planilhas são percorridas com o openpyxl em modo somente leitura e CSVs com chunksize.
+# O índice de cada bloco é o número da linha no arquivo (a linha 1 é o cabeçalho).
+def ler_blocos(arquivo, nome, tamanho_bloco=TAMANHO_BLOCO):
+    if not _eh_excel(nome):
+        for bloco in pd.read_csv(arquivo, chunksize=tamanho_bloco, sep=None, engine='python', encoding='utf-8-sig'):
+            bloco.index = bloco.index + 2
+            yield bloco
+        return
+
+    workbook = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = workbook.active.iter_rows(values_only=True)
+        cabecalho = [str(coluna).strip() if coluna is not None else '' for coluna in next(linhas, [])]
+        bloco, numeros = [], []
+        for numero, linha in enumerate(linhas, start=2):
+            if all(valor is None for valor in linha):
+                continue
+            bloco.append(linha)
+            numeros.append(numero)
+            if len(bloco) == tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho, index=numeros)
+                bloco, numeros = [], []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho, index=numeros)
+    finally:
+        workbook.close()
+
+
+# Função para converter uma coluna de datas do arquivo. Valores ISO são lidos como ISO; os demais
+# textos como dia/mês/ano (DD/MM/AAAA), o formato exibido e gravado pelo app. Retorna (datas, inválidas).
+def converter_datas(original):
+    preenchidas = original.notna() & (original.astype(str).str.strip() != '')
+    eh_texto = original.map(lambda valor: isinstance(valor, str))
+    texto = original.where(eh_texto, '').astype(str).str.strip()
+    iso = eh_texto & texto.str.match(_DATA_ISO)
+    outros_textos = eh_texto & ~iso
+
+    convertida = pd.Series(pd.NaT, index=original.index, dtype='datetime64[ns]')
+    if iso.any():
+        convertida[iso] = pd.to_datetime(texto[iso], errors='coerce', format='ISO8601')
+    if outros_textos.any():
+        convertida[outros_textos] = pd.to_datetime(texto[outros_textos], errors='coerce', dayfirst=True, format='mixed')
+    valores = preenchidas & ~eh_texto
+    if valores.any():
+        # Datas já tipadas (ex.: células de data da planilha) não passam por interpretação de texto
+        convertida[valores] = pd.to_datetime(original[valores], errors='coerce')
+    return convertida, preenchidas & convertida.isna()
+
+
+# Função para validar um bloco contra as colunas obrigatórias do plano.
+# Retorna o bloco normalizado (apenas as linhas válidas) e a lista de erros por linha.
+def validar_bloco(bloco, mapeamento):
+    bloco = bloco.rename(columns=lambda coluna: str(coluna).strip())
+    if 'Area' not in bloco.columns and 'Área' in bloco.columns:
+        bloco = bloco.rename(columns={'Área': 'Area'})
+    for coluna in COLUNAS_OBRIGATORIAS:
+        if coluna not in bloco.columns:
+            bloco[coluna] = None
+    bloco = bloco[COLUNAS_OBRIGATORIAS].copy()
+
+    erros = {linha: [] for linha in bloco.index}
+
+    # Área obrigatória e Responsável preenchido a partir do mapeamento Área-Responsável
+    area = bloco['Area'].astype(object).where(bloco['Area'].notna(), '').astype(str).str.strip()
+    bloco['Area'] = area
+    for linha in bloco.index[area == '']:
+        erros[linha].append("Área não informada")
+    responsavel_mapeado = area.map(mapeamento)
+    sem_responsavel = (area != '') & responsavel_mapeado.isna() & bloco['Responsavel'].isna()
+    for linha in bloco.index[sem_responsavel]:
+        erros[linha].append(f"Área '{area[linha]}' sem responsável no mapeamento")
+    bloco['Responsavel'] = responsavel_mapeado.where(responsavel_mapeado.notna(), bloco['Responsavel'])
+
+    # Datas: valores preenchidos que não puderem ser interpretados são rejeitados
+    for coluna in COLUNAS_DATA:
+        original = bloco[coluna]
+        convertida, invalidas = converter_datas(original)
+        for linha in bloco.index[invalidas]:
+            erros[linha].append(f"Data inválida em '{coluna}': {original[linha]}")
+        bloco[coluna] = convertida
+
+    # Mesma validação de ordem das datas usada na edição de registros
+    for inicio, fim in PARES_DATAS:
+        fora_de_ordem = bloco[inicio].notna() & bloco[fim].notna() & (bloco[inicio] > bloco[fim])
+        for linha in bloco.index[fora_de_ordem]:
+            erros[linha].append(f"'{inicio}' posterior a '{fim}'")
+
+    # Status informado é mantido; os vazios são calculados de uma vez para o bloco
+    status_vazio = bloco['Status'].isna() | (bloco['Status'].astype(str).str.strip() == '')
+    if status_vazio.any():
+        bloco['Status'] = bloco['Status'].astype(object)
+        bloco.loc[status_vazio, 'Status'] = calcular_status_vetorizado(bloco[status_vazio])
+
+    linhas_com_erro = [linha for linha, mensagens in erros.items() if mensagens]
+    lista_erros = [{'Linha': linha, 'Erro': '; '.join(erros[linha])} for linha in linhas_com_erro]
+    return bloco.drop(index=linhas_com_erro), lista_erros
+
+
+# Função para importar ações em lote: lê, valida e grava um bloco por vez.
+# Cada bloco é gravado com uma única chamada ao armazenamento (inserir_lote), em nome de `autor`.
+def importar_acoes(arquivo, nome, armazenamento, mapeamento, tamanho_bloco=TAMANHO_BLOCO, ao_progredir=None, autor=None):
+    importadas = 0
+    erros = []
+    lidas = 0
+
+    for bloco in ler_blocos(arquivo, nome, tamanho_bloco):
+        validas, erros_bloco = validar_bloco(bloco, mapeamento)
+        if not validas.empty:
+            armazenamento.inserir_lote(validas.to_dict(orient='records'), autor)
+        importadas += validas.shape[0]
+        erros.extend(erros_bloco)
+        lidas += bloco.shape[0]
+        if ao_progredir is not None:
+            ao_progredir(lidas, importadas, len(erros))
+
+    return importadas, pd.DataFrame(erros, columns=['Linha', 'Erro'])
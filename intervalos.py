@@ -0,0 +1,305 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNA_ID
+
+
+# Tipos de intervalo de uma ação e as colunas de início e fim de cada um
+TIPOS_INTERVALO = {
+    'Planejado': ('Inicio Plan', 'Fim Plan'),
+    'Real': ('Inicio Real', 'Fim Real'),
+    'Reprogramado': ('Inicio(REPRO)', 'Fim(REPRO)'),
+}
+
+# Fim dos intervalos em aberto (ação iniciada de fato e ainda sem fim real)
+FIM_ABERTO = np.iinfo(np.int64).max
+
+DIA_NS = 86400 * 10**9
+
+# Alterações acumuladas antes de reorganizar o índice (mínimo, ou esta fração do total de intervalos)
+LIMITE_PENDENTES = 1000
+FRACAO_PENDENTES = 0.01
+
+
+def _texto(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return str(valor)
+
+
+def _ns(valor):
+    data = pd.to_datetime(valor, errors='coerce')
+    return None if pd.isna(data) else pd.Timestamp(data).normalize().value
+
+
+# Função para normalizar o fim de um intervalo: sem fim, o intervalo Real fica em aberto e os
+# demais valem só para o dia de início; um fim anterior ao início também vale só para o início
+def _fim_intervalo(tipo, inicio, fim):
+    if fim is None:
+        return FIM_ABERTO if tipo == 'Real' else inicio
+    return max(fim, inicio)
+
+
+# Intervalos de um tipo ordenados pelo início: ids, inícios, fins (ns), Corpo e Nível
+class _Bloco:
+    def __init__(self, ids, inicios, fins, corpos, niveis):
+        ordem = np.argsort(inicios, kind='stable')
+        self.ids = ids[ordem]
+        self.inicios = inicios[ordem]
+        self.fins = fins[ordem]
+        self.corpos = corpos[ordem]
+        self.niveis = niveis[ordem]
+        # Maior duração do bloco: um intervalo que cruza a janela começou no máximo isso antes dela
+        fechados = self.fins != FIM_ABERTO
+        self.duracao_maxima = None if not fechados.all() else int((self.fins - self.inicios).max(initial=0))
+
+    # Posições dos intervalos que cruzam [inicio, fim]: busca binária pelo início e filtro pelo fim
+    def cruzando(self, inicio, fim):
+        if self.duracao_maxima is None:
+            esquerda = 0
+        else:
+            esquerda = np.searchsorted(self.inicios, inicio - self.duracao_maxima, side='left')
+        direita = np.searchsorted(self.inicios, fim, side='right')
+        return esquerda + np.flatnonzero(self.fins[esquerda:direita] >= inicio)
+
+
+# Função para separar os intervalos por classe de duração (potências de 2 em dias), de modo que a
+# busca em cada bloco só examine intervalos que começaram pouco antes da janela; os intervalos em
+# aberto ficam em um bloco próprio
+def _blocos(ids, inicios, fins, corpos, niveis):
+    abertos = fins == FIM_ABERTO
+    dias = (np.where(abertos, inicios, fins) - inicios) // DIA_NS
+    classes = np.where(abertos, -1, np.floor(np.log2(dias + 1)).astype(np.int64))
+    blocos = []
+    for classe in np.unique(classes):
+        selecao = classes == classe
+        blocos.append(_Bloco(ids[selecao], inicios[selecao], fins[selecao], corpos[selecao], niveis[selecao]))
+    return blocos
+
+
+def _colunas_vazias():
+    return (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.int64),
+            np.array([], dtype=object), np.array([], dtype=object))
+
+
+# Função para extrair os intervalos de um tipo a partir do plano
+def _intervalos_df(df, tipo):
+    coluna_inicio, coluna_fim = TIPOS_INTERVALO[tipo]
+    inicios = pd.to_datetime(df[coluna_inicio], errors='coerce').dt.normalize().to_numpy(dtype='datetime64[ns]')
+    fins = pd.to_datetime(df[coluna_fim], errors='coerce').dt.normalize().to_numpy(dtype='datetime64[ns]')
+    validos = ~np.isnat(inicios)
+    if not validos.any():
+        return _colunas_vazias()
+
+    inicios_ns = inicios[validos].astype(np.int64)
+    fins_validos = fins[validos]
+    sem_fim = np.isnat(fins_validos)
+    fins_ns = np.maximum(np.where(sem_fim, inicios_ns, fins_validos.astype(np.int64)), inicios_ns)
+    if tipo == 'Real':
+        fins_ns = np.where(sem_fim, FIM_ABERTO, fins_ns)
+
+    def texto(coluna):
+        if coluna not in df.columns:
+            return np.full(inicios_ns.size, '', dtype=object)
+        valores = df[coluna].astype(object).to_numpy()[validos]
+        return np.array([_texto(valor) for valor in valores], dtype=object)
+
+    ids = df[COLUNA_ID].to_numpy(dtype=np.int64)[validos]
+    return ids, inicios_ns, fins_ns, texto('Corpo'), texto('Nível')
+
+
+# Função para extrair os intervalos de um registro (dicionário de uma ação)
+def _intervalos_registro(registro):
+    intervalos = []
+    for tipo, (coluna_inicio, coluna_fim) in TIPOS_INTERVALO.items():
+        inicio = _ns(registro.get(coluna_inicio))
+        if inicio is None:
+            continue
+        fim = _fim_intervalo(tipo, inicio, _ns(registro.get(coluna_fim)))
+        intervalos.append((tipo, inicio, fim, _texto(registro.get('Corpo')), _texto(registro.get('Nível'))))
+    return intervalos
+
+
+# Índice de intervalos das ações (Planejado, Real e Reprogramado) para responder "quais ações estão
+# ativas nesta janela / neste dia", com filtro por Corpo e Nível, sem varrer o plano.
+# Como os agregados do painel, é mantido por deltas: gravar, editar e apagar só registram a ação
+# alterada (inclusões em uma lista de pendentes, exclusões como marcas), e o índice é reorganizado
+# quando as alterações acumuladas passam do limite. A reconstrução completa só acontece na carga ou
+# se a versão dos dados mudar por fora.
+class IndiceIntervalos:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.versao = None
+        self.reconstrucoes = 0
+        self._blocos = {tipo: [] for tipo in TIPOS_INTERVALO}
+        self._total = 0
+        self._pendentes = {}
+        self._removidos = set()
+
+    def reconstruir(self, df, versao):
+        blocos = {tipo: _blocos(*_intervalos_df(df, tipo)) for tipo in TIPOS_INTERVALO}
+        with self._trava:
+            self._blocos = blocos
+            self._total = sum(bloco.ids.size for lista in blocos.values() for bloco in lista)
+            self._pendentes = {}
+            self._removidos = set()
+            self.versao = versao
+            self.reconstrucoes += 1
+
+    # Garante que o índice corresponde à versão dos dados
+    def sincronizar(self, carregar_df, versao):
+        with self._trava:
+            atualizado = self.versao == versao
+        if not atualizado:
+            self.reconstruir(carregar_df(), versao)
+        return self
+
+    # Aplica a diferença de uma gravação: antigo=None para inclusão, novo=None para exclusão.
+    # Se o índice não estava na versão anterior à gravação, ele é marcado para reconstrução.
+    def aplicar(self, antigo, novo, versao_antes, versao_depois):
+        with self._trava:
+            if self.versao != versao_antes:
+                self.versao = None
+                return
+            id_acao = (novo or antigo)[COLUNA_ID]
+            self._removidos.add(id_acao)
+            self._pendentes.pop(id_acao, None)
+            if novo is not None:
+                self._pendentes[id_acao] = _intervalos_registro(novo)
+            self.versao = versao_depois
+            if len(self._pendentes) + len(self._removidos) > max(LIMITE_PENDENTES, FRACAO_PENDENTES * self._total):
+                self._compactar()
+
+    def invalidar(self):
+        with self._trava:
+            self.versao = None
+
+    # Reorganiza o índice com as alterações pendentes (chamada com a trava adquirida)
+    def _compactar(self):
+        removidos = np.fromiter(self._removidos, dtype=np.int64, count=len(self._removidos))
+        blocos = {}
+        for tipo, lista in self._blocos.items():
+            partes = [
+                [bloco.ids, bloco.inicios, bloco.fins, bloco.corpos, bloco.niveis] for bloco in lista
+            ]
+            pendentes = [
+                intervalo[1:] + (id_acao,)
+                for id_acao, intervalos in self._pendentes.items()
+                for intervalo in intervalos if intervalo[0] == tipo
+            ]
+            if pendentes:
+                inicios, fins, corpos, niveis, ids = zip(*pendentes)
+                partes.append([
+                    np.array(ids, dtype=np.int64), np.array(inicios, dtype=np.int64), np.array(fins, dtype=np.int64),
+                    np.array(corpos, dtype=object), np.array(niveis, dtype=object),
+                ])
+            if not partes:
+                blocos[tipo] = []
+                continue
+            ids, inicios, fins, corpos, niveis = (np.concatenate(coluna) for coluna in zip(*partes))
+            # Entradas antigas das ações alteradas saem; as pendentes (versão atual) entram
+            manter = ~np.isin(ids, removidos)
+            if pendentes:
+                manter[-len(pendentes):] = True
+            blocos[tipo] = _blocos(ids[manter], inicios[manter], fins[manter], corpos[manter], niveis[manter])
+        self._blocos = blocos
+        self._total = sum(bloco.ids.size for lista in blocos.values() for bloco in lista)
+        self._pendentes = {}
+        self._removidos = set()
+
+    # Função para listar os intervalos que cruzam a janela [inicio, fim] (datas inclusivas).
+    # Retorna um DataFrame com ID, Tipo, Inicio, Fim (vazio quando em aberto), Corpo e Nível.
+    def ativos(self, inicio, fim=None, tipos=None, corpos=None, niveis=None):
+        inicio = _ns(inicio)
+        fim = inicio if fim is None else _ns(fim)
+        tipos = tipos or list(TIPOS_INTERVALO)
+        corpos = np.array([str(corpo) for corpo in corpos], dtype=object) if corpos else None
+        niveis = np.array([str(nivel) for nivel in niveis], dtype=object) if niveis else None
+
+        def selecionar(corpos_linhas, niveis_linhas, manter):
+            if corpos is not None:
+                manter &= np.isin(corpos_linhas, corpos)
+            if niveis is not None:
+                manter &= np.isin(niveis_linhas, niveis)
+            return manter
+
+        colunas = []
+        with self._trava:
+            removidos = np.fromiter(self._removidos, dtype=np.int64, count=len(self._removidos))
+            for tipo in tipos:
+                for bloco in self._blocos.get(tipo, []):
+                    posicoes = bloco.cruzando(inicio, fim)
+                    if posicoes.size == 0:
+                        continue
+                    ids = bloco.ids[posicoes]
+                    manter = selecionar(bloco.corpos[posicoes], bloco.niveis[posicoes], ~np.isin(ids, removidos))
+                    posicoes = posicoes[manter]
+                    colunas.append((
+                        bloco.ids[posicoes], np.full(posicoes.size, tipo, dtype=object), bloco.inicios[posicoes],
+                        bloco.fins[posicoes], bloco.corpos[posicoes], bloco.niveis[posicoes],
+                    ))
+            pendentes = [
+                (id_acao, *intervalo)
+                for id_acao, intervalos in self._pendentes.items()
+                for intervalo in intervalos
+                if intervalo[0] in tipos and intervalo[1] <= fim and intervalo[2] >= inicio
+            ]
+        if pendentes:
+            ids, tipos_pendentes, inicios, fins, corpos_pendentes, niveis_pendentes = (
+                np.array(coluna, dtype=object) for coluna in zip(*pendentes)
+            )
+            manter = selecionar(corpos_pendentes, niveis_pendentes, np.ones(ids.size, dtype=bool))
+            colunas.append((
+                ids[manter].astype(np.int64), tipos_pendentes[manter], inicios[manter].astype(np.int64),
+                fins[manter].astype(np.int64), corpos_pendentes[manter], niveis_pendentes[manter],
+            ))
+
+        if colunas:
+            ids, tipos_linhas, inicios, fins, corpos_linhas, niveis_linhas = (np.concatenate(coluna) for coluna in zip(*colunas))
+        else:
+            ids, inicios, fins = (np.array([], dtype=np.int64) for _ in range(3))
+            tipos_linhas, corpos_linhas, niveis_linhas = (np.array([], dtype=object) for _ in range(3))
+
+        abertos = fins == FIM_ABERTO
+        resultado = pd.DataFrame({
+            COLUNA_ID: ids,
+            'Tipo': tipos_linhas,
+            'Inicio': inicios.astype('datetime64[ns]'),
+            'Fim': np.where(abertos, np.datetime64('NaT', 'ns'), np.where(abertos, 0, fins).astype('datetime64[ns]')),
+            'Corpo': corpos_linhas,
+            'Nível': niveis_linhas,
+        })
+        return resultado.sort_values(['Inicio', COLUNA_ID], ignore_index=True)
+
+    # Função para listar os intervalos ativos em um dia
+    def no_dia(self, data, tipos=None, corpos=None, niveis=None):
+        return self.ativos(data, data, tipos=tipos, corpos=corpos, niveis=niveis)
+
+    # Verificação de consistência: compara o índice com uma varredura completa do plano
+    def verificar(self, df, inicio, fim):
+        esperado = []
+        for tipo in TIPOS_INTERVALO:
+            ids, inicios, fins, _, _ = _intervalos_df(df, tipo)
+            cruzando = (inicios <= _ns(fim)) & (fins >= _ns(inicio))
+            esperado.extend((tipo, int(id_acao)) for id_acao in ids[cruzando])
+        obtido = self.ativos(inicio, fim)
+        return sorted(esperado) == sorted(zip(obtido['Tipo'], obtido[COLUNA_ID].astype(int)))
+
+
+# Função para contar, dia a dia, os intervalos ativos de cada tipo dentro da janela (ocupação)
+def ocupacao_diaria(intervalos, inicio, fim):
+    dias = pd.date_range(pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize())
+    ocupacao = pd.DataFrame(index=dias)
+    ocupacao.index.name = 'Data'
+    alvo = dias.to_numpy(dtype='datetime64[ns]')
+    for tipo in TIPOS_INTERVALO:
+        do_tipo = intervalos[intervalos['Tipo'] == tipo]
+        inicios = np.sort(do_tipo['Inicio'].to_numpy(dtype='datetime64[ns]'))
+        # Intervalos em aberto nunca terminam dentro da janela
+        fins = np.sort(do_tipo['Fim'].dropna().to_numpy(dtype='datetime64[ns]'))
+        # Ativos no dia: os que começaram até o dia menos os que terminaram antes dele
+        ocupacao[tipo] = np.searchsorted(inicios, alvo, side='right') - np.searchsorted(fins, alvo, side='left')
+    return ocupacao
+
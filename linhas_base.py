@@ -0,0 +1,244 @@
+# Linhas de base do plano: fotografias nomeadas das datas planejadas, para comparar o plano atual
+# com o plano de uma data passada (ex.: a Curva S de hoje contra a linha de base do mês passado).
+# Uso pela linha de comando, a partir da raiz do projeto (ex.: agendado toda segunda-feira):
+#   python linhas_base.py --nome "Semana 42" --site Principal
+#   python linhas_base.py --listar
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNA_ID
+from fila_gravacao import TravaArquivo, caminho_trava
+from particoes import PASTA_SITES, SITE_PADRAO, ArmazenamentoParticionado, corpos_da_coluna
+
+# Pasta das linhas de base dentro da pasta de cada site
+PASTA_LINHAS_BASE = 'linhas_base'
+
+# Colunas guardadas em cada linha de base e a chave de cada uma no arquivo da versão
+# (o Corpo permite comparar só as partições selecionadas)
+COLUNAS_LINHA_BASE = {
+    'Inicio Plan': 'inicio_plan',
+    'Fim Plan': 'fim_plan',
+    'Corpo': 'corpo',
+}
+
+_VAZIOS = {
+    'Inicio Plan': np.array([], dtype='datetime64[ns]'),
+    'Fim Plan': np.array([], dtype='datetime64[ns]'),
+    'Corpo': np.array([], dtype=str),
+}
+_IDS_VAZIOS = np.array([], dtype=np.int64)
+
+
+# Função para extrair do plano o estado de uma linha de base: IDs ordenados, as datas planejadas e o Corpo
+def _estado_plano(df):
+    ids = df[COLUNA_ID].to_numpy(dtype=np.int64)
+    ordem = np.argsort(ids, kind='stable')
+    colunas = {
+        coluna: pd.to_datetime(df[coluna], errors='coerce').to_numpy(dtype='datetime64[ns]')[ordem]
+        for coluna in ('Inicio Plan', 'Fim Plan')
+    }
+    colunas['Corpo'] = corpos_da_coluna(df['Corpo']).to_numpy(dtype=str)[ordem]
+    return ids[ordem], colunas
+
+
+# Datas comparadas como inteiros, para que NaT seja igual a NaT
+def _diferentes(antes, depois):
+    if antes.dtype.kind == 'M':
+        return antes.view(np.int64) != depois.view(np.int64)
+    return antes != depois
+
+
+# Função para calcular a diferença entre duas linhas de base: IDs removidos e as linhas novas ou
+# com alguma coluna diferente
+def _diferenca(anterior, atual):
+    ids_antes, datas_antes = anterior
+    ids, datas = atual
+    removidos = np.setdiff1d(ids_antes, ids, assume_unique=True)
+    posicoes = np.minimum(np.searchsorted(ids_antes, ids), max(ids_antes.size - 1, 0))
+    existentes = (ids_antes[posicoes] == ids) if ids_antes.size else np.zeros(ids.size, dtype=bool)
+    alteradas = ~existentes
+    for coluna in COLUNAS_LINHA_BASE:
+        if ids_antes.size:
+            alteradas |= existentes & _diferentes(datas_antes[coluna][posicoes], datas[coluna])
+    return removidos, ids[alteradas], {coluna: datas[coluna][alteradas] for coluna in COLUNAS_LINHA_BASE}
+
+
+# Função para aplicar a diferença de uma versão sobre a linha de base anterior. Os IDs continuam
+# ordenados: as linhas alteradas são retiradas e reinseridas na posição certa (searchsorted),
+# sem reordenar o plano inteiro a cada versão. Colunas de texto são alargadas antes da inserção
+# (np.insert cortaria um Corpo maior que os já guardados).
+def _aplicar(estado, removidos, ids_alterados, datas_alteradas):
+    ids, datas = estado
+    retirar = np.union1d(removidos, ids_alterados)
+    posicoes = np.searchsorted(ids, retirar)
+    validas = posicoes < ids.size
+    posicoes = posicoes[validas][ids[posicoes[validas]] == retirar[validas]]
+    manter = np.ones(ids.size, dtype=bool)
+    manter[posicoes] = False
+    ids = ids[manter]
+    insercao = np.searchsorted(ids, ids_alterados)
+    colunas = {}
+    for coluna in COLUNAS_LINHA_BASE:
+        valores = datas[coluna][manter]
+        valores = valores.astype(np.result_type(valores, datas_alteradas[coluna]))
+        colunas[coluna] = np.insert(valores, insercao, datas_alteradas[coluna])
+    return np.insert(ids, insercao, ids_alterados), colunas
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        escrever(arquivo)
+    os.replace(temporario, caminho)
+
+
+# Linhas de base versionadas. Cada versão guarda só a diferença para a versão anterior
+# (IDs removidos e linhas novas ou com datas alteradas) em um .npz compactado; a primeira guarda
+# o plano inteiro. O índice (indice.json) lista as versões com nome, data e tamanho da diferença.
+# Uma versão é reconstruída aplicando as diferenças em sequência, a partir da última versão
+# reconstruída neste processo quando possível (as versões nunca mudam depois de gravadas).
+# Cada site tem as suas linhas de base, sempre do site inteiro (todas as partições).
+class LinhasBase:
+    def __init__(self, pasta=PASTA_LINHAS_BASE):
+        self.pasta = pasta
+        self.caminho_indice = os.path.join(pasta, 'indice.json')
+        self._trava = threading.Lock()
+        self._ultima = None
+
+    # Lista das versões gravadas, da mais antiga para a mais recente
+    def versoes(self):
+        try:
+            with open(self.caminho_indice, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return []
+
+    # Versões gravadas antes de o Corpo ser guardado trazem o Corpo vazio
+    def _ler_diferenca(self, versao):
+        with np.load(os.path.join(self.pasta, versao['arquivo'])) as arquivo:
+            ids = arquivo['ids']
+            return (
+                arquivo['removidos'],
+                ids,
+                {
+                    coluna: arquivo[chave] if chave in arquivo.files else np.full(ids.size, '')
+                    for coluna, chave in COLUNAS_LINHA_BASE.items()
+                },
+            )
+
+    def _estado(self, numero, versoes):
+        with self._trava:
+            ultima = self._ultima
+        if ultima is not None and ultima[0] <= numero:
+            inicio, estado = ultima
+        else:
+            inicio, estado = 0, (_IDS_VAZIOS, dict(_VAZIOS))
+        for versao in versoes:
+            if inicio < versao['versao'] <= numero:
+                estado = _aplicar(estado, *self._ler_diferenca(versao))
+        with self._trava:
+            self._ultima = (numero, estado)
+        return estado
+
+    # Reconstrói uma versão como DataFrame (ID, Inicio Plan, Fim Plan, Corpo), ordenado por ID
+    def reconstruir(self, numero):
+        versoes = self.versoes()
+        if not any(versao['versao'] == numero for versao in versoes):
+            raise ValueError(f"Linha de base {numero} não encontrada")
+        ids, datas = self._estado(numero, versoes)
+        return pd.DataFrame({COLUNA_ID: ids, **datas})
+
+    # Grava o plano atual como uma nova versão e retorna a entrada criada no índice
+    def salvar(self, nome, df):
+        os.makedirs(self.pasta, exist_ok=True)
+        with TravaArquivo(caminho_trava(self.caminho_indice)):
+            versoes = self.versoes()
+            numero = versoes[-1]['versao'] + 1 if versoes else 1
+            atual = _estado_plano(df)
+            anterior = self._estado(versoes[-1]['versao'], versoes) if versoes else (_IDS_VAZIOS, dict(_VAZIOS))
+            removidos, ids_alterados, datas_alteradas = _diferenca(anterior, atual)
+
+            arquivo = f'{numero:04d}.npz'
+            _gravar_atomico(os.path.join(self.pasta, arquivo), lambda destino: np.savez_compressed(
+                destino, removidos=removidos, ids=ids_alterados,
+                **{chave: datas_alteradas[coluna] for coluna, chave in COLUNAS_LINHA_BASE.items()}
+            ))
+            entrada = {
+                'versao': numero,
+                'nome': nome,
+                'criada_em': datetime.now().isoformat(timespec='seconds'),
+                'acoes': int(atual[0].size),
+                'alteradas': int(ids_alterados.size),
+                'removidas': int(removidos.size),
+                'arquivo': arquivo,
+            }
+            versoes.append(entrada)
+            _gravar_atomico(self.caminho_indice, lambda destino: destino.write(
+                json.dumps(versoes, ensure_ascii=False, indent=1).encode('utf-8')
+            ))
+            with self._trava:
+                self._ultima = (numero, atual)
+        return entrada
+
+    # Tabela das versões para exibição
+    def tabela(self):
+        versoes = self.versoes()
+        return pd.DataFrame([
+            {
+                'Versão': versao['versao'],
+                'Nome': versao['nome'],
+                'Criada em': datetime.fromisoformat(versao['criada_em']).strftime('%d/%m/%Y %H:%M'),
+                'Ações': versao['acoes'],
+                'Alteradas': versao['alteradas'],
+                'Removidas': versao['removidas'],
+                'Tamanho (KB)': round(os.path.getsize(os.path.join(self.pasta, versao['arquivo'])) / 1e3, 1),
+            }
+            for versao in versoes
+        ], columns=['Versão', 'Nome', 'Criada em', 'Ações', 'Alteradas', 'Removidas', 'Tamanho (KB)'])
+
+
+_historicos = {}
+_trava_historicos = threading.Lock()
+
+
+# Função para obter as linhas de base de um site (uma instância por pasta, compartilhada no processo)
+def obter_linhas_base(pasta_site):
+    pasta = os.path.join(pasta_site, PASTA_LINHAS_BASE)
+    with _trava_historicos:
+        if pasta not in _historicos:
+            _historicos[pasta] = LinhasBase(pasta)
+        return _historicos[pasta]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Linhas de base do plano (datas planejadas versionadas)")
+    parser.add_argument('--nome', help="Grava o plano atual como uma nova linha de base com este nome")
+    parser.add_argument('--listar', action='store_true', help="Lista as linhas de base gravadas")
+    parser.add_argument('--site', default=SITE_PADRAO)
+    parser.add_argument('--pasta', default=PASTA_SITES, help="Pasta dos sites")
+    parser.add_argument('--armazenamento', choices=['sqlite', 'excel'],
+                        help="Armazenamento do plano (padrão: variável PLANO_ARMAZENAMENTO ou sqlite)")
+    args = parser.parse_args(argumentos)
+    if not args.nome and not args.listar:
+        parser.error("Informe --nome ou --listar")
+
+    armazenamento = ArmazenamentoParticionado(args.site, tipo=args.armazenamento, pasta=args.pasta)
+    historico = obter_linhas_base(armazenamento.caminho)
+    if args.nome:
+        entrada = historico.salvar(args.nome, armazenamento.carregar())
+        print(f"Linha de base {entrada['versao']} '{entrada['nome']}' gravada: {entrada['acoes']} ações, "
+              f"{entrada['alteradas']} novas ou alteradas e {entrada['removidas']} removidas desde a anterior")
+    if args.listar:
+        print(historico.tabela().to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
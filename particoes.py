@@ -0,0 +1,646 @@
+# Armazenamento particionado por site (mina) e por Corpo. Cada site tem uma pasta em sites/ com um
+# arquivo de dados por Corpo (SQLite ou planilha, conforme PLANO_ARMAZENAMENTO); só as partições
+# selecionadas são carregadas. Os totais entre partições vêm de um resumo por partição (resumo.json),
+# sem carregar as outras. Uso pela linha de comando, a partir da raiz do projeto:
+#   python particoes.py --listar
+#   python particoes.py --recalcular --site Principal
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import ExitStack
+from datetime import date, datetime
+
+import pandas as pd
+
+from armazenamento import (
+    COLUNA_ID, COLUNAS_OBRIGATORIAS, Armazenamento, ArmazenamentoExcel, ArmazenamentoSQLite, criar_armazenamento
+)
+from cache_arquivos import cache_carga
+from diario import OPERACOES
+from esquema import registro_como_dict
+from fila_gravacao import GravacaoParcial, TravaArquivo, caminho_trava
+
+PASTA_SITES = 'sites'
+SITE_PADRAO = 'Principal'
+
+# Partição das ações sem Corpo preenchido
+CORPO_VAZIO = '(sem Corpo)'
+
+COLUNAS_TOTAIS = ['Corpo', 'Ações', 'Concluídas', 'Atrasadas', 'Em andamento', 'Programadas', 'Com impacto', 'Atualizado']
+
+
+def _tipo_armazenamento(tipo=None):
+    tipo = (tipo or os.environ.get('PLANO_ARMAZENAMENTO', 'sqlite')).lower()
+    if tipo not in ('sqlite', 'excel'):
+        raise ValueError(f"Tipo de armazenamento desconhecido: '{tipo}'")
+    return tipo
+
+
+# Função para obter o nome da partição de um valor de Corpo (vazio -> CORPO_VAZIO)
+def corpo_da_acao(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return CORPO_VAZIO
+    valor = str(valor).strip()
+    return valor or CORPO_VAZIO
+
+
+# Mesma conversão de corpo_da_acao, aplicada à coluna inteira de uma vez
+def corpos_da_coluna(coluna):
+    texto = coluna.astype(object).where(coluna.notna(), '').astype(str).str.strip()
+    return texto.where(texto != '', CORPO_VAZIO)
+
+
+# Função para gerar um nome de arquivo seguro a partir de um nome livre (sem acentos nem separadores)
+def _nome_arquivo(nome, existentes):
+    base = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    base = re.sub(r'[^A-Za-z0-9_-]+', '_', base).strip('_') or 'particao'
+    nome_final, sufixo = base, 2
+    while nome_final.lower() in {existente.lower() for existente in existentes}:
+        nome_final, sufixo = f'{base}_{sufixo}', sufixo + 1
+    return nome_final
+
+
+def _gravar_json(caminho, dados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+    cache_carga.invalidar(caminho)
+
+
+def _ler_json(caminho, padrao):
+    def ler():
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return padrao
+    return cache_carga.obter(caminho, ler)
+
+
+# Versão de uma partição no formato guardado no JSON (tuplas viram listas)
+def _versao_json(versao):
+    return json.loads(json.dumps(versao))
+
+
+# Catálogo dos sites (sites/particoes.json): pasta de cada site, próximo ID da sequência do site
+# (os IDs continuam únicos no site quando uma ação muda de Corpo) e o arquivo de cada partição.
+class CatalogoParticoes:
+    def __init__(self, pasta=PASTA_SITES):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, 'particoes.json')
+
+    def ler(self):
+        return _ler_json(self.caminho, {'sites': {}})
+
+    # Altera o catálogo sob a trava do arquivo e retorna o resultado da alteração
+    def alterar(self, alteracao):
+        os.makedirs(self.pasta, exist_ok=True)
+        with TravaArquivo(caminho_trava(self.caminho)):
+            # O catálogo lido é o do cache, compartilhado: a alteração é feita em uma cópia
+            dados = copy.deepcopy(self.ler())
+            resultado = alteracao(dados['sites'])
+            _gravar_json(self.caminho, dados)
+        return resultado
+
+    def sites(self):
+        return list(self.ler()['sites'])
+
+    def site(self, nome):
+        return self.ler()['sites'].get(nome)
+
+    def criar_site(self, nome, proximo_id=1):
+        def criar(sites):
+            if nome not in sites:
+                pastas = [site['pasta'] for site in sites.values()]
+                sites[nome] = {'pasta': _nome_arquivo(nome, pastas), 'proximo_id': proximo_id, 'particoes': {}}
+            return sites[nome]
+        return self.alterar(criar)
+
+    # Registra a partição de um Corpo (se ainda não existir) e retorna o nome do arquivo dela
+    def criar_particao(self, site, corpo):
+        def criar(sites):
+            particoes = sites[site]['particoes']
+            if corpo not in particoes:
+                particoes[corpo] = _nome_arquivo(corpo, particoes.values())
+            return particoes[corpo]
+        return self.alterar(criar)
+
+    # Reserva `quantidade` IDs seguidos na sequência do site e retorna o primeiro
+    def reservar_ids(self, site, quantidade):
+        def reservar(sites):
+            primeiro = sites[site]['proximo_id']
+            sites[site]['proximo_id'] = primeiro + quantidade
+            return primeiro
+        return self.alterar(reservar)
+
+
+_abertas = {}
+_trava_abertas = threading.Lock()
+
+
+# Função para abrir o armazenamento de uma partição. As instâncias são compartilhadas no processo:
+# seleções diferentes que incluem a mesma partição usam o mesmo compactador do diário.
+def abrir_particao(tipo, base):
+    caminho = os.path.abspath(base + ('.xlsx' if tipo == 'excel' else '.db'))
+    with _trava_abertas:
+        if caminho not in _abertas:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            if tipo == 'excel':
+                _abertas[caminho] = ArmazenamentoExcel(caminho)
+            else:
+                _abertas[caminho] = ArmazenamentoSQLite(caminho, caminho_excel=os.path.abspath(base + '.xlsx'))
+        return _abertas[caminho]
+
+
+# Armazenamento do plano de um site, particionado por Corpo. Carrega só as partições selecionadas
+# (corpos=None: todas as do site, inclusive as criadas depois) e encaminha cada gravação para a
+# partição do Corpo da ação; uma ação que muda de Corpo é movida de partição com o mesmo ID.
+# Quem grava deve ter a trava do site (caminho_trava(caminho)); cada partição é gravada também
+# sob a sua própria trava, a mesma usada pelo compactador do diário das planilhas.
+class ArmazenamentoParticionado(Armazenamento):
+    lote_atomico = True
+
+    def __init__(self, site=SITE_PADRAO, corpos=None, tipo=None, pasta=PASTA_SITES):
+        self.tipo = _tipo_armazenamento(tipo)
+        self.site = site
+        self.catalogo = CatalogoParticoes(pasta)
+        if not self.catalogo.sites():
+            self._migrar_monolitico()
+        dados_site = self.catalogo.site(site) or self.catalogo.criar_site(site)
+        self.caminho = os.path.join(pasta, dados_site['pasta'])
+        self.caminho_resumo = os.path.join(self.caminho, 'resumo.json')
+        self.selecao = None if corpos is None else sorted(set(corpos))
+        self._corpo_por_id = {}
+
+    # Migração única: divide o plano monolítico (dados_projeto.db ou .xlsx) por Corpo no site padrão,
+    # mantendo os IDs. As linhas de base existentes passam a ser as do site padrão.
+    def _migrar_monolitico(self):
+        os.makedirs(self.catalogo.pasta, exist_ok=True)
+        with TravaArquivo(caminho_trava(self.catalogo.caminho)):
+            if self.catalogo.sites():
+                return
+            df = criar_armazenamento(self.tipo).carregar()
+            pasta_site = os.path.join(self.catalogo.pasta, _nome_arquivo(SITE_PADRAO, []))
+            particoes = {}
+            for corpo, parte in df.groupby(corpos_da_coluna(df['Corpo']).to_numpy(), sort=True):
+                particoes[corpo] = _nome_arquivo(corpo, particoes.values())
+                particao = abrir_particao(self.tipo, os.path.join(pasta_site, particoes[corpo]))
+                with TravaArquivo(caminho_trava(particao.caminho)):
+                    particao.gravar_lote([('inserir', None, registro) for registro in parte.to_dict(orient='records')])
+                if isinstance(particao, ArmazenamentoExcel):
+                    particao.exportar_excel(particao.caminho)
+            if os.path.isdir('linhas_base') and not os.path.exists(os.path.join(pasta_site, 'linhas_base')):
+                os.makedirs(pasta_site, exist_ok=True)
+                os.replace('linhas_base', os.path.join(pasta_site, 'linhas_base'))
+            proximo_id = int(df[COLUNA_ID].max()) + 1 if df.shape[0] > 0 else 1
+            _gravar_json(self.catalogo.caminho, {'sites': {
+                SITE_PADRAO: {'pasta': os.path.basename(pasta_site), 'proximo_id': proximo_id, 'particoes': particoes}
+            }})
+
+    # Partições do site (Corpo -> arquivo), inclusive as não selecionadas
+    def particoes_site(self):
+        return self.catalogo.site(self.site)['particoes']
+
+    # Corpos carregados: os selecionados ou, sem seleção, todos os do site
+    @property
+    def corpos(self):
+        return sorted(self.particoes_site()) if self.selecao is None else self.selecao
+
+    def particao(self, corpo):
+        arquivo = self.particoes_site().get(corpo)
+        if arquivo is None:
+            arquivo = self.catalogo.criar_particao(self.site, corpo)
+        return abrir_particao(self.tipo, os.path.join(self.caminho, arquivo))
+
+    # Versão dos dados: a versão de cada partição carregada
+    def versao(self):
+        particoes = self.particoes_site()
+        return tuple(
+            (corpo, self.particao(corpo).versao() if corpo in particoes else None) for corpo in self.corpos
+        )
+
+    def pertence(self, registro):
+        return corpo_da_acao(registro.get('Corpo')) in self.corpos
+
+    def carregar(self):
+        particoes = self.particoes_site()
+        partes = [
+            (corpo, self.particao(corpo).carregar()) for corpo in self.corpos if corpo in particoes
+        ]
+        self._corpo_por_id = {id_acao: corpo for corpo, parte in partes for id_acao in parte[COLUNA_ID].tolist()}
+        partes = [parte for _, parte in partes if parte.shape[0] > 0]
+        if not partes:
+            return pd.DataFrame(columns=[COLUNA_ID] + COLUNAS_OBRIGATORIAS)
+        return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+    # Partição em que está uma ação (procura nas partições carregadas se o ID for desconhecido)
+    def _localizar(self, id_acao):
+        corpo = self._corpo_por_id.get(id_acao)
+        if corpo is None:
+            for candidato in self.corpos:
+                if candidato in self.particoes_site() and (self.particao(candidato).carregar()[COLUNA_ID] == id_acao).any():
+                    corpo = self._corpo_por_id[id_acao] = candidato
+                    break
+        return corpo
+
+    def _registro(self, corpo, id_acao):
+        df = self.particao(corpo).carregar()
+        linhas = df.index[df[COLUNA_ID] == id_acao]
+        return registro_como_dict(df.loc[linhas[0]])
+
+    # Distribui as operações pelas partições: {Corpo: [(posição da operação original, operação)]}.
+    # Os IDs novos são reservados de uma vez na sequência do site. Uma atualização que troca o Corpo
+    # vira uma inserção com o mesmo ID na partição nova e uma exclusão na antiga; o registro completo
+    # é o gravado com as alterações anteriores do mesmo lote. Retorna também o Corpo de cada ID tocado.
+    def _distribuir(self, operacoes):
+        for tipo, _, _ in operacoes:
+            if tipo not in OPERACOES:
+                raise ValueError(f"Operação desconhecida: '{tipo}'")
+        inseridos = sum(1 for tipo, _, _ in operacoes if tipo == 'inserir')
+        proximo_id = self.catalogo.reservar_ids(self.site, inseridos) if inseridos else None
+        por_particao = {}
+        locais = {}  # ID -> Corpo no fim do lote (None: apagada no lote)
+        registros = {}  # ID -> registro completo, para as ações inseridas ou movidas no lote
+        campos = {}  # ID -> campos atualizados no lote, para as demais
+
+        for posicao, (tipo, id_acao, dados) in enumerate(operacoes):
+            if tipo == 'inserir':
+                corpo = corpo_da_acao(dados.get('Corpo'))
+                registro = {**dados, COLUNA_ID: proximo_id}
+                por_particao.setdefault(corpo, []).append((posicao, ('inserir', None, registro)))
+                locais[proximo_id], registros[proximo_id] = corpo, registro
+                proximo_id += 1
+                continue
+            corpo = locais[id_acao] if id_acao in locais else self._localizar(id_acao)
+            if corpo is None:
+                raise LookupError(f"Ação {id_acao} não encontrada nas partições carregadas")
+            destino = corpo_da_acao(dados['Corpo']) if tipo == 'atualizar' and 'Corpo' in dados else corpo
+            if tipo == 'apagar':
+                por_particao.setdefault(corpo, []).append((posicao, (tipo, id_acao, None)))
+                locais[id_acao] = None
+                registros.pop(id_acao, None)
+                campos.pop(id_acao, None)
+            elif destino == corpo:
+                por_particao.setdefault(corpo, []).append((posicao, (tipo, id_acao, dados)))
+                if id_acao in registros:
+                    registros[id_acao].update(dados)
+                else:
+                    campos[id_acao] = {**campos.get(id_acao, {}), **dados}
+            else:
+                anterior = registros.get(id_acao) or {**self._registro(corpo, id_acao), **campos.pop(id_acao, {})}
+                registro = {**anterior, **dados, COLUNA_ID: id_acao}
+                por_particao.setdefault(destino, []).append((posicao, ('inserir', None, registro)))
+                por_particao.setdefault(corpo, []).append((posicao, ('apagar', id_acao, None)))
+                locais[id_acao], registros[id_acao] = destino, registro
+        return por_particao, locais
+
+    # Grava o lote em duas fases: todas as partições envolvidas são travadas e preparadas (cada uma
+    # em uma transação aberta, ou com as linhas do diário prontas) e só então confirmadas. Uma falha
+    # na preparação desfaz todas: nada fica gravado. Se a própria confirmação falhar depois de alguma
+    # partição confirmada (ex.: disco cheio), o erro é GravacaoParcial com as operações já gravadas.
+    # As operações derivadas de uma mudança de Corpo ficam com o autor da atualização original.
+    def gravar_lote(self, operacoes, autores=None):
+        autores = autores or [None] * len(operacoes)
+        por_particao, locais = self._distribuir(operacoes)
+        preparados = []
+        with ExitStack() as travas:
+            try:
+                for corpo in sorted(por_particao):
+                    particao = self.particao(corpo)
+                    travas.enter_context(TravaArquivo(caminho_trava(particao.caminho)))
+                    lote = particao.preparar_lote(
+                        [operacao for _, operacao in por_particao[corpo]],
+                        [autores[posicao] for posicao, _ in por_particao[corpo]]
+                    )
+                    preparados.append((corpo, lote))
+            except Exception:
+                for _, lote in preparados:
+                    lote.desfazer()
+                raise
+
+            confirmados = set()
+            for indice, (corpo, lote) in enumerate(preparados):
+                try:
+                    lote.confirmar()
+                except Exception as erro:
+                    for _, restante in preparados[indice + 1:]:
+                        restante.desfazer()
+                    pendentes = {posicao for outro, lista in por_particao.items() if outro not in confirmados for posicao, _ in lista}
+                    raise GravacaoParcial(
+                        f"Lote gravado só em parte: falha ao confirmar a partição '{corpo}' ({erro})",
+                        [posicao for posicao in range(len(operacoes)) if posicao not in pendentes]
+                    ) from erro
+                confirmados.add(corpo)
+
+        for id_acao, corpo in locais.items():
+            if corpo is None:
+                self._corpo_por_id.pop(id_acao, None)
+            else:
+                self._corpo_por_id[id_acao] = corpo
+        resultados = [None] * len(operacoes)
+        for lista in por_particao.values():
+            for posicao, (tipo, _, dados) in lista:
+                if operacoes[posicao][0] == 'inserir':
+                    resultados[posicao] = dados[COLUNA_ID]
+        return resultados
+
+    def inserir(self, registro):
+        return self.gravar_lote([('inserir', None, registro)])[0]
+
+    # Importação em lote: as chaves vêm sempre da sequência do site
+    def inserir_lote(self, registros, autor=None):
+        return self.gravar_lote([
+            ('inserir', None, {coluna: valor for coluna, valor in registro.items() if coluna != COLUNA_ID})
+            for registro in registros
+        ], [autor] * len(registros))
+
+    def atualizar(self, id_acao, campos):
+        self.gravar_lote([('atualizar', id_acao, campos)])
+
+    def apagar(self, id_acao):
+        self.gravar_lote([('apagar', id_acao, None)])
+
+    # Resumos gravados das partições do site (Corpo -> resumo)
+    def resumos(self):
+        return _ler_json(self.caminho_resumo, {})
+
+    # Grava os resumos informados, exceto os que descrevem uma versão que não é mais a da partição
+    # (outro processo gravou nela depois): o resumo gravado continua marcado como desatualizado
+    def gravar_resumos(self, resumos):
+        os.makedirs(self.caminho, exist_ok=True)
+        with TravaArquivo(caminho_trava(self.caminho_resumo)):
+            gravados = dict(self.resumos())
+            alterados = False
+            for corpo, resumo in resumos.items():
+                versao = _versao_json(self.particao(corpo).versao())
+                if _versao_json(resumo['versao']) == versao:
+                    gravados[corpo] = {
+                        'versao': versao,
+                        'acoes': resumo['acoes'],
+                        'com_impacto': resumo['com_impacto'],
+                        'por_chave': dict(resumo['por_chave']),
+                        'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+                    }
+                    alterados = True
+            if alterados:
+                _gravar_json(self.caminho_resumo, gravados)
+
+    # Partições do site cujo resumo gravado não corresponde à versão atual dos dados
+    def resumos_desatualizados(self):
+        resumos = self.resumos()
+        return [
+            corpo for corpo in sorted(self.particoes_site())
+            if corpo not in resumos or resumos[corpo]['versao'] != _versao_json(self.particao(corpo).versao())
+        ]
+
+    # Recalcula os resumos desatualizados carregando uma partição de cada vez
+    def recalcular_resumos(self):
+        corpos = self.resumos_desatualizados()
+        for corpo in corpos:
+            particao = self.particao(corpo)
+            while True:
+                versao = particao.versao()
+                df = particao.carregar()
+                if particao.versao() == versao:
+                    break
+            self.gravar_resumos({corpo: {**resumir(df), 'versao': versao}})
+        return corpos
+
+    # Totais de cada partição do site a partir dos resumos gravados, sem carregar as partições
+    def totais(self, hoje=None):
+        hoje = pd.Timestamp(hoje if hoje is not None else date.today())
+        resumos = self.resumos()
+        desatualizados = set(self.resumos_desatualizados())
+        linhas = []
+        for corpo in sorted(self.particoes_site()):
+            resumo = resumos.get(corpo)
+            if resumo is None:
+                linhas.append({'Corpo': corpo, 'Atualizado': False})
+                continue
+            status = contar_status(resumo['por_chave'], hoje)
+            linhas.append({
+                'Corpo': corpo,
+                'Ações': resumo['acoes'],
+                'Concluídas': status['CONCLUÍDA'],
+                'Atrasadas': status['ATRASADA'],
+                'Em andamento': status['EM ANDAMENTO'],
+                'Programadas': status['PROGRAMADA'],
+                'Com impacto': resumo['com_impacto'],
+                'Atualizado': corpo not in desatualizados,
+            })
+        totais = pd.DataFrame(linhas, columns=COLUNAS_TOTAIS)
+        for coluna in COLUNAS_TOTAIS[1:-1]:
+            totais[coluna] = totais[coluna].astype('Int64')
+        return totais
+
+
+# Função para listar os sites cadastrados (na primeira vez, migra o plano monolítico para o site padrão)
+def sites_disponiveis(tipo=None, pasta=PASTA_SITES):
+    catalogo = CatalogoParticoes(pasta)
+    if not catalogo.sites():
+        ArmazenamentoParticionado(SITE_PADRAO, tipo=tipo, pasta=pasta)
+    return catalogo.sites()
+
+
+# Função para listar os Corpos (partições) de um site
+def corpos_do_site(site, pasta=PASTA_SITES):
+    dados = CatalogoParticoes(pasta).site(site)
+    return sorted(dados['particoes']) if dados else []
+
+
+# Chave do histograma do resumo. O Status de uma ação depende só de uma data (Fim Plan ou, sem ele,
+# Inicio Plan), de haver Fim Real e de hoje; ações sem Inicio Plan têm sempre o status '_'.
+# Com o histograma o resumo dá a contagem exata por status em qualquer dia.
+def _chave(grupo, data, fim_real):
+    if grupo == '_':
+        return '_'
+    return f'{grupo}|{pd.Timestamp(data).isoformat()}|{int(bool(fim_real))}'
+
+
+def _data(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return pd.NaT
+    return pd.to_datetime(valor, errors='coerce')
+
+
+def _tem_impacto(valor):
+    return pd.notna(valor) and valor != ''
+
+
+# Função para calcular a chave do histograma de um registro
+def chave_status(registro):
+    inicio, fim = _data(registro.get('Inicio Plan')), _data(registro.get('Fim Plan'))
+    if pd.isna(inicio):
+        return '_'
+    if pd.isna(fim):
+        return _chave('I', inicio, pd.notna(_data(registro.get('Fim Real'))))
+    return _chave('F', fim, pd.notna(_data(registro.get('Fim Real'))))
+
+
+# Função para calcular o status a partir da chave do histograma (mesma cadeia de calcular_status).
+# As datas ficam em ISO 8601 e são comparadas como texto.
+def status_da_chave(chave, hoje_iso):
+    if chave == '_':
+        return '_'
+    grupo, data, fim_real = chave.split('|')
+    if grupo == 'I':
+        if data < hoje_iso:
+            return 'ATRASADA'
+        if data > hoje_iso:
+            return 'PROGRAMADA'
+        return 'CONCLUÍDA' if fim_real == '1' else 'EM ANDAMENTO'
+    if data > hoje_iso:
+        return 'PROGRAMADA'
+    if fim_real == '1':
+        return 'CONCLUÍDA'
+    return 'ATRASADA' if data < hoje_iso else 'EM ANDAMENTO'
+
+
+# Função para contar as ações por status em uma data a partir do histograma de um resumo
+def contar_status(por_chave, hoje):
+    hoje_iso = pd.Timestamp(hoje).isoformat()
+    contagem = Counter()
+    for chave, quantidade in por_chave.items():
+        contagem[status_da_chave(chave, hoje_iso)] += quantidade
+    return contagem
+
+
+def _resumo_vazio():
+    return {'acoes': 0, 'com_impacto': 0, 'por_chave': Counter()}
+
+
+# Função para resumir as ações de uma partição: total, com impacto e o histograma das chaves de status.
+# As linhas são agrupadas antes de formatar as chaves (poucas datas distintas para muitas ações).
+def resumir(df):
+    inicio = pd.to_datetime(df['Inicio Plan'], errors='coerce')
+    fim = pd.to_datetime(df['Fim Plan'], errors='coerce')
+    grupos = pd.DataFrame({
+        'grupo': pd.Series('F', index=df.index).where(fim.notna(), 'I').where(inicio.notna(), '_'),
+        'data': fim.where(fim.notna(), inicio),
+        'fim_real': pd.to_datetime(df['Fim Real'], errors='coerce').notna(),
+    })
+    por_chave = Counter()
+    for (grupo, data, fim_real), quantidade in grupos.groupby(['grupo', 'data', 'fim_real'], dropna=False).size().items():
+        por_chave[_chave(grupo, data, fim_real)] += int(quantidade)
+    impacto = df['Impacto']
+    return {
+        'acoes': int(df.shape[0]),
+        'com_impacto': int((impacto.notna() & (impacto.astype(object) != '')).sum()),
+        'por_chave': por_chave,
+    }
+
+
+# Resumo das partições carregadas, mantido por deltas como os agregados do painel e gravado em
+# resumo.json com a versão de cada partição que ele descreve. Um resumo cuja versão não é mais a da
+# partição (gravação de outro processo, ou ação movida para uma partição não carregada) aparece
+# como desatualizado até ser recalculado.
+class ResumoParticoes:
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self._trava = threading.Lock()
+        self.versao = None
+        self.reconstrucoes = 0
+        self._resumos = {}
+        self._pendentes = set()
+
+    def reconstruir(self, df, versao):
+        versoes = dict(versao)
+        resumos = {corpo: {**_resumo_vazio(), 'versao': versoes[corpo]} for corpo in versoes}
+        for corpo, parte in df.groupby(corpos_da_coluna(df['Corpo']).to_numpy(), sort=False):
+            resumos[corpo] = {**resumir(parte), 'versao': versoes.get(corpo)}
+        with self._trava:
+            self._resumos = resumos
+            self._pendentes = set(resumos)
+            self.versao = versao
+            self.reconstrucoes += 1
+
+    # Garante que o resumo corresponde à versão dos dados e grava as partições alteradas
+    def sincronizar(self, carregar_df, versao):
+        with self._trava:
+            atualizado = self.versao == versao
+        if not atualizado:
+            self.reconstruir(carregar_df(), versao)
+        self.gravar()
+        return self
+
+    def _aplicar(self, registro, sinal):
+        corpo = corpo_da_acao(registro.get('Corpo'))
+        resumo = self._resumos.setdefault(corpo, _resumo_vazio())
+        resumo['acoes'] += sinal
+        if _tem_impacto(registro.get('Impacto')):
+            resumo['com_impacto'] += sinal
+        chave = chave_status(registro)
+        resumo['por_chave'][chave] += sinal
+        if resumo['por_chave'][chave] <= 0:
+            del resumo['por_chave'][chave]
+
+    # Aplica a diferença de uma gravação: antigo=None para inclusão, novo=None para exclusão
+    def aplicar(self, antigo, novo, versao_antes, versao_depois):
+        with self._trava:
+            if self.versao != versao_antes:
+                self.versao = None
+                return
+            if antigo is not None:
+                self._aplicar(antigo, -1)
+            if novo is not None:
+                self._aplicar(novo, 1)
+            for corpo, versao in versao_depois:
+                resumo = self._resumos.setdefault(corpo, {**_resumo_vazio(), 'versao': None})
+                if resumo.get('versao') != versao:
+                    resumo['versao'] = versao
+                    self._pendentes.add(corpo)
+            self.versao = versao_depois
+
+    def invalidar(self):
+        with self._trava:
+            self.versao = None
+
+    # Grava em resumo.json os resumos das partições alteradas desde a última gravação
+    def gravar(self):
+        with self._trava:
+            pendentes = {
+                corpo: {**self._resumos[corpo], 'por_chave': Counter(self._resumos[corpo]['por_chave'])}
+                for corpo in self._pendentes if self._resumos[corpo].get('versao') is not None
+            }
+            self._pendentes = set()
+        if pendentes:
+            self.armazenamento.gravar_resumos(pendentes)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Sites e partições (por Corpo) do plano de ação")
+    parser.add_argument('--listar', action='store_true', help="Lista os sites e os totais de cada partição")
+    parser.add_argument('--recalcular', action='store_true', help="Recalcula os resumos desatualizados")
+    parser.add_argument('--site', help="Site a listar ou recalcular (padrão: todos)")
+    parser.add_argument('--pasta', default=PASTA_SITES)
+    parser.add_argument('--armazenamento', choices=['sqlite', 'excel'],
+                        help="Armazenamento das partições (padrão: variável PLANO_ARMAZENAMENTO ou sqlite)")
+    args = parser.parse_args(argumentos)
+    if not args.listar and not args.recalcular:
+        parser.error("Informe --listar ou --recalcular")
+
+    sites = sites_disponiveis(args.armazenamento, args.pasta)
+    if args.site:
+        if args.site not in sites:
+            parser.error(f"Site '{args.site}' não encontrado (sites: {', '.join(sites)})")
+        sites = [args.site]
+    for site in sites:
+        armazenamento = ArmazenamentoParticionado(site, tipo=args.armazenamento, pasta=args.pasta)
+        if args.recalcular:
+            recalculados = armazenamento.recalcular_resumos()
+            print(f"{site}: {len(recalculados)} resumos recalculados" + (f" ({', '.join(recalculados)})" if recalculados else ""))
+        if args.listar:
+            print(f"{site}:")
+            print(armazenamento.totais().to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from cache_arquivos import cache_carga
+
+
+CAMINHO_MAPEAMENTO = 'area_responsavel.csv'
+CAMINHO_RESPONSAVEIS = 'responsaveis.txt'
+
+# Corpos disponíveis no cadastro antes de o usuário adicionar novos
+CORPOS_PADRAO = ['BAL', 'CGA', 'FGS', 'GAL', 'SER']
+
+# Níveis disponíveis no cadastro
+NIVEIS = [f'N{n}' for n in range(1, 51)]
+
+
+# Função para carregar e salvar o mapeamento Área-Responsável
+def _ler_mapeamento_area_responsavel():
+    try:
+        df_map = pd.read_csv(CAMINHO_MAPEAMENTO)
+        mapeamento = dict(zip(df_map['Área'], df_map['Responsável']))
+    except FileNotFoundError:
+        mapeamento = {
+            'Transporte': 'Renan Tales',
+            'Infraestrutura': 'Jayr Rodrigues',
+            'Desenvolvimento': 'Felipe Zanela',
+            'Ventilação': 'Geraldo Duarte',
+            'Backlog': 'Osman Pereira',
+            'Caldeiraria': 'Darley',
+            'ObraCivil': 'Darley',
+            'Mec.Rochas': 'Jeferson Lage'
+        }
+        salvar_mapeamento_area_responsavel(mapeamento)
+    return mapeamento
+
+
+def carregar_mapeamento_area_responsavel():
+    return cache_carga.obter(CAMINHO_MAPEAMENTO, _ler_mapeamento_area_responsavel)
+
+
+def salvar_mapeamento_area_responsavel(mapeamento):
+    df_map = pd.DataFrame(list(mapeamento.items()), columns=['Área', 'Responsável'])
+    df_map.to_csv(CAMINHO_MAPEAMENTO, index=False)
+    cache_carga.invalidar(CAMINHO_MAPEAMENTO)
+
+
+# Função para carregar os responsáveis de um arquivo ou criar lista padrão
+def _ler_responsaveis():
+    try:
+        with open(CAMINHO_RESPONSAVEIS, 'r') as file:
+            responsaveis = file.read().splitlines()
+    except FileNotFoundError:
+        # Caso o arquivo não exista, cria uma lista padrão de responsáveis
+        responsaveis = ['Renan Tales', 'Felipe Zanela', 'Jayr Rodrigues', 'Geraldo Duarte', 'Osman Pereira', 'Darley', 'Jeferson Lage']
+    return responsaveis
+
+
+def carregar_responsaveis():
+    return cache_carga.obter(CAMINHO_RESPONSAVEIS, _ler_responsaveis)
+
+
+def salvar_responsaveis(responsaveis):
+    with open(CAMINHO_RESPONSAVEIS, 'w') as file:
+        for responsavel in responsaveis:
+            file.write(f"{responsavel}\n")
+    cache_carga.invalidar(CAMINHO_RESPONSAVEIS)
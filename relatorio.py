@@ -0,0 +1,220 @@
+# Relatórios do painel GRÁFICOS (Curva S, status por área, pizza, atrasados e tabelas semanais)
+# gerados sem o Streamlit: um por área e um geral, em HTML, PNG e/ou XLSX. Uso, a partir da raiz do projeto:
+#   python relatorio.py --saida relatorios --formatos html xlsx --processos 4 --tempo-limite 600 --site Principal
+# As áreas são distribuídas entre processos; o que não terminar dentro do tempo limite é interrompido.
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+import unicodedata
+from datetime import date
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from agregados import AgregadosPlano
+from calculo_status import calcular_status_vetorizado
+from esquema import para_exibicao, tipar_plano
+from exportacao import gerar_excel_planilhas
+from graficos import figura_curva_s, figura_pizza, figura_status_area, porcentagens_resumo, ultimos_atrasados
+from particoes import SITE_PADRAO, ArmazenamentoParticionado
+from semanas import IndiceSemanas, semana_relativa
+
+# A exportação das figuras em PNG depende do kaleido; sem ele só HTML e XLSX estão disponíveis
+try:
+    import kaleido  # noqa: F401
+    PNG_DISPONIVEL = True
+except ImportError:
+    PNG_DISPONIVEL = False
+
+
+FORMATOS = ['html', 'png', 'xlsx']
+FORMATOS_PADRAO = ['html', 'xlsx']
+
+# Tempo máximo para gerar o conjunto completo de relatórios
+TEMPO_LIMITE_PADRAO_S = 600
+
+NOME_GERAL = 'Geral'
+
+MODELO_HTML = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 24px; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; }}
+th {{ color: red; }}
+</style>
+</head>
+<body>
+{corpo}
+</body>
+</html>
+"""
+
+
+# Função para gerar um nome de arquivo a partir do nome da área (sem acentos, espaços ou pontuação)
+def nome_arquivo(nome):
+    texto = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9A-Za-z]+', '_', texto).strip('_').lower() or 'sem_nome'
+
+
+# Função para montar o conteúdo do relatório de um conjunto de ações: resumo, figuras e tabelas
+def montar_relatorio(df, hoje):
+    df = df.copy(deep=False)
+    df['Status'] = calcular_status_vetorizado(df, hoje).astype('category')
+    indice_semanas = IndiceSemanas(df)
+    df['Semana do Ano'] = indice_semanas.semana_do_ano
+
+    agregados = AgregadosPlano()
+    agregados.reconstruir(df, None, hoje)
+
+    figuras = {}
+    data_inicio = df['Inicio Plan'].min()
+    data_fim = df['Fim Plan'].max()
+    if not (pd.isna(data_inicio) or pd.isna(data_fim)):
+        figuras['curva_s'] = figura_curva_s(df, data_inicio, data_fim, hoje=hoje)
+    figuras['status_area'] = figura_status_area(agregados.tabela_area_status())
+    figuras['status'] = figura_pizza(agregados.contagem_status())
+
+    df = para_exibicao(df)
+    tabelas = {
+        'Resumo': tabela_resumo(agregados.resumo()),
+        'Status por Área': agregados.tabela_area_status().rename(columns={'Count': 'Quantidade'}),
+        'Atrasados': ultimos_atrasados(df),
+    }
+    for titulo, deslocamento in (('Semana passada', -1), ('Semana atual', 0), ('Semana seguinte', 1)):
+        tabelas[titulo] = df.iloc[indice_semanas.linhas(*semana_relativa(hoje, deslocamento))]
+    return figuras, tabelas
+
+
+# Função para montar a tabela do resumo (quantidade e porcentagem de cada indicador)
+def tabela_resumo(resumo):
+    porcentagens = porcentagens_resumo(resumo)
+    return pd.DataFrame([
+        ('Planejadas', resumo['total'], porcentagens['planejadas']),
+        ('Concluídas', resumo['concluidas'], porcentagens['concluidas']),
+        ('Atrasadas', resumo['atrasadas'], porcentagens['atrasadas']),
+        ('Com Impacto', resumo['com_impacto'], porcentagens['com_impacto']),
+        ('Sem Impacto', resumo['sem_impacto'], porcentagens['sem_impacto']),
+    ], columns=['Indicador', 'Ações', '%']).round(1)
+
+
+def _html(nome, figuras, tabelas, hoje):
+    titulo = f"Plano de Ação - {nome}"
+    partes = [f"<h1>{html.escape(titulo)}</h1>", f"<p>Gerado em {hoje:%d/%m/%Y}</p>"]
+    partes.append(tabelas['Resumo'].to_html(index=False))
+    for figura in figuras.values():
+        partes.append(figura.to_html(full_html=False, include_plotlyjs=False))
+    for titulo_tabela, tabela in tabelas.items():
+        if titulo_tabela == 'Resumo':
+            continue
+        partes.append(f"<h2>{html.escape(titulo_tabela)}</h2>")
+        partes.append(tabela.to_html(index=False, na_rep='') if not tabela.empty else "<p>Nenhuma ação.</p>")
+    return MODELO_HTML.format(titulo=html.escape(titulo), corpo='\n'.join(partes))
+
+
+# Função executada em cada processo: gera os arquivos do relatório de uma área (ou o geral).
+# Retorna os caminhos gravados e a duração em segundos.
+def gerar_relatorio(nome, df, pasta, formatos, hoje):
+    inicio = time.perf_counter()
+    figuras, tabelas = montar_relatorio(df, hoje)
+    base = os.path.join(pasta, f'relatorio_{nome_arquivo(nome)}')
+    arquivos = []
+
+    if 'html' in formatos:
+        with open(base + '.html', 'w', encoding='utf-8') as arquivo:
+            arquivo.write(_html(nome, figuras, tabelas, hoje))
+        arquivos.append(base + '.html')
+
+    if 'png' in formatos:
+        for chave, figura in figuras.items():
+            caminho = f'{base}_{chave}.png'
+            figura.write_image(caminho, width=1200, height=figura.layout.height or 600)
+            arquivos.append(caminho)
+
+    if 'xlsx' in formatos:
+        with open(base + '.xlsx', 'wb') as arquivo:
+            arquivo.write(gerar_excel_planilhas(tabelas))
+        arquivos.append(base + '.xlsx')
+
+    return arquivos, time.perf_counter() - inicio
+
+
+# Função para separar o plano nas partes de cada relatório, da maior para a menor
+# (as maiores começam primeiro e não ficam sozinhas no fim do tempo limite)
+def separar_partes(df, areas=None, geral=True):
+    partes = [(str(area), df_area) for area, df_area in df.groupby('Area', observed=True, sort=True)]
+    if areas:
+        partes = [(nome, df_area) for nome, df_area in partes if nome in areas]
+    if geral:
+        partes.append((NOME_GERAL, df))
+    return sorted(partes, key=lambda parte: parte[1].shape[0], reverse=True)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Relatórios do painel GRÁFICOS por área, sem o Streamlit")
+    parser.add_argument('--saida', default='relatorios', help="Pasta dos arquivos gerados")
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=FORMATOS_PADRAO,
+                        help="Formatos dos relatórios (png precisa do pacote kaleido)")
+    parser.add_argument('--areas', nargs='+', help="Áreas a gerar (padrão: todas)")
+    parser.add_argument('--sem-geral', action='store_true', help="Não gera o relatório geral")
+    parser.add_argument('--site', default=SITE_PADRAO, help="Site do plano")
+    parser.add_argument('--corpos', nargs='+', help="Corpos (partições) a carregar (padrão: todos do site)")
+    parser.add_argument('--armazenamento', choices=['sqlite', 'excel'],
+                        help="Armazenamento do plano (padrão: variável PLANO_ARMAZENAMENTO ou sqlite)")
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--tempo-limite', type=float, default=TEMPO_LIMITE_PADRAO_S,
+                        help="Segundos para gerar todos os relatórios; os não concluídos são interrompidos")
+    args = parser.parse_args(argumentos)
+    if 'png' in args.formatos and not PNG_DISPONIVEL:
+        parser.error("A exportação em PNG precisa do pacote kaleido (pip install kaleido)")
+
+    inicio = time.monotonic()
+    hoje = date.today()
+    df = tipar_plano(ArmazenamentoParticionado(args.site, args.corpos, tipo=args.armazenamento).carregar())
+    partes = separar_partes(df, args.areas, geral=not args.sem_geral)
+    if not partes:
+        print("Nenhuma área encontrada para gerar relatórios.")
+        return 1
+
+    os.makedirs(args.saida, exist_ok=True)
+    if 'html' in args.formatos:
+        # Uma única cópia do plotly.js, usada por todos os relatórios HTML da pasta (funciona sem internet)
+        with open(os.path.join(args.saida, 'plotly.min.js'), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(get_plotlyjs())
+
+    limite = inicio + args.tempo_limite
+    falhas = 0
+    # Ao sair do bloco o pool é encerrado, interrompendo os relatórios que estouraram o tempo limite
+    with multiprocessing.Pool(max(1, min(args.processos, len(partes)))) as pool:
+        pendentes = [
+            (nome, pool.apply_async(gerar_relatorio, (nome, df_parte, args.saida, args.formatos, hoje)))
+            for nome, df_parte in partes
+        ]
+        for nome, resultado in pendentes:
+            resultado.wait(max(0.0, limite - time.monotonic()))
+            if not resultado.ready():
+                print(f"{nome:<20} não concluído no tempo limite de {args.tempo_limite:.0f} s")
+                falhas += 1
+                continue
+            try:
+                arquivos, duracao = resultado.get()
+            except Exception as erro:
+                print(f"{nome:<20} erro: {erro}")
+                falhas += 1
+                continue
+            print(f"{nome:<20} {duracao:7.1f} s  {', '.join(os.path.basename(caminho) for caminho in arquivos)}")
+
+    print(f"{len(partes) - falhas} de {len(partes)} relatórios gerados em {time.monotonic() - inicio:.1f} s na pasta {args.saida}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
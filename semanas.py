@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from cache_arquivos import cache_calculos
+
+
+# Índice (ano ISO, semana ISO) -> posições das linhas, calculado uma vez a partir de uma coluna de data.
+# O ano faz parte da chave, então a semana 1 de um ano não se mistura com a semana 1 de outro.
+class IndiceSemanas:
+    def __init__(self, df, coluna='Inicio Plan'):
+        datas = pd.to_datetime(df[coluna], errors='coerce')
+        calendario = datas.dt.isocalendar()
+
+        # Semana ISO de cada linha (nula quando a data está vazia), usada na coluna 'Semana do Ano'
+        self.semana_do_ano = calendario['week'].array
+
+        validas = datas.notna().to_numpy()
+        posicoes = np.flatnonzero(validas)
+        anos = calendario['year'].to_numpy()[validas].astype('int64')
+        semanas = calendario['week'].to_numpy()[validas].astype('int64')
+
+        self._linhas = {}
+        if posicoes.size:
+            chaves = anos * 100 + semanas
+            ordem = np.argsort(chaves, kind='stable')
+            chaves_ordenadas = chaves[ordem]
+            inicios = np.flatnonzero(np.r_[True, chaves_ordenadas[1:] != chaves_ordenadas[:-1]])
+            fins = np.r_[inicios[1:], chaves_ordenadas.size]
+            for inicio, fim in zip(inicios, fins):
+                chave = int(chaves_ordenadas[inicio])
+                self._linhas[(chave // 100, chave % 100)] = posicoes[ordem[inicio:fim]]
+
+    # Posições das linhas de uma semana (consulta em tempo constante)
+    def linhas(self, ano, semana):
+        return self._linhas.get((int(ano), int(semana)), np.array([], dtype='int64'))
+
+    # Semanas (ano, semana) presentes no índice, em ordem cronológica
+    def semanas(self):
+        return sorted(self._linhas)
+
+
+# Função para obter a semana ISO (ano, semana) deslocada em semanas a partir de uma data
+def semana_relativa(data, deslocamento=0):
+    ano, semana, _ = (data + timedelta(weeks=deslocamento)).isocalendar()
+    return ano, semana
+
+
+# Função para obter o índice de semanas de uma versão dos dados, construindo-o uma vez por versão.
+# Como em consulta.obter_indice, os índices das versões usadas mais recentemente ficam no cache
+# compartilhado, sem uma seleção de partições descartar o índice de outra.
+def obter_indice_semanas(df, versao, coluna='Inicio Plan'):
+    return cache_calculos.obter('indice_semanas', (versao, coluna), lambda: IndiceSemanas(df, coluna))
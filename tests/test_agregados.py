@@ -0,0 +1,74 @@
+# Equivalência entre os agregados do painel mantidos por deltas e um recálculo completo
+import random
+
+import pandas as pd
+
+from agregados import AgregadosPlano
+from armazenamento import COLUNA_ID
+from benchmarks.gerador import gerar_plano
+
+HOJE = pd.Timestamp('2025-06-15').date()
+
+COLUNAS = ['Area', 'Impacto', 'Inicio Plan', 'Fim Plan', 'Inicio Real', 'Fim Real']
+
+
+def _plano(n=300):
+    df = gerar_plano(n, 9, hoje=HOJE)
+    df.insert(0, COLUNA_ID, range(1, n + 1))
+    return df
+
+
+# Sorteia uma alteração (inclusão, edição ou exclusão) e aplica ao plano.
+# Retorna o plano alterado e os registros antigo e novo, como os recebem os agregados.
+def _alterar(df, rng, proximo_id):
+    sorteio = rng.random()
+    if sorteio < 0.2:
+        novo = df.sample(1, random_state=rng.randrange(10**6)).iloc[0].to_dict()
+        novo[COLUNA_ID] = proximo_id
+        return pd.concat([df, pd.DataFrame([novo])], ignore_index=True), None, novo
+    posicao = rng.randrange(len(df))
+    antigo = df.iloc[posicao].to_dict()
+    if sorteio < 0.35:
+        return df.drop(index=df.index[posicao]).reset_index(drop=True), antigo, None
+    novo = dict(antigo)
+    coluna = rng.choice(COLUNAS)
+    if coluna == 'Area':
+        novo[coluna] = rng.choice([None, *df['Area'].dropna().unique()[:3]])
+    elif coluna == 'Impacto':
+        novo[coluna] = rng.choice([None, '', 'Alto'])
+    else:
+        novo[coluna] = rng.choice([None, pd.Timestamp(HOJE), pd.Timestamp(HOJE) + pd.Timedelta(days=rng.randint(-60, 60))])
+    df = df.copy()
+    df[coluna] = df[coluna].astype(object)
+    df.loc[df.index[posicao], coluna] = novo[coluna]
+    return df, antigo, novo
+
+
+def test_deltas_equivalentes_a_recalculo():
+    rng = random.Random(13)
+    df = _plano()
+    agregados = AgregadosPlano()
+    agregados.sincronizar(lambda: df, 0, HOJE)
+    for versao in range(1, 301):
+        df, antigo, novo = _alterar(df, rng, 1000 + versao)
+        agregados.aplicar(antigo, novo, versao - 1, versao)
+    assert agregados.versao == 300 and agregados.reconstrucoes == 1
+    assert agregados.verificar(df) == []
+
+    fresco = AgregadosPlano()
+    fresco.sincronizar(lambda: df, 300, HOJE)
+    pd.testing.assert_frame_equal(agregados.tabela_area_status(), fresco.tabela_area_status())
+    pd.testing.assert_series_equal(agregados.contagem_status().sort_index(), fresco.contagem_status().sort_index())
+    assert agregados.resumo() == fresco.resumo()
+
+
+def test_verificar_aponta_divergencia_e_virada_do_dia_reconstroi():
+    df = _plano(50)
+    agregados = AgregadosPlano()
+    agregados.sincronizar(lambda: df, 0, HOJE)
+    # Uma gravação cuja diferença não chegou aos agregados
+    assert agregados.verificar(df.iloc[1:]) != []
+    # O Status depende de hoje: na virada do dia os agregados são recalculados
+    amanha = HOJE + pd.Timedelta(days=1)
+    agregados.sincronizar(lambda: df, 0, amanha)
+    assert agregados.reconstrucoes == 2 and agregados.verificar(df) == []
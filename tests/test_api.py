@@ -0,0 +1,100 @@
+import csv
+import http.client
+import io
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+import api
+import dados_compartilhados
+from dados_compartilhados import obter_plano_compartilhado
+
+
+# Servidor da API em uma porta livre, sobre um plano criado na pasta temporária
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dados_compartilhados, '_planos', OrderedDict())
+    monkeypatch.setattr(api, 'LINHAS_POR_BLOCO', 2)
+    servidor = api.criar_servidor(porta=0, tipo='sqlite', registrar=False)
+    plano = obter_plano_compartilhado(tipo='sqlite')
+    plano.gravar_lote([
+        ('inserir', None, {'Area': 'Transporte', 'Acao': f'acao {numero}', 'Corpo': 'BAL', 'Inicio Plan': '2020-01-0' + str(numero)})
+        for numero in range(1, 6)
+    ])
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor, plano
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(servidor, caminho, cabecalhos=None):
+    conexao = http.client.HTTPConnection('127.0.0.1', servidor.server_address[1], timeout=10)
+    try:
+        conexao.request('GET', caminho, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        return resposta, resposta.read()
+    finally:
+        conexao.close()
+
+
+def test_acoes_em_json_e_csv(servidor):
+    servidor, plano = servidor
+    resposta, corpo = _get(servidor, '/acoes?ordenar=id')
+    assert resposta.status == 200
+    assert resposta.getheader('Content-Type').startswith('application/json')
+    dados = json.loads(corpo)
+    assert dados['total'] == 5
+    assert [acao['Acao'] for acao in dados['acoes']] == [f'acao {numero}' for numero in range(1, 6)]
+    assert {acao['Status'] for acao in dados['acoes']} == {'ATRASADA'}
+
+    resposta, corpo = _get(servidor, '/acoes?ordenar=-id&formato=csv')
+    assert resposta.getheader('Content-Type').startswith('text/csv')
+    linhas = list(csv.DictReader(io.StringIO(corpo.decode('utf-8'))))
+    assert [linha['Acao'] for linha in linhas] == [f'acao {numero}' for numero in range(5, 0, -1)]
+    assert linhas[0]['Inicio Plan'] == '2020-01-05'
+
+
+def test_etag_304_e_etag_nova_depois_de_uma_gravacao(servidor):
+    servidor, plano = servidor
+    resposta, _ = _get(servidor, '/agregados')
+    etag = resposta.getheader('ETag')
+    resposta, corpo = _get(servidor, '/agregados', {'If-None-Match': etag})
+    assert resposta.status == 304 and corpo == b''
+
+    _, df = plano.obter()
+    plano.atualizar(int(df['ID'].iloc[0]), {'Fim Plan': date(2020, 2, 1), 'Fim Real': date(2020, 2, 1)})
+    resposta, corpo = _get(servidor, '/agregados', {'If-None-Match': etag})
+    assert resposta.status == 200
+    assert resposta.getheader('ETag') != etag
+    assert json.loads(corpo)['resumo']['concluidas'] == 1
+
+
+def test_paginas_em_blocos_pelo_link(servidor):
+    servidor, _ = servidor
+    caminho, paginas = '/acoes?tamanho=2&ordenar=id', []
+    while caminho:
+        resposta, corpo = _get(servidor, caminho)
+        assert resposta.getheader('Transfer-Encoding') == 'chunked'
+        assert resposta.getheader('X-Total-Count') == '5'
+        paginas.append([acao['Acao'] for acao in json.loads(corpo)['acoes']])
+        link = resposta.getheader('Link')
+        caminho = link[1:link.index('>')] if link else None
+    assert paginas == [['acao 1', 'acao 2'], ['acao 3', 'acao 4'], ['acao 5']]
+
+
+def test_agregados_compartilhados_com_o_app_sem_reconstruir(servidor):
+    servidor, plano = servidor
+    _get(servidor, '/agregados')
+    reconstrucoes = plano.agregados.reconstrucoes
+    # O app sincroniza pelo mesmo acessor; a gravação aplica a diferença sem reconstruir
+    plano.sincronizar(plano.agregados)
+    _, df = plano.obter()
+    plano.apagar(int(df['ID'].iloc[0]))
+    _, corpo = _get(servidor, '/agregados')
+    plano.sincronizar(plano.agregados)
+    assert plano.agregados.reconstrucoes == reconstrucoes
+    assert json.loads(corpo)['resumo']['total'] == 4
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from armazenamento import Armazenamento, ArmazenamentoSQLite
+from diario import AUTOR
+
+
+@pytest.fixture
+def banco(tmp_path):
+    return ArmazenamentoSQLite(str(tmp_path / 'plano.db'), caminho_excel=str(tmp_path / 'ausente.xlsx'))
+
+
+def test_armazenamento_e_abstrato():
+    with pytest.raises(TypeError):
+        Armazenamento()
+
+
+def test_alteracoes_registram_operacao_id_e_autor(banco):
+    primeiro, segundo = banco.inserir_lote([{'Acao': 'a'}, {'Acao': 'b'}], autor='Ana')
+    banco.gravar_lote([
+        ('atualizar', primeiro, {'Fim Real': pd.Timestamp('2025-01-02')}),
+        ('apagar', segundo, None),
+    ], ['Bia', None])
+    alteracoes = banco.alteracoes()
+    assert alteracoes[['operacao', 'id', 'autor']].values.tolist() == [
+        ['inserir', primeiro, 'Ana'], ['inserir', segundo, 'Ana'],
+        ['atualizar', primeiro, 'Bia'], ['apagar', segundo, AUTOR],
+    ]
+    assert alteracoes['dados'].iloc[2] == '{"Fim Real": "2025-01-02T00:00:00"}'
+    assert alteracoes['quando'].notna().all()
+
+
+def test_alteracoes_sao_desfeitas_com_o_lote(banco):
+    with pytest.raises(ValueError):
+        banco.gravar_lote([('inserir', None, {'Acao': 'a'}), ('mover', 1, None)], ['Ana', 'Ana'])
+    assert banco.carregar().empty
+    assert banco.alteracoes().empty
@@ -0,0 +1,70 @@
+# Equivalência entre o índice de busca mantido por deltas e uma reconstrução completa
+import random
+
+import pandas as pd
+import pytest
+
+from armazenamento import COLUNA_ID
+from busca import CAMPOS_BUSCA, IndiceBusca, normalizar, tokenizar
+
+PALAVRAS = ['Manutenção', 'manutencao', 'válvula', 'Valvulas', 'bomba', 'Bombeamento', 'inspeção', 'ÓLEO', 'troca', 'de', 'a', 'x9']
+
+
+def _texto(rng):
+    return rng.choice([None, ' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(1, 5)))])
+
+
+def _registro(rng, id_acao):
+    return {COLUNA_ID: id_acao, **{campo: _texto(rng) for campo in CAMPOS_BUSCA}}
+
+
+# Empates saem na ordem de inclusão no índice, que os deltas não preservam: compara as pontuações
+def _resultado(indice, consulta):
+    return {id_acao: round(pontuacao, 9) for id_acao, pontuacao in indice.buscar(consulta)}
+
+
+def test_normalizacao_sem_acentos_e_palavras_vazias():
+    assert normalizar('Manutenção ÓLEO') == 'manutencao oleo'
+    assert tokenizar('Troca de Óleo da Bomba') == ['troca', 'oleo', 'bomba']
+    assert tokenizar(None) == [] and tokenizar(float('nan')) == []
+
+
+def test_deltas_equivalentes_a_reconstrucao():
+    rng = random.Random(11)
+    registros = {id_acao: _registro(rng, id_acao) for id_acao in range(1, 61)}
+    indice = IndiceBusca()
+    indice.reconstruir(pd.DataFrame(list(registros.values())), 0)
+    for versao in range(1, 301):
+        sorteio = rng.random()
+        if sorteio < 0.2 or not registros:
+            id_acao = 100 + versao
+            antigo, novo = None, _registro(rng, id_acao)
+        else:
+            id_acao = rng.choice(list(registros))
+            antigo = registros[id_acao]
+            novo = None if sorteio < 0.35 else {**antigo, rng.choice(list(CAMPOS_BUSCA)): _texto(rng)}
+        if novo is None:
+            del registros[id_acao]
+        else:
+            registros[id_acao] = novo
+        indice.aplicar(antigo, novo, versao - 1, versao)
+    assert indice.versao == 300 and indice.reconstrucoes == 1
+
+    fresco = IndiceBusca()
+    fresco.reconstruir(pd.DataFrame(list(registros.values())), 300)
+    assert indice.estatisticas() == fresco.estatisticas()
+    for consulta in ['manutenção', 'MANUT', 'valv', 'bomba oleo', 'inspecao troca', 'x9', 'v', 'de', 'inexistente']:
+        assert _resultado(indice, consulta) == _resultado(fresco, consulta), consulta
+
+
+@pytest.mark.parametrize('consulta', ['Manutenção', 'manutencao', 'MANUTEN', 'manut'])
+def test_prefixo_e_acentos_encontram_a_mesma_acao(consulta):
+    df = pd.DataFrame([
+        {COLUNA_ID: 1, 'Acao': 'Manutenção da bomba'},
+        {COLUNA_ID: 2, 'Acao': 'Troca de óleo', 'Observações': 'após a manutenção'},
+        {COLUNA_ID: 3, 'Acao': 'Inspeção'},
+    ])
+    indice = IndiceBusca()
+    indice.reconstruir(df, 0)
+    # O campo Acao pesa mais que Observações
+    assert [id_acao for id_acao, _ in indice.buscar(consulta)] == [1, 2]
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from cache_arquivos import CacheArquivos
+
+
+def test_acerto_nao_copia_e_dataframe_alterado_nao_altera_o_cache(tmp_path):
+    caminho = tmp_path / 'plano.csv'
+    caminho.write_text('ID,Corpo\n1,BAL\n2,CGA\n', encoding='utf-8')
+    cache = CacheArquivos()
+    leituras = []
+
+    def ler():
+        leituras.append(caminho)
+        return pd.read_csv(caminho)
+
+    df = cache.obter(str(caminho), ler)
+    df.loc[0, 'Corpo'] = 'FGS'
+    df['Nova'] = 1
+    outro = cache.obter(str(caminho), ler)
+    assert len(leituras) == 1 and outro is not df
+    assert outro['Corpo'].tolist() == ['BAL', 'CGA'] and 'Nova' not in outro.columns
+    # Colunas compartilhadas com o valor em cache, sem cópia a cada acerto
+    assert np.shares_memory(outro['ID'].to_numpy(), cache.obter(str(caminho), ler)['ID'].to_numpy())
+
+    mapeamento = tmp_path / 'mapeamento.json'
+    mapeamento.write_text('{}', encoding='utf-8')
+    valor = cache.obter(str(mapeamento), lambda: {'Transporte': 'Ana'})
+    assert cache.obter(str(mapeamento), lambda: {}) is valor
+    assert cache.estatisticas() == {'acertos': 3, 'falhas': 2, 'entradas': 2}
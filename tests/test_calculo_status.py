@@ -0,0 +1,67 @@
+# Equivalência entre o cálculo de Status vetorizado e o cálculo linha a linha
+import itertools
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculo_status import calcular_status, calcular_status_vetorizado
+
+HOJE = pd.Timestamp('2025-06-15')
+
+# Datas em torno de hoje (antes, no dia, depois) e os vazios que chegam ao cálculo: None, NaT, NaN
+# e datas em texto, como vêm da planilha ou do formulário
+DATAS = [
+    None,
+    pd.NaT,
+    np.nan,
+    HOJE - pd.Timedelta(days=10),
+    HOJE,
+    HOJE + pd.Timedelta(days=10),
+    '2025-06-01',
+    '2025-06-15',
+    '2025-07-01',
+    date(2025, 6, 14),
+]
+
+
+def _grade():
+    linhas = [
+        {'Inicio Plan': inicio_plan, 'Fim Plan': fim_plan, 'Inicio Real': inicio_real, 'Fim Real': fim_real}
+        for inicio_plan, fim_plan, fim_real in itertools.product(DATAS, repeat=3)
+        for inicio_real in (None, HOJE - pd.Timedelta(days=5))
+    ]
+    return pd.DataFrame(linhas, dtype=object)
+
+
+def test_vetorizado_igual_ao_escalar_linha_a_linha():
+    df = _grade()
+    vetorizado = calcular_status_vetorizado(df, HOJE)
+    escalar = [
+        calcular_status(linha['Inicio Real'], linha['Fim Real'], linha['Inicio Plan'], linha['Fim Plan'], hoje=HOJE)
+        for _, linha in df.iterrows()
+    ]
+    divergentes = [
+        (posicao, df.iloc[posicao].to_dict(), vetorizado.iloc[posicao], esperado)
+        for posicao, esperado in enumerate(escalar)
+        if vetorizado.iloc[posicao] != esperado
+    ]
+    assert not divergentes, divergentes[:5]
+
+
+@pytest.mark.parametrize('hoje', ['2025-06-15', date(2025, 6, 15), HOJE])
+def test_hoje_em_formatos_diferentes(hoje):
+    df = _grade()
+    assert calcular_status_vetorizado(df, hoje).tolist() == calcular_status_vetorizado(df, HOJE).tolist()
+
+
+def test_colunas_tipadas_como_no_plano():
+    df = _grade()
+    tipado = df.apply(lambda coluna: pd.to_datetime(coluna, errors='coerce', format='mixed'))
+    assert calcular_status_vetorizado(tipado, HOJE).tolist() == calcular_status_vetorizado(df, HOJE).tolist()
+
+
+def test_preserva_o_indice():
+    df = _grade().set_axis(range(100, 100 + len(_grade())))
+    assert calcular_status_vetorizado(df, HOJE).index.equals(df.index)
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from cache_arquivos import CacheCalculos
+import consulta
+from consulta import obter_indice
+
+
+# Sessões em seleções diferentes (versões diferentes) alternando no mesmo processo
+def test_versoes_alternadas_reaproveitam_o_indice(monkeypatch):
+    monkeypatch.setattr(consulta, 'cache_calculos', CacheCalculos())
+    df_a = pd.DataFrame({'ID': [1, 2], 'Corpo': ['BAL', 'CGA']})
+    df_b = pd.DataFrame({'ID': [3], 'Corpo': ['FGS']})
+    indice_a = obter_indice(df_a, (1, 'a'))
+    indice_b = obter_indice(df_b, (2, 'b'))
+    for _ in range(3):
+        assert obter_indice(df_a, (1, 'a')) is indice_a
+        assert obter_indice(df_b, (2, 'b')) is indice_b
+    assert consulta.cache_calculos.estatisticas()['falhas'] == 2
+    assert indice_a.opcoes('Corpo') == ['BAL', 'CGA'] and indice_b.opcoes('Corpo') == ['FGS']
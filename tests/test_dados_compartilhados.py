@@ -0,0 +1,38 @@
+import pytest
+
+from armazenamento import COLUNA_ID
+from dados_compartilhados import PlanoCompartilhado
+from particoes import ArmazenamentoParticionado
+
+
+@pytest.fixture(params=['sqlite', 'excel'])
+def plano(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    plano = PlanoCompartilhado(ArmazenamentoParticionado('Principal', tipo=request.param, pasta=str(tmp_path / 'sites')))
+    # Janela larga: as gravações enviadas juntas pelo teste caem no mesmo lote
+    plano.fila.janela_s = 0.3
+    return plano
+
+
+def test_falha_na_segunda_particao_nao_duplica_a_gravacao_da_primeira(plano, monkeypatch):
+    plano.inserir({'Corpo': 'A', 'Acao': 'existente'})
+    plano.obter()
+
+    def falhar(operacoes, autores=None):
+        raise OSError('falha na partição B')
+    monkeypatch.setattr(plano.armazenamento.particao('B'), 'preparar_lote', falhar)
+
+    lotes = plano.fila.lotes
+    sessao_a = plano.fila.enviar((('inserir', None, {'Corpo': 'A', 'Acao': 'nova A'}), 'Ana'))
+    sessao_b = plano.fila.enviar((('inserir', None, {'Corpo': 'B', 'Acao': 'nova B'}), 'Bia'))
+    id_a = sessao_a.result(10)
+    with pytest.raises(OSError):
+        sessao_b.result(10)
+    assert plano.fila.lotes == lotes + 1
+
+    _, df = plano.obter()
+    gravado = plano.armazenamento.carregar()
+    assert sorted(gravado[COLUNA_ID]) == sorted(df[COLUNA_ID])
+    assert sorted(gravado['Acao']) == ['existente', 'nova A']
+    assert gravado.loc[gravado['Acao'] == 'nova A', COLUNA_ID].tolist() == [id_a]
+    assert plano.armazenamento.particao('B').carregar().empty
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from armazenamento import COLUNAS_OBRIGATORIAS
+from edicao_lote import preparar_edicoes
+
+HOJE = pd.Timestamp('2025-06-15')
+
+
+# Plano com uma ação cujas datas reais já estão invertidas no armazenamento
+def _plano():
+    acao = {coluna: None for coluna in COLUNAS_OBRIGATORIAS}
+    acao.update({
+        'ID': 1, 'Area': 'Transporte', 'Responsavel': 'Ana', 'Impacto': 'Baixo', 'Status': 'CONCLUÍDA',
+        'Inicio Plan': pd.Timestamp('2025-01-01'), 'Fim Plan': pd.Timestamp('2025-02-01'),
+        'Inicio Real': pd.Timestamp('2025-03-01'), 'Fim Real': pd.Timestamp('2025-01-05'),
+    })
+    return pd.DataFrame([acao])
+
+
+def test_inversao_gravada_em_coluna_nao_editada_nao_impede_a_edicao():
+    operacoes, erros = preparar_edicoes(_plano(), {1: {'Impacto': 'Alto'}}, HOJE)
+    assert erros.empty
+    assert operacoes == [('atualizar', 1, {'Impacto': 'Alto'})]
+
+
+def test_data_editada_fora_de_ordem_e_rejeitada():
+    operacoes, erros = preparar_edicoes(_plano(), {1: {'Fim Real': pd.Timestamp('2025-01-10')}}, HOJE)
+    assert operacoes == []
+    assert erros.to_dict(orient='records') == [{'ID': 1, 'Erro': "'Inicio Real' posterior a 'Fim Real'"}]
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from fila_gravacao import FilaGravacao, GravacaoParcial
+
+
+# Executor de lotes tudo ou nada: só grava se nenhuma operação do lote for inválida
+class Gravador:
+    def __init__(self):
+        self.gravados = []
+        self.lotes = []
+        self.liberar = threading.Event()
+
+    def __call__(self, operacoes):
+        self.liberar.wait(5)
+        self.lotes.append(list(operacoes))
+        if any(operacao == 'invalida' for operacao in operacoes):
+            raise ValueError('operação inválida')
+        self.gravados += operacoes
+        return [operacao.upper() for operacao in operacoes]
+
+
+def _enviar_juntos(fila, gravador, envios):
+    futuros = [envio(fila) for envio in envios]
+    gravador.liberar.set()
+    return futuros
+
+
+def test_falha_no_lote_afeta_so_a_operacao_invalida():
+    gravador = Gravador()
+    fila = FilaGravacao(gravador, janela_s=0.2)
+    futuros = _enviar_juntos(fila, gravador, [
+        lambda f: f.enviar('a'), lambda f: f.enviar('invalida'), lambda f: f.enviar('b'),
+    ])
+    assert futuros[0].result(5) == 'A'
+    assert futuros[2].result(5) == 'B'
+    with pytest.raises(ValueError):
+        futuros[1].result(5)
+    assert sorted(gravador.gravados) == ['a', 'b']
+
+
+def test_grupo_com_falha_e_tudo_ou_nada():
+    gravador = Gravador()
+    fila = FilaGravacao(gravador, janela_s=0.2)
+    futuros = _enviar_juntos(fila, gravador, [
+        lambda f: f.enviar_grupo(['c', 'invalida']), lambda f: f.enviar('d'), lambda f: f.enviar_grupo(['e', 'f']),
+    ])
+    with pytest.raises(ValueError):
+        futuros[0].result(5)
+    assert futuros[1].result(5) == 'D'
+    assert futuros[2].result(5) == ['E', 'F']
+    assert sorted(gravador.gravados) == ['d', 'e', 'f']
+
+
+def test_lote_sem_falha_e_gravado_de_uma_vez():
+    gravador = Gravador()
+    fila = FilaGravacao(gravador, janela_s=0.2)
+    futuros = _enviar_juntos(fila, gravador, [lambda f: f.enviar('g'), lambda f: f.enviar_grupo(['h', 'i'])])
+    assert futuros[0].result(5) == 'G'
+    assert futuros[1].result(5) == ['H', 'I']
+    assert gravador.lotes == [['g', 'h', 'i']]
+
+
+def test_sem_garantia_de_tudo_ou_nada_o_lote_nao_e_refeito():
+    gravador = Gravador()
+    fila = FilaGravacao(gravador, janela_s=0.2, refazer_separado=False)
+    futuros = _enviar_juntos(fila, gravador, [lambda f: f.enviar('a'), lambda f: f.enviar('invalida')])
+    for futuro in futuros:
+        with pytest.raises(ValueError):
+            futuro.result(5)
+    assert gravador.lotes == [['a', 'invalida']]
+
+
+def test_gravacao_parcial_nao_e_refeita_e_cada_sessao_recebe_as_suas_operacoes_gravadas():
+    def executar(operacoes):
+        raise GravacaoParcial('falha ao confirmar', [0, 2])
+
+    fila = FilaGravacao(executar, janela_s=0.2)
+    futuros = [fila.enviar('a'), fila.enviar_grupo(['b', 'c']), fila.enviar('d')]
+    gravadas = []
+    for futuro in futuros:
+        with pytest.raises(GravacaoParcial) as erro:
+            futuro.result(5)
+        gravadas.append(erro.value.gravadas)
+    assert gravadas == [[0], [1], []]
+    assert fila.lotes == 1
@@ -0,0 +1,109 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+
+from calculo_status import calcular_status
+from importacao import importar_acoes, validar_bloco
+
+MAPEAMENTO = {'Transporte': 'Ana', 'Usina': 'Bia'}
+
+
+# Armazenamento em memória que registra cada gravação em lote
+class Gravacoes:
+    def __init__(self):
+        self.lotes = []
+        self.autores = []
+
+    def inserir_lote(self, registros, autor=None):
+        self.lotes.append(registros)
+        self.autores.append(autor)
+        return list(range(len(registros)))
+
+
+def _bloco(linhas):
+    return pd.DataFrame(linhas, index=range(2, len(linhas) + 2))
+
+
+def test_responsavel_vem_do_mapeamento_da_area():
+    validas, erros = validar_bloco(_bloco([
+        {'Area': ' Transporte ', 'Responsavel': 'Outro'},
+        {'Area': 'Mina', 'Responsavel': 'Caio'},
+        {'Area': 'Mina'},
+        {'Area': None},
+    ]), MAPEAMENTO)
+    assert validas[['Area', 'Responsavel']].values.tolist() == [['Transporte', 'Ana'], ['Mina', 'Caio']]
+    assert erros == [
+        {'Linha': 4, 'Erro': "Área 'Mina' sem responsável no mapeamento"},
+        {'Linha': 5, 'Erro': "Área não informada"},
+    ]
+
+
+def test_datas_iso_e_dia_mes_ano():
+    validas, erros = validar_bloco(_bloco([
+        {'Area': 'Usina', 'Inicio Plan': '2025-01-02', 'Fim Plan': '05/03/2025'},
+        {'Area': 'Usina', 'Inicio Plan': '5/3/25', 'Fim Plan': datetime(2025, 4, 1)},
+        {'Area': 'Usina', 'Inicio Plan': '2025-01-02 08:30', 'Fim Plan': '31/12/2025'},
+    ]), MAPEAMENTO)
+    assert erros == []
+    assert validas['Inicio Plan'].tolist() == [pd.Timestamp('2025-01-02'), pd.Timestamp('2025-03-05'), pd.Timestamp('2025-01-02 08:30')]
+    assert validas['Fim Plan'].tolist() == [pd.Timestamp('2025-03-05'), pd.Timestamp('2025-04-01'), pd.Timestamp('2025-12-31')]
+
+
+def test_erros_por_linha():
+    validas, erros = validar_bloco(_bloco([
+        {'Area': 'Usina', 'Inicio Plan': '2025-13-45'},
+        {'Area': 'Usina', 'Inicio Real': '10/02/2025', 'Fim Real': '01/02/2025'},
+        {'Area': None, 'Fim Plan': 'amanhã'},
+        {'Area': 'Usina', 'Inicio Plan': '2025-01-01'},
+    ]), MAPEAMENTO)
+    assert validas.index.tolist() == [5]
+    assert erros == [
+        {'Linha': 2, 'Erro': "Data inválida em 'Inicio Plan': 2025-13-45"},
+        {'Linha': 3, 'Erro': "'Inicio Real' posterior a 'Fim Real'"},
+        {'Linha': 4, 'Erro': "Área não informada; Data inválida em 'Fim Plan': amanhã"},
+    ]
+
+
+def test_status_vazio_e_calculado_e_o_informado_e_mantido():
+    hoje = pd.Timestamp(datetime.now().date())
+    linhas = [
+        {'Area': 'Usina', 'Inicio Plan': hoje - pd.Timedelta(days=30), 'Fim Plan': hoje - pd.Timedelta(days=5)},
+        {'Area': 'Usina', 'Inicio Plan': hoje - pd.Timedelta(days=30), 'Fim Plan': hoje - pd.Timedelta(days=5), 'Fim Real': hoje},
+        {'Area': 'Usina', 'Inicio Plan': hoje + pd.Timedelta(days=3)},
+        {'Area': 'Usina'},
+        {'Area': 'Usina', 'Inicio Plan': hoje + pd.Timedelta(days=3), 'Status': 'CANCELADA'},
+    ]
+    validas, _ = validar_bloco(_bloco(linhas), MAPEAMENTO)
+    esperados = [
+        calcular_status(linha['Inicio Real'], linha['Fim Real'], linha['Inicio Plan'], linha['Fim Plan'],
+                        linha['Inicio(REPRO)'], linha['Fim(REPRO)'])
+        for _, linha in validas.iloc[:4].iterrows()
+    ]
+    assert validas['Status'].tolist() == esperados + ['CANCELADA']
+    assert esperados == ['ATRASADA', 'CONCLUÍDA', 'PROGRAMADA', '_']
+
+
+def test_importacao_grava_um_lote_por_bloco_e_numera_os_erros_pela_linha_do_arquivo():
+    arquivo = io.BytesIO(
+        "Area;Acao;Inicio Plan\n"
+        "Transporte;a;2025-01-02\n"
+        "Usina;b;02/01/2025\n"
+        ";c;2025-01-02\n"
+        "Usina;d;xx\n"
+        "Usina;e;2025-02-01\n".encode('utf-8')
+    )
+    gravacoes = Gravacoes()
+    progresso = []
+    importadas, erros = importar_acoes(
+        arquivo, 'acoes.csv', gravacoes, MAPEAMENTO, tamanho_bloco=2,
+        ao_progredir=lambda *contagens: progresso.append(contagens), autor='Ana'
+    )
+    assert importadas == 3
+    assert [[registro['Acao'] for registro in lote] for lote in gravacoes.lotes] == [['a', 'b'], ['e']]
+    assert gravacoes.autores == ['Ana', 'Ana']
+    assert erros.to_dict(orient='records') == [
+        {'Linha': 4, 'Erro': "Área não informada"},
+        {'Linha': 5, 'Erro': "Data inválida em 'Inicio Plan': xx"},
+    ]
+    assert progresso == [(2, 2, 0), (4, 2, 2), (5, 3, 2)]
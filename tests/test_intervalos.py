@@ -0,0 +1,78 @@
+# Equivalência entre o índice de intervalos mantido por deltas e uma reconstrução completa
+import random
+
+import pandas as pd
+import pytest
+
+import intervalos
+from armazenamento import COLUNA_ID
+from benchmarks.gerador import gerar_plano
+from intervalos import TIPOS_INTERVALO, IndiceIntervalos
+
+HOJE = pd.Timestamp('2025-06-15')
+
+COLUNAS_DATA = [coluna for par in TIPOS_INTERVALO.values() for coluna in par]
+
+
+def _plano(n=300):
+    df = gerar_plano(n, 3, hoje=HOJE)
+    df.insert(0, COLUNA_ID, range(1, n + 1))
+    return df
+
+
+# Sorteia uma alteração (inclusão, edição de datas/Corpo/Nível ou exclusão) e aplica ao plano.
+# Retorna o plano alterado e os registros antigo e novo, como os recebe o índice.
+def _alterar(df, rng, proximo_id):
+    sorteio = rng.random()
+    if sorteio < 0.2:
+        novo = df.sample(1, random_state=rng.randrange(10**6)).iloc[0].to_dict()
+        novo[COLUNA_ID] = proximo_id
+        return pd.concat([df, pd.DataFrame([novo])], ignore_index=True), None, novo
+    posicao = rng.randrange(len(df))
+    antigo = df.iloc[posicao].to_dict()
+    if sorteio < 0.35:
+        return df.drop(index=df.index[posicao]).reset_index(drop=True), antigo, None
+    novo = dict(antigo)
+    coluna = rng.choice(COLUNAS_DATA + ['Corpo', 'Nível'])
+    if coluna in COLUNAS_DATA:
+        novo[coluna] = rng.choice([None, HOJE + pd.Timedelta(days=rng.randint(-400, 400))])
+    else:
+        novo[coluna] = rng.choice(df[coluna].dropna().unique().tolist())
+    df = df.copy()
+    df.loc[df.index[posicao], coluna] = novo[coluna]
+    return df, antigo, novo
+
+
+@pytest.mark.parametrize('limite', [10, 10**6])
+def test_deltas_equivalentes_a_reconstrucao(monkeypatch, limite):
+    # Limite baixo: o índice é compactado várias vezes; alto: tudo fica nas pendentes
+    monkeypatch.setattr(intervalos, 'LIMITE_PENDENTES', limite)
+    rng = random.Random(7)
+    df = _plano()
+    indice = IndiceIntervalos()
+    indice.reconstruir(df, 0)
+    for versao in range(1, 201):
+        df, antigo, novo = _alterar(df, rng, 1000 + versao)
+        indice.aplicar(antigo, novo, versao - 1, versao)
+    assert indice.versao == 200 and indice.reconstrucoes == 1
+
+    fresco = IndiceIntervalos()
+    fresco.reconstruir(df, 200)
+    janelas = [(HOJE, None), (HOJE - pd.Timedelta(days=90), HOJE), ('2024-01-01', '2026-12-31'), ('2030-01-01', None)]
+    for inicio, fim in janelas:
+        assert indice.verificar(df, inicio, fim or inicio)
+        for filtros in ({}, {'tipos': ['Real']}, {'corpos': ['BAL', 'CGA']}, {'niveis': df['Nível'].dropna().unique()[:1]}):
+            pd.testing.assert_frame_equal(
+                indice.ativos(inicio, fim, **filtros).sort_values(['Inicio', COLUNA_ID, 'Tipo'], ignore_index=True),
+                fresco.ativos(inicio, fim, **filtros).sort_values(['Inicio', COLUNA_ID, 'Tipo'], ignore_index=True),
+            )
+
+
+def test_versao_fora_de_sequencia_marca_para_reconstruir():
+    df = _plano(20)
+    indice = IndiceIntervalos()
+    indice.reconstruir(df, 0)
+    indice.aplicar(None, {**df.iloc[0].to_dict(), COLUNA_ID: 99}, 5, 6)
+    assert indice.versao is None
+    indice.sincronizar(lambda: df, 6)
+    assert indice.reconstrucoes == 2 and indice.verificar(df, HOJE, HOJE)
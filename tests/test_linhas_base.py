@@ -0,0 +1,60 @@
+# Equivalência entre as linhas de base reconstruídas a partir das diferenças e os planos gravados
+import random
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNA_ID
+from benchmarks.gerador import gerar_plano
+from linhas_base import LinhasBase
+from particoes import corpos_da_coluna
+
+HOJE = pd.Timestamp('2025-06-15')
+
+
+# Linha de base esperada de um plano: ID, datas planejadas e Corpo, ordenada por ID
+def _esperada(df):
+    esperada = pd.DataFrame({
+        COLUNA_ID: df[COLUNA_ID].to_numpy(dtype=np.int64),
+        'Inicio Plan': pd.to_datetime(df['Inicio Plan']).to_numpy(dtype='datetime64[ns]'),
+        'Fim Plan': pd.to_datetime(df['Fim Plan']).to_numpy(dtype='datetime64[ns]'),
+        'Corpo': corpos_da_coluna(df['Corpo']).to_numpy(dtype=str),
+    })
+    return esperada.sort_values(COLUNA_ID, ignore_index=True)
+
+
+# Sorteia inclusões, exclusões e alterações de datas e Corpo (inclusive um Corpo mais longo que os
+# já gravados, e vazio) entre uma linha de base e a seguinte
+def _alterar(df, rng, proximo_id):
+    df = df.drop(index=rng.sample(list(df.index), 5)).reset_index(drop=True)
+    novas = df.sample(5, random_state=rng.randrange(10**6)).assign(**{COLUNA_ID: range(proximo_id, proximo_id + 5)})
+    df = pd.concat([df, novas], ignore_index=True)
+    for posicao in rng.sample(range(len(df)), 10):
+        coluna = rng.choice(['Inicio Plan', 'Fim Plan', 'Corpo'])
+        if coluna == 'Corpo':
+            valor = rng.choice([None, 'BAL', 'Corpo com nome bem mais longo'])
+        else:
+            valor = rng.choice([pd.NaT, HOJE + pd.Timedelta(days=rng.randint(-200, 200))])
+        df.loc[posicao, coluna] = valor
+    return df
+
+
+def test_reconstrucao_igual_ao_plano_gravado(tmp_path):
+    rng = random.Random(3)
+    df = gerar_plano(200, 5, hoje=HOJE)
+    df.insert(0, COLUNA_ID, rng.sample(range(1, 10**4), len(df)))
+    linhas_base = LinhasBase(str(tmp_path))
+    gravados = {}
+    for numero in range(1, 7):
+        entrada = linhas_base.salvar(f'Semana {numero}', df)
+        assert entrada['versao'] == numero and entrada['acoes'] == len(df)
+        gravados[numero] = _esperada(df)
+        df = _alterar(df, rng, 10**4 + 10 * numero)
+
+    # Ordem fora de sequência: reaproveita a última versão reconstruída ou recomeça do início
+    for leitor in (linhas_base, LinhasBase(str(tmp_path))):
+        for numero in (6, 2, 4, 1, 5, 3):
+            pd.testing.assert_frame_equal(leitor.reconstruir(numero), gravados[numero], check_dtype=False)
+    versoes = linhas_base.versoes()
+    assert [versao['alteradas'] for versao in versoes][0] == 200
+    assert all(versao['alteradas'] <= 15 and versao['removidas'] == 5 for versao in versoes[1:])
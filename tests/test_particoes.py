@@ -0,0 +1,88 @@
+import pytest
+
+from armazenamento import COLUNA_ID, LotePreparado
+from fila_gravacao import GravacaoParcial
+from particoes import ArmazenamentoParticionado
+
+
+@pytest.fixture(params=['sqlite', 'excel'])
+def site(request, tmp_path, monkeypatch):
+    # Pasta vazia: a migração do plano monolítico não encontra nada para importar
+    monkeypatch.chdir(tmp_path)
+    return ArmazenamentoParticionado('Principal', tipo=request.param, pasta=str(tmp_path / 'sites'))
+
+
+def _acoes(site):
+    return site.carregar().sort_values(COLUNA_ID)[[COLUNA_ID, 'Corpo', 'Acao']].values.tolist()
+
+
+# Faz a preparação da partição do Corpo falhar
+def _falhar_preparacao(monkeypatch, site, corpo):
+    def falhar(operacoes, autores=None):
+        raise OSError('falha na partição')
+    monkeypatch.setattr(site.particao(corpo), 'preparar_lote', falhar)
+
+
+def test_falha_em_uma_particao_nao_grava_nenhuma(site, monkeypatch):
+    site.inserir({'Corpo': 'A', 'Acao': 'existente'})
+    _falhar_preparacao(monkeypatch, site, 'B')
+    lote = [('inserir', None, {'Corpo': 'A', 'Acao': 'nova A'}), ('inserir', None, {'Corpo': 'B', 'Acao': 'nova B'})]
+    with pytest.raises(OSError):
+        site.gravar_lote(lote)
+    assert _acoes(site) == [[1, 'A', 'existente']]
+
+    monkeypatch.undo()
+    ids = site.gravar_lote(lote)
+    acoes = _acoes(site)
+    assert [acao[1:] for acao in acoes] == [['A', 'existente'], ['A', 'nova A'], ['B', 'nova B']]
+    assert [acao[0] for acao in acoes[1:]] == ids
+
+
+def test_falha_na_confirmacao_informa_as_operacoes_gravadas(site, monkeypatch):
+    particao = site.particao('B')
+    preparar = particao.preparar_lote
+
+    def preparar_com_falha(operacoes, autores=None):
+        lote = preparar(operacoes, autores)
+
+        def falhar():
+            lote.desfazer()
+            raise OSError('disco cheio')
+        return LotePreparado(lote.resultados, falhar, lote.desfazer)
+
+    monkeypatch.setattr(particao, 'preparar_lote', preparar_com_falha)
+    with pytest.raises(GravacaoParcial) as erro:
+        site.gravar_lote([
+            ('inserir', None, {'Corpo': 'B', 'Acao': 'b'}), ('inserir', None, {'Corpo': 'A', 'Acao': 'a'}),
+        ])
+    assert erro.value.gravadas == [1]
+    assert [acao[1:] for acao in _acoes(site)] == [['A', 'a']]
+
+
+def test_mudanca_de_corpo_leva_as_alteracoes_anteriores_do_lote(site):
+    id_acao = site.inserir({'Corpo': 'A', 'Acao': 'original', 'Responsavel': 'Ana'})
+    site.gravar_lote([
+        ('atualizar', id_acao, {'Acao': 'alterada'}),
+        ('atualizar', id_acao, {'Corpo': 'B'}),
+        ('atualizar', id_acao, {'Responsavel': 'Bia'}),
+    ])
+    df = site.carregar()
+    assert df[[COLUNA_ID, 'Corpo', 'Acao', 'Responsavel']].values.tolist() == [[id_acao, 'B', 'alterada', 'Bia']]
+    assert site.particao('A').carregar().empty
+
+
+def test_acao_desconhecida_e_recusada(site):
+    site.inserir({'Corpo': 'A', 'Acao': 'a'})
+    for operacao in [('atualizar', 99, {'Acao': 'x'}), ('apagar', 99, None)]:
+        with pytest.raises(LookupError):
+            site.gravar_lote([('inserir', None, {'Corpo': 'A', 'Acao': 'b'}), operacao])
+    assert [acao[1:] for acao in _acoes(site)] == [['A', 'a']]
+
+
+def test_inserir_e_apagar_no_mesmo_lote(site):
+    ids = site.gravar_lote([('inserir', None, {'Corpo': 'A', 'Acao': 'a'}), ('inserir', None, {'Corpo': 'B', 'Acao': 'b'})])
+    site.gravar_lote([('apagar', ids[0], None), ('atualizar', ids[1], {'Corpo': 'A'})])
+    assert _acoes(site) == [[ids[1], 'A', 'b']]
+    with pytest.raises(LookupError):
+        site.gravar_lote([('apagar', ids[1], None), ('atualizar', ids[1], {'Acao': 'x'})])
+    assert _acoes(site) == [[ids[1], 'A', 'b']]
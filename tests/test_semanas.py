@@ -0,0 +1,52 @@
+# Equivalência entre o índice de semanas ISO e uma varredura direta do plano
+import numpy as np
+import pandas as pd
+
+import semanas
+from cache_arquivos import CacheCalculos
+from semanas import IndiceSemanas, obter_indice_semanas, semana_relativa
+
+# Datas em torno das viradas de ano ISO (2020 tem semana 53; 30/12/2024 já é a semana 1 de 2025)
+DATAS = [
+    '2020-12-31', '2021-01-01', '2021-01-04', '2024-12-29', '2024-12-30', '2025-01-01', '2025-01-06',
+    None, '', 'texto', '2025-06-15', '2026-01-01', '2024-01-03',
+]
+
+
+def _plano():
+    rng = np.random.default_rng(2)
+    aleatorias = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 800, 300), unit='D')
+    return pd.DataFrame({'Inicio Plan': DATAS + list(aleatorias.astype(object))}, dtype=object)
+
+
+def test_indice_igual_a_varredura():
+    df = _plano()
+    indice = IndiceSemanas(df)
+    datas = pd.to_datetime(df['Inicio Plan'], errors='coerce', format='mixed')
+    esperado = {}
+    for posicao, data in enumerate(datas):
+        if pd.notna(data):
+            ano, semana, _ = data.isocalendar()
+            esperado.setdefault((ano, semana), []).append(posicao)
+
+    assert indice.semanas() == sorted(esperado)
+    for (ano, semana), posicoes in esperado.items():
+        assert sorted(indice.linhas(ano, semana).tolist()) == posicoes
+    assert indice.linhas(2030, 1).size == 0
+    assert indice.linhas(2020, 53).tolist() == [0, 1]
+    assert sorted(indice.linhas(2025, 1).tolist())[:2] == [4, 5]
+    semana_do_ano = pd.array(indice.semana_do_ano)
+    assert semana_do_ano[7] is pd.NA and semana_do_ano[0] == 53 and semana_do_ano[4] == 1
+
+
+def test_semana_relativa_atravessa_o_ano():
+    assert semana_relativa(pd.Timestamp('2024-12-23').date(), 1) == (2025, 1)
+    assert semana_relativa(pd.Timestamp('2021-01-04').date(), -1) == (2020, 53)
+
+
+def test_versoes_alternadas_reaproveitam_o_indice(monkeypatch):
+    monkeypatch.setattr(semanas, 'cache_calculos', CacheCalculos())
+    df = _plano()
+    indice_a = obter_indice_semanas(df, 1)
+    indice_b = obter_indice_semanas(df.iloc[:5], 2)
+    assert obter_indice_semanas(df, 1) is indice_a and obter_indice_semanas(df.iloc[:5], 2) is indice_b